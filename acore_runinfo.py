@@ -1,5 +1,4 @@
 import os
-import copy
 from hashlib import md5
 from PySide2 import QtWidgets
 from jh_resource import ACoreRunInfo, CommonOSRunInfo
@@ -56,7 +55,7 @@ class ACoreRunInfoWidget(OSRunInfoWidget):
         self._ui.lineedit_app_path.setText(runinfo.app.filename)
         self._ui.groupbox_app.setChecked(runinfo.app.enable)
 
-        self._runinfo = copy.deepcopy(runinfo)
+        self._runinfo = runinfo.snapshot()
 
     def _on_edit_finished(self):
         if self._runinfo is None:
@@ -69,11 +68,11 @@ class ACoreRunInfoWidget(OSRunInfoWidget):
                 return
             set_lineedit_status(self._ui.lineedit_msl_addr, True)
             changed = msl_addr != self._runinfo.msl.addr
-            self._runinfo.msl.addr = msl_addr
+            self._runinfo = self._runinfo.replace(msl=self._runinfo.msl.replace(addr=msl_addr))
         elif self.sender() is self._ui.lineedit_msl_path:
             msl_path = self._ui.lineedit_msl_path.text()
             changed = msl_path != self._runinfo.msl.filename
-            self._runinfo.msl.filename = msl_path
+            self._runinfo = self._runinfo.replace(msl=self._runinfo.msl.replace(filename=msl_path))
         elif self.sender() is self._ui.lineedit_os_addr:
             os_addr = from_human_num(self._ui.lineedit_os_addr.text())
             if os_addr is None:
@@ -81,11 +80,11 @@ class ACoreRunInfoWidget(OSRunInfoWidget):
                 return
             set_lineedit_status(self._ui.lineedit_os_addr, True)
             changed = os_addr != self._runinfo.os.addr
-            self._runinfo.os.addr = os_addr
+            self._runinfo = self._runinfo.replace(os=self._runinfo.os.replace(addr=os_addr))
         elif self.sender() is self._ui.lineedit_os_path:
             os_path = self._ui.lineedit_os_path.text()
             changed = os_path != self._runinfo.os.filename
-            self._runinfo.os.filename = os_path
+            self._runinfo = self._runinfo.replace(os=self._runinfo.os.replace(filename=os_path))
         elif self.sender() is self._ui.lineedit_app_addr:
             app_addr = from_human_num(self._ui.lineedit_app_addr.text())
             if app_addr is None:
@@ -93,11 +92,11 @@ class ACoreRunInfoWidget(OSRunInfoWidget):
                 return
             set_lineedit_status(self._ui.lineedit_app_addr, True)
             changed = app_addr != self._runinfo.app.addr
-            self._runinfo.app.addr = app_addr
+            self._runinfo = self._runinfo.replace(app=self._runinfo.app.replace(addr=app_addr))
         elif self.sender() is self._ui.lineedit_app_path:
             app_path= self._ui.lineedit_app_path.text()
             changed = app_path != self._runinfo.app.filename
-            self._runinfo.app.filename = app_path
+            self._runinfo = self._runinfo.replace(app=self._runinfo.app.replace(filename=app_path))
 
         if changed:
             self.value_changed.emit()
@@ -105,7 +104,7 @@ class ACoreRunInfoWidget(OSRunInfoWidget):
     def _on_group_app_clicked(self):
         if self._runinfo is None:
             return
-        self._runinfo.app.enable = self._ui.groupbox_app.isChecked()
+        self._runinfo = self._runinfo.replace(app=self._runinfo.app.replace(enable=self._ui.groupbox_app.isChecked()))
         self.value_changed.emit()
 
     def _on_select_file(self):
@@ -127,15 +126,15 @@ class ACoreRunInfoWidget(OSRunInfoWidget):
         if self.sender() is self._ui.btn_select_msl:
             changed = (filename != self._runinfo.msl.filename)
             self._ui.lineedit_msl_path.setText(filename)
-            self._runinfo.msl.filename = filename
+            self._runinfo = self._runinfo.replace(msl=self._runinfo.msl.replace(filename=filename))
         elif self.sender() is self._ui.btn_select_os:
             changed = (filename != self._runinfo.os.filename)
             self._ui.lineedit_os_path.setText(filename)
-            self._runinfo.os.filename = filename
+            self._runinfo = self._runinfo.replace(os=self._runinfo.os.replace(filename=filename))
         elif self.sender() is self._ui.btn_select_app:
             changed = (filename != self._runinfo.app.filename)
             self._ui.lineedit_app_path.setText(filename)
-            self._runinfo.app.filename = filename
+            self._runinfo = self._runinfo.replace(app=self._runinfo.app.replace(filename=filename))
 
         if changed:
             self.value_changed.emit()
@@ -0,0 +1,331 @@
+"""
+性能测试工具。
+
+用于测量资源文件加载、保存等操作的耗时，例如:
+    python benchmark.py codec --cells 1000
+"""
+
+import os
+import copy
+import json
+import time
+import logging
+import tempfile
+import tracemalloc
+import shutil
+import click
+import toml
+from jh_resource import ResourceMgr, ResourceCPU, ResourcePCIDeviceList, ResourcePCIDevice, JsonCodec
+from jh_resource import JhrContainer, PlatformMgr
+from jh_resource import MemRegion, MemMap, CPUDevice, CPURegion
+
+
+def synthetic_jhr(template: str, cells: int) -> dict:
+    """
+    以template为模板，复制guest cell，生成包含cells个guest cell的资源字典
+    """
+    with open(template, "rt", encoding='utf8') as f:
+        value = json.load(f)
+
+    src_cells = value['jailhouse']['guestcells']['cells']
+    new_cells = list()
+    for i in range(cells):
+        cell = copy.deepcopy(src_cells[i % len(src_cells)])
+        cell['name'] = f"{cell['name']}_{i}"
+        cell['unique_id'] = f"{cell['unique_id']}-{i}"
+        new_cells.append(cell)
+    value['jailhouse']['guestcells']['cells'] = new_cells
+    return value
+
+
+def timeit(fun, repeat: int):
+    """
+    执行repeat次，返回最短耗时(秒)和最后一次的返回值
+    """
+    best = None
+    ret = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ret = fun()
+        used = time.perf_counter() - start
+        if best is None or used < best:
+            best = used
+    return best, ret
+
+
+@click.group()
+def cli():
+    """性能测试命令行接口。"""
+    logging.basicConfig(level=logging.WARNING)
+
+
+@cli.command("codec")
+@click.option("--template", default=os.path.join("examples", "D2000_rtt.jhr"), help="模板资源文件")
+@click.option("--cells", default=1000, help="guest cell数量")
+@click.option("--repeat", default=5, help="重复次数")
+def bench_codec(template, cells, repeat):
+    """
+    测试资源文件的加载与保存。
+    """
+    value = synthetic_jhr(template, cells)
+    mgr = ResourceMgr.get_instance()
+
+    with tempfile.TemporaryDirectory(prefix='jh_bench_') as tmpdir:
+        src = os.path.join(tmpdir, "synthetic.jhr")
+        dst = os.path.join(tmpdir, "saved.jhr")
+        with open(src, "wt", encoding='utf8') as f:
+            json.dump(value, f, indent=4, ensure_ascii=False)
+        size = os.path.getsize(src)
+
+        def _open():
+            rsc = mgr.open(src)
+            mgr.remove(rsc)
+            return rsc
+
+        used, rsc = timeit(_open, repeat)
+        if rsc is None:
+            print("open failed.")
+            return False
+        print(f"open      {cells} cells ({size/1024/1024:.1f}MB): {used*1000:.1f}ms")
+
+        used, ok = timeit(lambda: mgr.save(rsc, dst), repeat)
+        if not ok:
+            print("save failed.")
+            return False
+        print(f"save      {cells} cells: {used*1000:.1f}ms")
+
+    # 不含文件读写和JSON编解码的字典转换耗时
+    used, _ = timeit(lambda: mgr.remove(mgr.load(value)), repeat)
+    print(f"from_dict {cells} cells: {used*1000:.1f}ms")
+    used, _ = timeit(rsc.to_dict, repeat)
+    print(f"to_dict   {cells} cells: {used*1000:.1f}ms")
+    return True
+
+
+@cli.command("io")
+@click.option("--template", default=os.path.join("examples", "D2000_rtt.jhr"), help="模板资源文件")
+@click.option("--cells", default=1000, help="合成文件的guest cell数量")
+@click.option("--repeat", default=5, help="重复次数")
+def bench_io(template, cells, repeat):
+    """
+    测试各JSON后端下资源文件的加载与保存吞吐量。
+    """
+    mgr = ResourceMgr.get_instance()
+    backend = JsonCodec.backend
+
+    with tempfile.TemporaryDirectory(prefix='jh_bench_') as tmpdir:
+        large = os.path.join(tmpdir, "synthetic.jhr")
+        dst = os.path.join(tmpdir, "saved.jhr")
+        with open(large, "wt", encoding='utf8') as f:
+            json.dump(synthetic_jhr(template, cells), f, indent=4, ensure_ascii=False)
+
+        def _open(src):
+            rsc = mgr.open(src)
+            mgr.remove(rsc)
+            return rsc
+
+        for src in (template, large):
+            size = os.path.getsize(src) / 1024 / 1024
+            for name in JsonCodec.available_backends():
+                JsonCodec.set_backend(name)
+                load_used, rsc = timeit(lambda: _open(src), repeat)
+                if rsc is None:
+                    print(f"open {src} failed.")
+                    return False
+                save_used, ok = timeit(lambda: mgr.save(rsc, dst), repeat)
+                if not ok:
+                    print("save failed.")
+                    return False
+                print(f"{os.path.basename(src):<16} {size:6.2f}MB {name:<7} "
+                      f"load {load_used*1000:8.1f}ms {size/load_used:6.1f}MB/s  "
+                      f"save {save_used*1000:8.1f}ms {size/save_used:6.1f}MB/s")
+
+            if not JhrContainer.available():
+                continue
+            # 二进制格式，打开时不解码pci_devices
+            jhrb = os.path.join(tmpdir, "saved.jhrb")
+            save_used, ok = timeit(lambda: mgr.save(rsc, jhrb), repeat)
+            if not ok:
+                print("save jhrb failed.")
+                return False
+            load_used, _ = timeit(lambda: _open(jhrb), repeat)
+            print(f"{os.path.basename(src):<16} {os.path.getsize(jhrb)/1024/1024:6.2f}MB {'jhrb':<7} "
+                  f"load {load_used*1000:8.1f}ms {size/load_used:6.1f}MB/s  "
+                  f"save {save_used*1000:8.1f}ms {size/save_used:6.1f}MB/s")
+
+    JsonCodec.set_backend(backend)
+    return True
+
+
+@cli.command("platform")
+@click.option("--platform", "plt_path", default="platform", help="平台目录")
+@click.option("--boards", default=200, help="合成的board数量")
+@click.option("--repeat", default=3, help="重复次数")
+def bench_platform(plt_path, boards, repeat):
+    """
+    测试平台库冷启动(无缓存)与热启动(有缓存)的加载耗时。
+    """
+    index = toml.load(os.path.join(plt_path, "index.toml"))
+    cache_dir = PlatformMgr.cache_dir
+
+    with tempfile.TemporaryDirectory(prefix='jh_bench_') as tmpdir:
+        # 每个board及其cpu复制为独立的文件
+        lib = os.path.join(tmpdir, "platform")
+        os.makedirs(lib)
+        lines = list()
+        src_boards = list(index['boards'].items())
+        for i in range(boards):
+            board_id, board = src_boards[i % len(src_boards)]
+            cpu = index['cpus'][board['cpu']]
+            shutil.copy(os.path.join(plt_path, cpu['file']), os.path.join(lib, f"cpu_{i}.toml"))
+            shutil.copy(os.path.join(plt_path, board['file']), os.path.join(lib, f"board_{i}.toml"))
+            lines.append(f'[cpus.cpu_{i}]\n    file = "cpu_{i}.toml"\n')
+            lines.append(f'[boards.{board_id}_{i}]\n    file = "board_{i}.toml"\n    cpu = "cpu_{i}"\n')
+        with open(os.path.join(lib, "index.toml"), "wt", encoding='utf8') as f:
+            f.write("\n".join(lines))
+
+        PlatformMgr.cache_dir = os.path.join(tmpdir, "cache")
+
+        def _load():
+            pltmgr = PlatformMgr()
+            if not pltmgr.load(lib):
+                return None
+            return pltmgr
+
+        def _cold():
+            shutil.rmtree(PlatformMgr.cache_dir, ignore_errors=True)
+            return _load()
+
+        def _changed():
+            # 修改一个board文件的内容
+            with open(os.path.join(lib, "board_0.toml"), "at", encoding='utf8') as f:
+                f.write("\n")
+            return _load()
+
+        for name, fun in (("cold", _cold), ("warm", _load), ("1 changed", _changed)):
+            if name == "warm":
+                _load()
+            used, pltmgr = timeit(fun, repeat)
+            if pltmgr is None:
+                print("platform load failed.")
+                PlatformMgr.cache_dir = cache_dir
+                return False
+            hit, miss = pltmgr.cache_stats()
+            print(f"{name:<10} {boards} boards: {used*1000:8.1f}ms (hit {hit}, miss {miss})")
+
+    PlatformMgr.cache_dir = cache_dir
+    return True
+
+
+@cli.command("template")
+@click.option("--jhr", default=os.path.join("examples", "D2000_rtt.jhr"), help="资源文件")
+@click.option("--repeat", default=20, help="重复次数")
+def bench_template(jhr, repeat):
+    """
+    测试每次重新编译模板与使用模板缓存时生成配置源码的耗时。
+    """
+    from mako.template import Template
+    from generator import GeneratorCommon, RootCellGenerator
+    from utils import get_template_path
+
+    rsc = ResourceMgr.get_instance().open(jhr)
+    if rsc is None:
+        print(f"open {jhr} failed.")
+        return False
+    kwargs = RootCellGenerator.gen_kwargs(rsc)
+
+    def _compile():
+        with open(get_template_path("root_cell.mako"), "rt", encoding='utf-8') as f:
+            return Template(f.read()).render(**kwargs)
+
+    def _lookup():
+        return GeneratorCommon.get_template("root_cell.mako").render(**kwargs)
+
+    for name, fun in (("compile", _compile), ("lookup", _lookup)):
+        used, _ = timeit(fun, repeat)
+        print(f"{name:<8} root_cell.mako: {used*1000:8.2f}ms")
+    return True
+
+
+def traced(fun):
+    """
+    返回fun执行后新增的内存(字节)和fun的返回值
+    """
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        ret = fun()
+        used = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return used, ret
+
+
+@cli.command("memory")
+@click.option("--template", default=os.path.join("examples", "D2000_rtt.jhr"), help="模板资源文件")
+@click.option("--devices", default=20000, help="CPU设备和region数量")
+@click.option("--pci", default=5000, help="PCI设备数量")
+def bench_memory(template, devices, pci):
+    """
+    测试加载大型平台描述和PCI设备列表时的内存占用。
+    """
+    with open(template, "rt", encoding='utf8') as f:
+        value = json.load(f)
+
+    cpu_dict = copy.deepcopy(value['platform']['cpu'])
+    src_devices = list(cpu_dict['devices'].items())
+    src_regions = list(cpu_dict['regions'].items())
+    cpu_dict['devices'] = {f"{k}_{i}": v for i in range(devices//len(src_devices)+1) for k, v in src_devices}
+    cpu_dict['regions'] = {f"{k}_{i}": v for i in range(devices//len(src_regions)+1) for k, v in src_regions}
+
+    src_pci = value['jailhouse']['pci_devices']['devices']
+    pci_dict = {'devices': [dict(src_pci[i % len(src_pci)], path=f"/sys/bus/pci/devices/{i}") for i in range(pci)]}
+
+    def _load_cpu():
+        cpu = ResourceCPU(None)
+        return cpu if cpu.from_dict(cpu_dict) else None
+
+    def _load_pci():
+        pci_devices = ResourcePCIDeviceList(None)
+        return pci_devices if pci_devices.from_dict(pci_dict) else None
+
+    used, cpu = traced(_load_cpu)
+    if cpu is None:
+        print("cpu from dict failed.")
+        return False
+    print(f"platform  {len(cpu.devices())} devices, {len(cpu.regions())} regions: {used/1024/1024:.2f}MB")
+
+    used, pci_devices = traced(_load_pci)
+    if pci_devices is None:
+        print("pci devices from dict failed.")
+        return False
+    caps = sum(len(pci_devices.device_at(i).caps()) for i in range(pci_devices.device_count()))
+    print(f"pci       {pci_devices.device_count()} devices, {caps} caps: {used/1024/1024:.2f}MB")
+
+    # 与带__dict__的实现比较单个对象的内存占用
+    count = 10000
+    samples = [
+        ("MemRegion", lambda c: c(0x1000, 0x1000)),
+        ("MemMap", lambda c: c(0x1000, 0x1000, 0x1000)),
+        ("CPUDevice", lambda c: c("uart0")),
+        ("CPURegion", lambda c: c("ram0")),
+        ("PCICap", lambda c: c()),
+        ("PCIBar", lambda c: c()),
+    ]
+    types = {
+        "MemRegion": MemRegion, "MemMap": MemMap,
+        "CPUDevice": CPUDevice, "CPURegion": CPURegion,
+        "PCICap": ResourcePCIDevice.PCICap, "PCIBar": ResourcePCIDevice.PCIBar,
+    }
+    for name, new in samples:
+        _type = types[name]
+        # 不声明__slots__的子类会重新带上__dict__
+        dict_type = type(f"{name}WithDict", (_type, ), {})
+        slots, _ = traced(lambda: [new(_type) for _ in range(count)])
+        dicts, _ = traced(lambda: [new(dict_type) for _ in range(count)])
+        print(f"{name:<10} {slots/count:6.0f} bytes/object, with __dict__ {dicts/count:6.0f} bytes/object")
+    return True
+
+
+if __name__ == '__main__':
+    cli()
@@ -67,7 +67,7 @@ class BoardWidget(QtWidgets.QWidget):
         self._board_mem_editor.set_regions(board.ram_regions())
 
     def _on_rsc_modified(self, sender, **kwargs):
-        if sender is not self._board:
+        if self._board not in ResourceSignals.nodes(sender, kwargs):
             return
         self._update()
 
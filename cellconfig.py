@@ -1,5 +1,8 @@
 import enum
 import ctypes
+import struct
+import logging
+from typing import Dict, List, Optional, Tuple
 
 _U8 = ctypes.c_uint8
 _U16 = ctypes.c_uint16
@@ -112,6 +115,25 @@ class jailhouse_console(ctypes.Structure):
     ]
 
 
+class jailhouse_cache(ctypes.Structure):
+    _pack_ = 1
+    _fields_ = [
+        ('start', _U32),
+        ('size', _U32),
+        ('type', _U8),
+        ('padding', _U8),
+        ('flags', _U16),
+    ]
+
+
+class jailhouse_pio(ctypes.Structure):
+    _pack_ = 1
+    _fields_ = [
+        ('base', _U16),
+        ('length', _U16),
+    ]
+
+
 class jailhouse_irqchip(ctypes.Structure):
     _pack_ = 1
     _fields_ = [
@@ -265,6 +287,8 @@ class Revision13:
     irqchip = jailhouse_irqchip
     pci_device = jailhouse_pci_device_r13
     pci_capability = jailhouse_pci_capability
+    cache = jailhouse_cache
+    pio = jailhouse_pio
 
 
 class Revision14:
@@ -277,3 +301,317 @@ class Revision14:
     irqchip = jailhouse_irqchip
     pci_device = jailhouse_pci_device_r14
     pci_capability = jailhouse_pci_capability
+    cache = jailhouse_cache
+    pio = jailhouse_pio
+
+
+class StructLayout(object):
+    """
+    由ctypes结构体推导出的struct.Struct布局。
+
+    嵌套结构体展开为"a.b"形式的字段名，结构体数组展开为"a[0].b"，
+    标量数组和字符数组作为一个字段，union只展开unions中选择的成员，其余按填充字节处理。
+    """
+    _SCALARS = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+    def __init__(self, ctype, unions: Optional[Dict[str, str]] = None):
+        self.ctype = ctype
+        self.size = ctypes.sizeof(ctype)
+        # 字段名 -> (参数起始位置, 参数个数)，参数个数为0表示字符数组
+        self._index: Dict[str, Tuple[int, int]] = dict()
+        # 字符数组字段名 -> 长度，struct的"s"格式会截断过长的值，写入前检查
+        self._lengths: Dict[str, int] = dict()
+        fmt = list()
+        defaults = list()
+        end = self._flatten(ctype, "", 0, 0, unions or dict(), fmt, defaults)
+        if end < self.size:
+            fmt.append(f"{self.size-end}x")
+        self.struct = struct.Struct("<" + "".join(fmt))
+        if self.struct.size != self.size:
+            raise ValueError(f"layout of {ctype.__name__} is {self.struct.size} bytes, expected {self.size}")
+        self._defaults = tuple(defaults)
+
+    def _flatten(self, ctype, prefix: str, base: int, pos: int, unions: dict, fmt: list, defaults: list) -> int:
+        for field in ctype._fields_:
+            name, ftype = field[0], field[1]
+            offset = base + getattr(ctype, name).offset
+            if offset > pos:
+                fmt.append(f"{offset-pos}x")
+            pos = self._field(ftype, prefix + name, offset, unions, fmt, defaults)
+        return pos
+
+    def _field(self, ftype, name: str, offset: int, unions: dict, fmt: list, defaults: list) -> int:
+        end = offset + ctypes.sizeof(ftype)
+        if issubclass(ftype, ctypes.Union):
+            member = unions.get(ftype.__name__)
+            if member is None:
+                fmt.append(f"{end-offset}x")
+                return end
+            mtype = dict((f[0], f[1]) for f in ftype._fields_)[member]
+            pos = self._field(mtype, f"{name}.{member}", offset, unions, fmt, defaults)
+            if pos < end:
+                fmt.append(f"{end-pos}x")
+            return end
+        if issubclass(ftype, ctypes.Structure):
+            return self._flatten(ftype, f"{name}.", offset, offset, unions, fmt, defaults)
+        if issubclass(ftype, ctypes.Array):
+            etype = ftype._type_
+            if etype is ctypes.c_char:
+                self._index[name] = (len(defaults), 0)
+                self._lengths[name] = ftype._length_
+                fmt.append(f"{ftype._length_}s")
+                defaults.append(b"")
+                return end
+            if issubclass(etype, (ctypes.Structure, ctypes.Union, ctypes.Array)):
+                pos = offset
+                for i in range(ftype._length_):
+                    pos = self._field(etype, f"{name}[{i}]", pos, unions, fmt, defaults)
+                return end
+            self._index[name] = (len(defaults), ftype._length_)
+            fmt.append(f"{ftype._length_}{self._SCALARS[ctypes.sizeof(etype)]}")
+            defaults.extend([0]*ftype._length_)
+            return end
+        self._index[name] = (len(defaults), 1)
+        fmt.append(self._SCALARS[ctypes.sizeof(ftype)])
+        defaults.append(0)
+        return end
+
+    def fields(self):
+        return self._index.keys()
+
+    def pack_into(self, buffer, offset: int, values: dict):
+        """
+        按字段名写入buffer，未指定的字段为0
+        与ctypes一致，字符数组的值超过长度时抛出ValueError
+        """
+        args = list(self._defaults)
+        for name, value in values.items():
+            start, count = self._index[name]
+            if count == 0 and len(value) > self._lengths[name]:
+                raise ValueError(f"bytes too long ({len(value)}, maximum length {self._lengths[name]})")
+            if count <= 1:
+                args[start] = value
+            else:
+                args[start:start+count] = value
+        self.struct.pack_into(buffer, offset, *args)
+
+
+class CellLayout(object):
+    """
+    某个配置版本中各结构体的StructLayout，每个版本只推导一次
+    """
+    _layouts = dict()
+
+    def __init__(self, rev):
+        self.revision = rev
+        self.system = StructLayout(rev.system, {"PlatformInfoUnion": "arm"})
+        self.cell_desc = StructLayout(rev.cell_desc)
+        self.memory = StructLayout(rev.memory)
+        self.irqchip = StructLayout(rev.irqchip)
+        self.pci_device = StructLayout(rev.pci_device)
+        self.pci_capability = StructLayout(rev.pci_capability)
+        # cpu位图，只使用一个64位的值
+        self.cpu_set = struct.Struct("<Q")
+
+    @classmethod
+    def get(cls, rev) -> 'CellLayout':
+        layout = cls._layouts.get(rev)
+        if layout is None:
+            layout = CellLayout(rev)
+            cls._layouts[rev] = layout
+        return layout
+
+
+class CellConfigReader(object):
+    """
+    读取root cell(JHSYST)或guest cell(JHCELL)二进制配置。
+
+    数据保存在一个bytearray中，头部、内存区域、irqchip、PCI设备等结构体通过from_buffer直接映射到数据上，
+    读取时不复制。传入只读的bytes时先复制一次到bytearray。
+    """
+    logger = logging.getLogger("CellConfigReader")
+
+    REVISIONS = {
+        Revision13.revision: Revision13,
+        Revision14.revision: Revision14,
+    }
+    # 展开字段时union只取选择的成员，未选择的union按原始字节比较
+    UNIONS = {"PlatformInfoUnion": "arm"}
+    # 展开字段的顺序
+    SECTIONS = ("system", "cell", "cpus", "mem_regions", "cache_regions", "irqchips",
+                "pio_regions", "pci_devices", "pci_caps", "stream_ids")
+
+    def __init__(self, data, rev):
+        self._data = memoryview(data)
+        self._rev = rev
+        self._sections: Dict[str, object] = dict()
+
+    @classmethod
+    def parse(cls, data) -> Optional['CellConfigReader']:
+        """
+        解析二进制配置，失败返回None
+        """
+        view = memoryview(data)
+        if view.readonly:
+            data = bytearray(view)
+        if len(data) < 8:
+            cls.logger.error(f"config too short: {len(data)} bytes")
+            return None
+        signature = bytes(data[0:6])
+        revision = int.from_bytes(data[6:8], "little")
+        rev = cls.REVISIONS.get(revision)
+        if rev is None:
+            cls.logger.error(f"unsupported revision {revision}")
+            return None
+
+        reader = CellConfigReader(data, rev)
+        try:
+            if signature == rev.sys_signature:
+                system = rev.system.from_buffer(data, 0)
+                reader._sections["system"] = system
+                cell = system.root_cell
+                offset = ctypes.sizeof(rev.system)
+            elif signature == rev.cell_signature:
+                cell = rev.cell_desc.from_buffer(data, 0)
+                reader._sections["cell"] = cell
+                offset = ctypes.sizeof(rev.cell_desc)
+            else:
+                cls.logger.error(f"invalid signature {signature}")
+                return None
+
+            # 与jailhouse的cell-config.h中的顺序一致
+            layout = (
+                ("cpus", ctypes.c_uint8, cell.cpu_set_size),
+                ("mem_regions", rev.memory, cell.num_memory_regions),
+                ("cache_regions", rev.cache, cell.num_cache_regions),
+                ("irqchips", rev.irqchip, cell.num_irqchips),
+                ("pio_regions", rev.pio, cell.num_pio_regions),
+                ("pci_devices", rev.pci_device, cell.num_pci_devices),
+                ("pci_caps", rev.pci_capability, cell.num_pci_caps),
+                ("stream_ids", ctypes.c_uint32, cell.num_stream_ids),
+            )
+            for name, ctype, count in layout:
+                array = (ctype*count).from_buffer(data, offset)
+                reader._sections[name] = array
+                offset += ctypes.sizeof(array)
+        except ValueError as e:
+            cls.logger.error(f"config truncated: {e}")
+            return None
+        if offset != len(data):
+            cls.logger.error(f"config size {len(data)} does not match header, expected {offset}")
+            return None
+        return reader
+
+    @classmethod
+    def open(cls, filename: str) -> Optional['CellConfigReader']:
+        try:
+            with open(filename, "rb") as f:
+                data = bytearray(f.read())
+        except OSError as e:
+            cls.logger.error(f"read {filename} failed: {e}")
+            return None
+        return cls.parse(data)
+
+    def data(self) -> memoryview:
+        return self._data
+
+    def revision(self):
+        return self._rev
+
+    def is_system(self) -> bool:
+        return "system" in self._sections
+
+    def system(self) -> Optional[jailhouse_system]:
+        return self._sections.get("system")
+
+    def cell(self) -> jailhouse_cell_desc:
+        system = self.system()
+        if system is not None:
+            return system.root_cell
+        return self._sections["cell"]
+
+    def name(self) -> str:
+        return self.cell().name.decode(errors="replace")
+
+    def cpu_set(self) -> int:
+        return int.from_bytes(bytes(self._sections["cpus"]), "little")
+
+    def section(self, name: str):
+        """
+        返回name对应的结构体数组，name为SECTIONS中除system和cell外的值
+        """
+        return self._sections[name]
+
+    def mem_regions(self):
+        return self._sections["mem_regions"]
+
+    def irqchips(self):
+        return self._sections["irqchips"]
+
+    def pci_devices(self):
+        return self._sections["pci_devices"]
+
+    def pci_caps(self):
+        return self._sections["pci_caps"]
+
+    @classmethod
+    def _flatten(cls, value, path: str, out: Dict[str, object]):
+        if isinstance(value, ctypes.Union):
+            member = cls.UNIONS.get(type(value).__name__)
+            if member is None:
+                out[path] = bytes(value).hex()
+            else:
+                cls._flatten(getattr(value, member), f"{path}.{member}", out)
+        elif isinstance(value, ctypes.Structure):
+            for field in value._fields_:
+                cls._flatten(getattr(value, field[0]), f"{path}.{field[0]}", out)
+        elif isinstance(value, ctypes.Array):
+            for idx, item in enumerate(value):
+                cls._flatten(item, f"{path}[{idx}]", out)
+        elif isinstance(value, bytes):
+            out[path] = value.decode(errors="replace")
+        else:
+            out[path] = value
+
+    def fields(self) -> Dict[str, object]:
+        """
+        按SECTIONS的顺序展开所有字段，返回 字段路径 -> 值，例如"mem_regions[2].size"
+        """
+        out = dict()
+        for name in self.SECTIONS:
+            if name == "cpus":
+                out["cpus"] = self.cpu_set()
+            elif name in self._sections:
+                self._flatten(self._sections[name], name, out)
+        return out
+
+    def diff(self, other: 'CellConfigReader') -> List[Tuple[str, object, object]]:
+        """
+        比较两个配置，返回变化的字段 [(字段路径, 原值, 新值)]，只存在于一方的字段另一方的值为None
+        """
+        if self._data == other._data:
+            return list()
+        old = self.fields()
+        new = other.fields()
+        changes = list()
+        for path, value in old.items():
+            if new.get(path) != value:
+                changes.append((path, value, new.get(path)))
+        for path, value in new.items():
+            if path not in old:
+                changes.append((path, None, value))
+        return changes
+
+    @staticmethod
+    def changed_entries(changes: List[Tuple[str, object, object]]) -> List[str]:
+        """
+        将diff的结果归并到条目，例如"mem_regions[2]"、"irqchips[0].pin_bitmap"、"pci_devices[1]"
+        """
+        entries = list()
+        for path, _, _ in changes:
+            entry = path.split(".")[0]
+            if ".pin_bitmap[" in path:
+                entry = path[:path.index("[", path.index(".pin_bitmap"))]
+            if entry not in entries:
+                entries.append(entry)
+        return entries
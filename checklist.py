@@ -2,11 +2,11 @@ import os
 import abc
 import click
 import itertools
-from typing import List
+from typing import List, Tuple
 from jh_resource import ResourceBase, Resource, ResourceBoard, ResourcePlatform, ResourceComm
 from jh_resource import ResourceJailhouse, ResourceRootCell
 from jh_resource import ResourceGuestCellList, ResourceGuestCell
-from jh_resource import MemRegion, MemMap, MemRegionList
+from jh_resource import MemRegion, MemMap, MemRegionList, RegionSweep, RegionSet
 from jh_resource import ResourceMgr
 from jh_resource import CommonOSRunInfo, LinuxRunInfo, ACoreRunInfo
 
@@ -90,9 +90,9 @@ class Checklist(object):
                 item.failed(f'{r.name()} 起始地址为按4K对齐')
             if r.size() & (4096-1) > 0:
                 item.failed(f'{r.name()} 大小未按4K对齐')
-        for r1, r2, in itertools.combinations(regions, 2):
-            if MemRegion(r1.addr(), r1.size()).is_overlap(MemRegion(r2.addr(), r2.size())):
-                item.failed(f"{r1.name()}({r1.size():x}@{r1.addr():x}) 与 {r2.name()}({r2.size():x}@{r2.addr():x}) 地址空间重叠")
+        for i, j in RegionSweep.regions(regions):
+            r1, r2 = regions[i], regions[j]
+            item.failed(f"{r1.name()}({r1.size():x}@{r1.addr():x}) 与 {r2.name()}({r2.size():x}@{r2.addr():x}) 地址空间重叠")
         results.append(item)
         return results
 
@@ -101,6 +101,7 @@ class Checklist(object):
         results = list()
         name = rootcell.name()
         board: ResourceBoard = rootcell.find(ResourceBoard)
+        board_mem = board.ram_region_list()
 
         item = CheckResult("检查rootcell名称")
         if not ResourceRootCell.check_name(name):
@@ -113,7 +114,7 @@ class Checklist(object):
         # * 应该在板级内存空间中
         item = CheckResult("检查hypervisor固件内存")
         mem = rootcell.hypervisor()
-        if not board.ram_region_list().contains(mem):
+        if not board_mem.contains(mem):
             item.failed(f"hypervisor固件内存 {mem} 未包含在板级内存中")
         if mem.size() < 2*1024*1024:
             item.failed(f"hypervisor固件内存 {mem} 空间太小")
@@ -126,7 +127,7 @@ class Checklist(object):
         # * 4K对齐
         # * 应该在板级内存空间中
         for mem in rootcell.system_mem():
-            if not board.ram_region_list().contains(mem):
+            if not board_mem.contains(mem):
                 item.failed(f"rootcell系统内存 {mem} 未包含在板级内存中")
             if not align_4k(mem.addr()) or not align_4k(mem.size()):
                 item.failed(f"rootcell系统内存 {mem} 未4K对齐")
@@ -134,6 +135,21 @@ class Checklist(object):
 
         return results
 
+    @staticmethod
+    def shared_pairs(sets: List[set]) -> List[Tuple[int, int]]:
+        """
+        返回包含相同元素的集合索引对(i, j)，i<j，按索引排序
+        通过元素到集合的反向索引查找，只比较确实共享元素的集合
+        """
+        owners = dict()
+        for idx, s in enumerate(sets):
+            for v in s:
+                owners.setdefault(v, list()).append(idx)
+        pairs = set()
+        for indexes in owners.values():
+            pairs.update(itertools.combinations(indexes, 2))
+        return sorted(pairs)
+
     @classmethod
     def conflict_check(cls, rsc: Resource) -> List[CheckResult]:
         """
@@ -157,9 +173,8 @@ class Checklist(object):
         for guestcell in guestcells:
             for mem in guestcell.system_mem():
                 memorys.append( (f"guestcell({guestcell.name()}) {mem.size():x}@{mem.phys():x}~{mem.phys()+mem.size():x}", MemRegion(mem.phys(), mem.size())) )
-        for r1, r2, in itertools.combinations(memorys, 2):
-            if r1[1].is_overlap(r2[1]):
-                item.failed(f"{r1[0]} 与 {r2[0]} 地址空间重叠")
+        for l1, l2 in RegionSweep.labeled(memorys):
+            item.failed(f"{l1} 与 {l2} 地址空间重叠")
         results.append(item)
 
         # 检查设备分配冲突
@@ -167,18 +182,19 @@ class Checklist(object):
         devices = list()
         for guestcell in guestcells:
             devices.append( (f"{guestcell.name()}", set(guestcell.devices())) )
-        for d1, d2, in itertools.combinations(devices, 2):
+        for i, j in cls.shared_pairs([d[1] for d in devices]):
+            d1, d2 = devices[i], devices[j]
             conflict = d1[1].intersection(d2[1])
-            if len(conflict) > 0:
-                item.failed(f"guestcell {d1[0]}和P{d2[0]} 包含相同的设备 {' '.join(conflict)}")
+            item.failed(f"guestcell {d1[0]}和P{d2[0]} 包含相同的设备 {' '.join(conflict)}")
         results.append(item)
 
         # 检查CPU分配冲突
         item = CheckResult("CPU分配冲突检查")
-        for c1, c2, in itertools.combinations(list(guestcells), 2):
+        cells = list(guestcells)
+        for i, j in cls.shared_pairs([c.cpus() for c in cells]):
+            c1, c2 = cells[i], cells[j]
             conflict = c1.cpus().intersection(c2.cpus())
-            if len(conflict) > 0:
-                item.failed(f"guestcell {c1.name()}和P{c2.name()} 包含相同的CPU {conflict}")
+            item.failed(f"guestcell {c1.name()}和P{c2.name()} 包含相同的CPU {conflict}")
         guestcells_cpus = set()
         for cell in guestcells:
             guestcells_cpus = guestcells_cpus.union(cell.cpus())
@@ -248,9 +264,8 @@ class Checklist(object):
         for mem in cell.memmaps():
             region = MemRegion(mem.virt(), mem.size())
             memorys.append( (f"地址空间映射 {region}", region) )
-        for r1, r2, in itertools.combinations(memorys, 2):
-            if r1[1].is_overlap(r2[1]):
-                item.failed(f"{r1[0]} 与 {r2[0]} 地址空间重叠")
+        for l1, l2 in RegionSweep.labeled(memorys):
+            item.failed(f"{l1} 与 {l2} 地址空间重叠")
         results.append(item)
 
         return results
@@ -266,9 +281,8 @@ class Checklist(object):
         runinfo = guestcell.runinfo()
         os_runinfo = runinfo.os_runinfo()
 
-        virt_regions = MemRegionList()
-        for mem in guestcell.system_mem_normal():
-            virt_regions.add(mem.virt(), mem.phys())
+        # 相邻的系统内存合并后检查，镜像可以跨越多段系统内存
+        virt_regions = RegionSet((mem.virt(), mem.size()) for mem in guestcell.system_mem_normal())
 
         # 通用系统
         if isinstance(os_runinfo, CommonOSRunInfo):
@@ -288,18 +302,18 @@ class Checklist(object):
                 item = CheckResult(f"检查 {cellname} 镜像 {image}")
                 if len(image.filename.strip()) == 0:
                     item.failed("未指定镜像文件名")
-                if not virt_regions.contains(MemRegion(image.addr,4)):
+                if not virt_regions.covers(image.addr, 4):
                     item.failed("镜像起始地址未包含在虚拟地址空间中")
                 if os.path.isfile(rsc.abs_path(image.filename)):
                     size = os.path.getsize(rsc.abs_path(image.filename))
-                    if not virt_regions.contains(MemRegion(image.addr,size)):
+                    if not virt_regions.covers(image.addr, size):
                         item.failed("镜像内容未包含在虚拟地址空间中")
                 else:
                     item.failed("镜像文件不存在")
                 results.append(item)
 
             item = CheckResult(f"检查 {cellname} 入口地址")
-            if not virt_regions.contains(MemRegion(os_runinfo.reset_addr(),4)):
+            if not virt_regions.covers(os_runinfo.reset_addr(), 4):
                 item.failed("入口地址不在虚拟地址空间中")
             results.append(item)
 
@@ -330,7 +344,7 @@ class Checklist(object):
             msl = os_runinfo.msl
             if os.path.isfile(rsc.abs_path(msl.filename)):
                 size = os.path.getsize(rsc.abs_path(msl.filename))
-                if not virt_regions.contains(MemRegion(msl.addr,size)):
+                if not virt_regions.covers(msl.addr, size):
                     item.failed("镜像内容未包含在虚拟地址空间中")
             else:
                 item.failed("MSL镜像不存在")
@@ -341,7 +355,7 @@ class Checklist(object):
             os_img = os_runinfo.os
             if os.path.isfile(rsc.abs_path(os_img.filename)):
                 size = os.path.getsize(rsc.abs_path(os_img.filename))
-                if not virt_regions.contains(MemRegion(os_img.addr,size)):
+                if not virt_regions.covers(os_img.addr, size):
                     item.failed("镜像内容未包含在虚拟地址空间中")
             else:
                 item.failed("OS镜像不存在")
@@ -351,7 +365,7 @@ class Checklist(object):
                 app_img = os_runinfo.app
                 if os.path.isfile(rsc.abs_path(app_img.filename)):
                     size = os.path.getsize(rsc.abs_path(app_img.filename))
-                    if not virt_regions.contains(MemRegion(app_img.addr,size)):
+                    if not virt_regions.covers(app_img.addr, size):
                         item.failed("镜像内容未包含在虚拟地址空间中")
                 else:
                     item.failed("APP镜像不存在")
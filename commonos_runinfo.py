@@ -14,7 +14,6 @@
 """
 
 import os
-import copy
 import logging
 from typing import List
 from hashlib import md5
@@ -84,7 +83,7 @@ class ImageInfoWidget(QtWidgets.QWidget):
         Args:
             image_info: 要设置的镜像信息对象
         """
-        self._imageinfo = copy.deepcopy(image_info)
+        self._imageinfo = image_info.snapshot()
         self._ui.lineedit_name.setText(image_info.name)
         self._ui.lineedit_load_addr.setText(to_human_addr(image_info.addr))
         self._ui.lineedit_filename.setText(image_info.filename)
@@ -101,7 +100,7 @@ class ImageInfoWidget(QtWidgets.QWidget):
             return
         self._ui.lineedit_filename.setText(filename)
         if self._imageinfo.filename != filename:
-            self._imageinfo.filename = filename
+            self._imageinfo = self._imageinfo.replace(filename=filename)
             self.changed.emit()
 
     def _on_remove(self):
@@ -120,7 +119,7 @@ class ImageInfoWidget(QtWidgets.QWidget):
         """
         en = self._ui.checkbox_enable.isChecked()
         if self._imageinfo.enable != en:
-            self._imageinfo.enable = en
+            self._imageinfo = self._imageinfo.replace(enable=en)
             self.changed.emit()
 
     def _on_name_changed(self):
@@ -131,7 +130,7 @@ class ImageInfoWidget(QtWidgets.QWidget):
         """
         name = self._ui.lineedit_name.text().strip()
         if name != self._imageinfo.name:
-            self._imageinfo.name = name
+            self._imageinfo = self._imageinfo.replace(name=name)
             self.changed.emit()
 
     def _on_addr_changed(self):
@@ -145,7 +144,7 @@ class ImageInfoWidget(QtWidgets.QWidget):
             return
 
         if addr != self._imageinfo.addr:
-            self._imageinfo.addr = addr
+            self._imageinfo = self._imageinfo.replace(addr=addr)
             self.changed.emit()
 
     def _on_file_changed(self):
@@ -156,7 +155,7 @@ class ImageInfoWidget(QtWidgets.QWidget):
         """
         filename = self._ui.lineedit_filename.text().strip()
         if filename != self._imageinfo.filename:
-            self._imageinfo.filename = filename
+            self._imageinfo = self._imageinfo.replace(filename=filename)
             self.changed.emit()
 
 
@@ -191,9 +190,10 @@ class OSRunInfoWidget(QtWidgets.QWidget):
         获取当前运行信息。
         
         Returns:
-            OSRunInfoBase: 运行信息对象的副本
+            OSRunInfoBase: 运行信息的只读快照，未修改时每次返回同一个对象
         """
-        return copy.deepcopy(self._runinfo)
+        self._runinfo = self._runinfo.snapshot()
+        return self._runinfo
 
     def load_resource_table(self, cell: ResourceGuestCell) -> bool:
         """
@@ -339,7 +339,7 @@ class CommonOSRunInfoWidget(OSRunInfoWidget):
             w.changed.connect(self._on_image_changed)
         self._ui.lineedit_reset_addr.setText(to_human_addr(runinfo.reset_addr()))
 
-        self._runinfo = copy.deepcopy(runinfo)
+        self._runinfo = runinfo.snapshot()
 
         # 处理事件后，外面才能获取正确的sizeHint
         QtWidgets.QApplication.instance().processEvents()
@@ -350,9 +350,8 @@ class CommonOSRunInfoWidget(OSRunInfoWidget):
         
         从界面收集当前配置，更新内部运行信息对象。
         """
-        self._runinfo.clear_image()
-        for w in self._images:
-            self._runinfo.add_image(w.get_imageinfo())
+        images = [w.get_imageinfo() for w in self._images]
+        self._runinfo = self._runinfo.replace(images=images)
 
     def _on_image_changed(self):
         """
@@ -403,7 +402,7 @@ class CommonOSRunInfoWidget(OSRunInfoWidget):
             self._ui.lineedit_reset_addr.setText(to_human_addr(self._runinfo.reset_addr()))
             return
 
-        self._runinfo.set_reset_addr(value)
+        self._runinfo = self._runinfo.replace(reset_addr=value)
         self.value_changed.emit()
 
     def run(self, cell: ResourceGuestCell) -> bool:
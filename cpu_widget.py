@@ -140,7 +140,7 @@ class CPUWidget(QtWidgets.QWidget):
             sender: 发送信号的对象
             kwargs: 附加参数
         """
-        if sender is not self._cpu:
+        if self._cpu not in ResourceSignals.nodes(sender, kwargs):
             return
         self._update()
 
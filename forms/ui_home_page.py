@@ -81,6 +81,11 @@ class Ui_HomePageWidget(object):
 
         self.horizontalLayout.addWidget(self.btn_open)
 
+        self.btn_workspace = QPushButton(self.frame_new2)
+        self.btn_workspace.setObjectName(u"btn_workspace")
+
+        self.horizontalLayout.addWidget(self.btn_workspace)
+
         self.horizontalSpacer = QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
 
         self.horizontalLayout.addItem(self.horizontalSpacer)
@@ -118,5 +123,6 @@ class Ui_HomePageWidget(object):
         self.label_home.setText(QCoreApplication.translate("HomePageWidget", u"\u9996\u9875", None))
         self.btn_new.setText(QCoreApplication.translate("HomePageWidget", u"\u65b0\u5efa\u914d\u7f6e", None))
         self.btn_open.setText(QCoreApplication.translate("HomePageWidget", u"\u6253\u5f00\u914d\u7f6e", None))
+        self.btn_workspace.setText(QCoreApplication.translate("HomePageWidget", u"\u6253\u5f00\u76ee\u5f55", None))
     # retranslateUi
 
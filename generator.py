@@ -15,18 +15,28 @@ Jailhouse配置生成器模块。
 """
 
 import logging
-from typing import TypedDict, List, Optional
-import ctypes
+import os
+import sys
+import enum
+import functools
+import contextlib
+import time
+import hashlib
+import marshal
+import weakref
+import concurrent.futures
+from typing import TypedDict, List, Optional, Callable, Union
 from mako.template import Template
+from mako.lookup import TemplateLookup
 from mako import exceptions
 from jh_resource import Resource, ResourceGuestCell, ResourceCPU, ResourceGuestCellList, ResourcePCIDeviceList, ResourceRootCell
-from jh_resource import ResourceComm, ARMArch
-from jh_resource import ResourceMgr, PlatformMgr
+from jh_resource import ResourceComm, ARMArch, RegionSet
+from jh_resource import ResourceMgr, PlatformMgr, JsonCodec, LinuxRunInfo
 from utils import get_template_path
 import click
 import fdt
 import cellconfig
-from cellconfig import Revision14
+from cellconfig import Revision14, CellLayout, CellConfigReader
 import json
 
 logger = logging.getLogger("generator")
@@ -77,13 +87,225 @@ class JailhouseMemory:
         self.flag = flag
 
 
+class GeneratorTrace(object):
+    """
+    生成过程的分阶段统计和调试输出。
+    
+    默认关闭，开启后(enabled为True或注册了hook)记录每个阶段的调用次数、耗时和净增的内存块数，
+    阶段包括:
+    - kwargs: 生成参数的计算
+    - render: 模板渲染
+    - pack: 二进制配置的ctypes打包
+    - dts_parse: DTS解析
+    - dtb_emit: DTB输出
+    
+    调试数据(如生成参数)只在设置了dump_sink时输出。
+    """
+    logger = logging.getLogger("GeneratorTrace")
+
+    enabled = False
+    # 阶段名称 -> [调用次数, 耗时(秒), 净增内存块数]
+    _stages = dict()
+    # hook(阶段名称, 耗时, 净增内存块数)
+    _hooks: List[Callable[[str, float, int], None]] = list()
+    # None: 不输出；目录: 写入<目录>/<名称>.json；函数: sink(名称, 数据)
+    dump_sink: Union[None, str, Callable[[str, dict], None]] = None
+
+    @classmethod
+    def add_hook(cls, hook: Callable[[str, float, int], None]):
+        cls._hooks.append(hook)
+
+    @classmethod
+    def remove_hook(cls, hook: Callable[[str, float, int], None]):
+        if hook in cls._hooks:
+            cls._hooks.remove(hook)
+
+    @classmethod
+    @contextlib.contextmanager
+    def stage(cls, name: str):
+        """
+        统计with语句块，未开启时不做任何事
+        """
+        if not cls.enabled and len(cls._hooks) == 0:
+            yield
+            return
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            used = time.perf_counter() - start
+            blocks = sys.getallocatedblocks() - blocks
+            cls.record(name, used, blocks)
+
+    @classmethod
+    def traced(cls, name: str):
+        """
+        装饰器，统计整个函数调用
+        """
+        def decorator(fun):
+            @functools.wraps(fun)
+            def wrapper(*args, **kwargs):
+                with cls.stage(name):
+                    return fun(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @classmethod
+    def record(cls, name: str, seconds: float, blocks: int, count: int = 1):
+        if cls.enabled:
+            item = cls._stages.get(name)
+            if item is None:
+                item = [0, 0.0, 0]
+                cls._stages[name] = item
+            item[0] += count
+            item[1] += seconds
+            item[2] += blocks
+        for hook in cls._hooks:
+            hook(name, seconds, blocks)
+
+    @classmethod
+    def report(cls) -> dict:
+        return {name: {"count": item[0], "seconds": item[1], "blocks": item[2]} for name, item in cls._stages.items()}
+
+    @classmethod
+    def since(cls, report: dict) -> dict:
+        """
+        返回report之后新增的统计
+        """
+        result = dict()
+        for name, item in cls.report().items():
+            old = report.get(name, {"count": 0, "seconds": 0.0, "blocks": 0})
+            if item["count"] != old["count"]:
+                result[name] = {k: item[k] - old[k] for k in item}
+        return result
+
+    @classmethod
+    def merge(cls, report: dict):
+        """
+        合并其他进程的统计
+        """
+        for name, item in report.items():
+            cls.record(name, item["seconds"], item["blocks"], item["count"])
+
+    @classmethod
+    def reset(cls):
+        cls._stages.clear()
+
+    @classmethod
+    def format_report(cls, report: Optional[dict] = None) -> str:
+        if report is None:
+            report = cls.report()
+        lines = [f"{'stage':<12}{'count':>8}{'total(ms)':>12}{'avg(ms)':>10}{'blocks':>10}"]
+        for name, item in report.items():
+            avg = item["seconds"] / item["count"] if item["count"] else 0.0
+            lines.append(f"{name:<12}{item['count']:>8}{item['seconds']*1000:>12.3f}{avg*1000:>10.3f}{item['blocks']:>10}")
+        return "\n".join(lines)
+
+    @classmethod
+    def dump(cls, name: str, value: dict):
+        """
+        向dump_sink输出调试数据
+        """
+        sink = cls.dump_sink
+        if sink is None:
+            return
+        if callable(sink):
+            sink(name, value)
+            return
+        filename = os.path.join(sink, f"{name}.json")
+        try:
+            os.makedirs(sink, exist_ok=True)
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False, indent=4, default=GeneratorCommon.json_default)
+        except (OSError, TypeError, ValueError) as e:
+            cls.logger.warning(f"dump {filename} failed: {e}")
+            return
+        cls.logger.info(f"配置数据已保存到: {filename}")
+
+
 class GeneratorCommon(object):
     """
     配置生成器通用功能类。
     
     提供了生成Jailhouse配置时需要的通用功能。
     """
-    
+    # 模板目录 -> TemplateLookup，已编译的模板保存在lookup中
+    _lookups = dict()
+    # 资源节点 -> (资源树版本号, {名称: 生成参数})
+    _derived = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def cached(cls, node, name: str, fun):
+        """
+        获取节点的生成参数。
+        
+        结果按资源树的版本号缓存，资源树被修改后版本号变化，缓存失效。
+        返回的值在多个生成函数之间共享，调用者不能修改。
+        
+        Args:
+            node: 资源节点
+            name: 参数名称，同一节点内唯一
+            fun: 计算函数，参数为node
+            
+        Returns:
+            fun(node)的返回值
+        """
+        revision = node.revision()
+        entry = cls._derived.get(node)
+        if entry is None or entry[0] != revision:
+            entry = (revision, dict())
+            cls._derived[node] = entry
+        values = entry[1]
+        if name not in values:
+            values[name] = fun(node)
+        return values[name]
+
+    @staticmethod
+    def json_default(value):
+        """
+        json.dump的default参数，转换生成参数中不能直接序列化的值
+        """
+        if isinstance(value, enum.Enum):
+            return f"{type(value).__name__}.{value.name}"
+        if isinstance(value, (set, frozenset)):
+            return sorted(value)
+        return repr(value)
+
+    @classmethod
+    def get_template(cls, name: str) -> Template:
+        """
+        获取编译后的模板。
+        
+        同一模板目录共享一个TemplateLookup，模板只在第一次使用或文件修改时间变化后编译。
+        编译生成的Python模块保存在PlatformMgr.cache_dir下，重新启动后也不需要重新编译。
+        
+        Args:
+            name: 模板文件名
+            
+        Returns:
+            模板对象，模板不存在时抛出异常
+        """
+        path = os.path.abspath(os.path.dirname(get_template_path(name)))
+        lookup = cls._lookups.get(path)
+        if lookup is None:
+            module_dir = None
+            if PlatformMgr.cache_dir:
+                # 不同目录下的同名模板使用不同的模块目录
+                key = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+                module_dir = os.path.join(PlatformMgr.cache_dir, "mako", key)
+                try:
+                    os.makedirs(module_dir, exist_ok=True)
+                except OSError as e:
+                    logger.warning(f"create template cache dir {module_dir} failed: {e}")
+                    module_dir = None
+            # 与文本模式读取一致，统一换行符
+            lookup = TemplateLookup(directories=[path], module_directory=module_dir,
+                                    input_encoding='utf-8', filesystem_checks=True,
+                                    preprocessor=lambda text: text.replace('\r\n', '\n').replace('\r', '\n'))
+            cls._lookups[path] = lookup
+        return lookup.get_template(name)
+
     @staticmethod
     def get_ivshmem(rsc: Resource, cell: Optional[ResourceGuestCell]=None ) -> Optional[dict]:
         """
@@ -131,6 +353,225 @@ class GeneratorCommon(object):
         }
 
 
+class ArtifactCache(object):
+    """
+    按生成输入寻址的磁盘缓存。
+    
+    缓存键是规范化后的生成输入(gen_kwargs等)、模板内容、生成代码和配置格式版本的SHA-256，
+    输入不变时直接返回上次生成的数据，跳过模板渲染、二进制打包和dtb编译。
+    只修改一个cell后重新生成，其余cell都会命中缓存。
+    
+    缓存总大小超过max_size时按最近使用时间删除旧的文件。
+    """
+    logger = logging.getLogger("ArtifactCache")
+
+    # 缓存格式变化时递增，使已有的缓存失效，生成代码的变化由code_digest覆盖
+    REVISION = 1
+
+    # None表示使用PlatformMgr.cache_dir下的artifacts目录，使用时确定
+    cache_dir: Optional[str] = None
+    enabled = os.environ.get("JH_ARTIFACT_CACHE", "1") != "0"
+    # 缓存总大小上限(字节)
+    max_size = int(os.environ.get("JH_ARTIFACT_CACHE_SIZE", 64*1024*1024))
+
+    # 上次清理后写入的字节数，None表示本进程还没有清理过
+    _written: Optional[int] = None
+
+    hits = 0
+    misses = 0
+
+    # 模板路径 -> (修改时间, 大小, 内容哈希)
+    _templates = dict()
+    # generator和cellconfig代码的哈希，每个进程计算一次
+    _code_digest: Optional[str] = None
+
+    @classmethod
+    def code_digest(cls) -> str:
+        """
+        生成代码(generator.py和cellconfig.py)的哈希，缓存目录在不同版本之间共享，
+        代码变化后已有的缓存不再命中
+        """
+        if cls._code_digest is not None:
+            return cls._code_digest
+        h = hashlib.sha256()
+        try:
+            for module in (sys.modules[__name__], cellconfig):
+                try:
+                    with open(module.__file__, "rb") as f:
+                        h.update(f.read())
+                except (OSError, TypeError):
+                    # 打包后没有源码文件，使用编译后的代码
+                    h.update(marshal.dumps(module.__loader__.get_code(module.__name__)))
+            cls._code_digest = h.hexdigest()
+        except Exception as e:
+            # 无法确定代码版本时使用随机值，只在本进程内命中
+            cls.logger.warning(f"get generator code digest failed: {e}")
+            cls._code_digest = os.urandom(32).hex()
+        return cls._code_digest
+
+    @classmethod
+    def template_digest(cls, name: str) -> str:
+        path = os.path.abspath(get_template_path(name))
+        st = os.stat(path)
+        entry = cls._templates.get(path)
+        if entry is None or entry[0] != st.st_mtime_ns or entry[1] != st.st_size:
+            with open(path, "rb") as f:
+                entry = (st.st_mtime_ns, st.st_size, hashlib.sha256(f.read()).hexdigest())
+            cls._templates[path] = entry
+        return entry[2]
+
+    @classmethod
+    def key(cls, kind: str, inputs, template: Optional[str] = None) -> str:
+        """
+        计算缓存键。
+        
+        Args:
+            kind: 文件类型，如"guest.cell"
+            inputs: 生成输入，必须能转换为JSON
+            template: 使用的模板文件名，模板内容参与计算
+            
+        Returns:
+            十六进制的SHA-256
+        """
+        data = {
+            "revision": [cls.REVISION, Revision14.revision],
+            "code": cls.code_digest(),
+            "kind": kind,
+            "template": None if template is None else [template, cls.template_digest(template)],
+            "inputs": inputs,
+        }
+        text = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=GeneratorCommon.json_default)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def directory(cls) -> str:
+        """
+        缓存目录，未设置cache_dir时为PlatformMgr.cache_dir/artifacts，都未设置时为空字符串
+        """
+        if cls.cache_dir is not None:
+            return cls.cache_dir
+        if not PlatformMgr.cache_dir:
+            return ""
+        return os.path.join(PlatformMgr.cache_dir, "artifacts")
+
+    @classmethod
+    def _path(cls, key: str) -> str:
+        return os.path.join(cls.directory(), key[:2], key)
+
+    @classmethod
+    def get(cls, key: str) -> Optional[bytes]:
+        if not cls.enabled or not cls.directory():
+            return None
+        path = cls._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # 更新修改时间，清理时按最近使用排序
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    @classmethod
+    def put(cls, key: str, data: bytes) -> bool:
+        if not cls.enabled or not cls.directory():
+            return False
+        # 每个进程第一次写入时以及之后每写入max_size的1/8时清理一次
+        if cls._written is None or cls._written > cls.max_size // 8:
+            cls.prune()
+        path = cls._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        except OSError as e:
+            cls.logger.warning(f"create cache dir {os.path.dirname(path)} failed: {e}")
+            return False
+
+        def _write(fd):
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        if not JsonCodec.atomic_write(path, _write):
+            return False
+        cls._written += len(data)
+        return True
+
+    @classmethod
+    def prune(cls, max_size: Optional[int] = None) -> int:
+        """
+        缓存总大小超过max_size时，从最久未使用的文件开始删除，直到不超过max_size。
+        
+        Args:
+            max_size: 大小上限(字节)，默认为ArtifactCache.max_size，为0时清空缓存
+            
+        Returns:
+            删除的文件数
+        """
+        if max_size is None:
+            max_size = cls.max_size
+        cls._written = 0
+        directory = cls.directory()
+        if not directory or not os.path.isdir(directory):
+            return 0
+
+        files = list()
+        total = 0
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total <= max_size:
+            return 0
+
+        files.sort()
+        removed = 0
+        for _, size, path in files:
+            if total <= max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError as e:
+                cls.logger.warning(f"remove {path} failed: {e}")
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    @classmethod
+    def fetch(cls, kind: str, inputs, gen, template: Optional[str] = None) -> Optional[bytes]:
+        """
+        从缓存获取生成结果，未命中时调用gen生成并写入缓存。
+        
+        Args:
+            kind: 文件类型
+            inputs: 生成输入
+            gen: 生成函数，无参数，失败返回None，失败的结果不缓存
+            template: 使用的模板文件名
+            
+        Returns:
+            生成的数据，失败返回None
+        """
+        if not cls.enabled:
+            return gen()
+        key = cls.key(kind, inputs, template)
+        data = cls.get(key)
+        if data is not None:
+            cls.hits += 1
+            return data
+        cls.misses += 1
+        data = gen()
+        if data is not None:
+            cls.put(key, data)
+        return data
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {"hits": cls.hits, "misses": cls.misses}
+
+
 class RootCellGenerator(object):
     """
     根单元格配置生成器。
@@ -153,16 +594,16 @@ class RootCellGenerator(object):
         
         处理设备内存映射，包括:
         1. 获取所有设备的基本信息
-        2. 按地址排序设备列表
-        3. 合并相邻的设备内存区域
-        4. 处理内存对齐要求
+        2. 4K对齐的设备单独作为一个区域
+        3. 非对齐设备扩展到4K边界后用RegionSet合并，并去掉与对齐设备重叠的部分
+        4. 合并后的区域按地址排序
         
         Args:
             rsc: 资源对象
             
         Returns:
             包含设备信息的字典列表，每个字典包含:
-            - name: 设备名称
+            - name: 设备名称，合并区域为其中的设备名称以","连接
             - addr: 设备基地址
             - size: 设备内存大小
         """
@@ -174,39 +615,26 @@ class RootCellGenerator(object):
 
         def is_align(v):
             return (v & (4096-1)) == 0
+        def align_down(v):
+            return v & (~(4096-1))
         def be_align(v):
             return (v+4096-1) & (~(4096-1))
 
-        # 合并
-        merged_devices = list()
-        temp = None
-        for dev in devices:
-            if is_align(dev['addr']) and is_align(dev['size']):
-                if temp is not None:
-                    if not is_align(temp['size']):
-                        # XXX 强制4K对齐，非对齐时jailhouse可能报错
-                        temp['size'] = be_align(temp['size'])
-                    merged_devices.append(temp)
-                    temp = None
-                merged_devices.append(dev)
-                continue
-
-            if temp is None:
-                temp = dev
-                continue
+        aligned = [dev for dev in devices if is_align(dev['addr']) and is_align(dev['size'])]
+        unaligned = [dev for dev in devices if not (is_align(dev['addr']) and is_align(dev['size']))]
 
-            if temp['addr']+temp['size'] == dev['addr']:
-                temp['name'] = temp['name'] + ',' + dev['name']
-                temp['size'] = temp['size'] + dev['size']
-            else:
-                merged_devices.append(temp)
-                temp = dev
+        # XXX 强制4K对齐，非对齐时jailhouse可能报错
+        pages = RegionSet((align_down(dev['addr']), be_align(dev['addr']+dev['size'])-align_down(dev['addr']))
+                          for dev in unaligned)
+        pages = pages - RegionSet((dev['addr'], dev['size']) for dev in aligned)
 
-        if temp is not None:
-            merged_devices.append(temp)
-            temp = None
+        merged_devices = list(aligned)
+        for addr, size in pages.spans():
+            names = [dev['name'] for dev in unaligned
+                     if dev['addr'] < addr+size and dev['addr']+dev['size'] > addr]
+            merged_devices.append({"name": ",".join(names), "addr": addr, "size": size})
 
-        return merged_devices
+        return sorted(merged_devices, key=lambda x: x['addr'])
 
     @classmethod
     def get_regions(cls, rsc: Resource) -> Optional[list]:
@@ -258,18 +686,18 @@ class RootCellGenerator(object):
         if debug_console is None:
             return None
 
-        for dev in rsc.platform().cpu().devices():
-            if dev.name() == debug_console:
-                type_value = cellconfig.jailhouse_con_type_form_str(dev.type())
-                if type_value is None:
-                    cls.logger.error("invalid consle device type.")
-                    return False
-                return {
-                    "addr": dev.addr(),
-                    "size": dev.size(),
-                    "type": type_value
-                }
-        return False
+        dev = rsc.platform().cpu().find_device(debug_console)
+        if dev is None:
+            return False
+        type_value = cellconfig.jailhouse_con_type_form_str(dev.type())
+        if type_value is None:
+            cls.logger.error("invalid consle device type.")
+            return False
+        return {
+            "addr": dev.addr(),
+            "size": dev.size(),
+            "type": type_value
+        }
 
     @classmethod
     def get_pci_mmconfig(cls, rsc: Resource) -> Optional[dict]:
@@ -345,6 +773,11 @@ class RootCellGenerator(object):
 
     @classmethod
     def gen_kwargs(cls, rsc: Resource) -> dict:
+        return GeneratorCommon.cached(rsc, "root_cell_kwargs", cls._gen_kwargs)
+
+    @classmethod
+    @GeneratorTrace.traced("kwargs")
+    def _gen_kwargs(cls, rsc: Resource) -> dict:
         rootcell = rsc.jailhouse().rootcell()
 
         name = rootcell.name()
@@ -373,139 +806,162 @@ class RootCellGenerator(object):
     def gen_config_source(cls, rsc: Resource) -> Optional[str]:
         kwargs = cls.gen_kwargs(rsc)
 
-        mako_txt = open(get_template_path("root_cell.mako"), "rt", encoding='utf-8').read()
         try:
-            txt = Template(mako_txt).render(**kwargs)
+            with GeneratorTrace.stage("render"):
+                txt = GeneratorCommon.get_template("root_cell.mako").render(**kwargs)
             return txt.strip()
         except:
             print(exceptions.text_error_template().render())
             return None
 
+    @classmethod
+    def get_bin_inputs(cls, rsc: Resource) -> dict:
+        """
+        二进制配置除gen_kwargs外还直接读取的资源，与gen_kwargs一起作为缓存键
+        """
+        cpu = rsc.platform().cpu()
+        rootcell = rsc.jailhouse().rootcell()
+        pci_ecam = cpu.find_region("pci_ecam")
+        mmconfig = rootcell.pci_mmconfig()
+        return {
+            "kwargs": cls.gen_kwargs(rsc),
+            "gic": GeneratorCommon.get_gic_info(rsc),
+            "hypervisor": [rootcell.hypervisor().addr(), rootcell.hypervisor().size()],
+            "pci_ecam": None if pci_ecam is None else pci_ecam.addr(),
+            "pci_mmconfig": [mmconfig.base_addr, mmconfig.bus_count, mmconfig.domain],
+            "regions": [[mem.addr(), mem.size()] for mem in cpu.regions() if mem.type() is not mem.Type.DRAM],
+            "ivshmem": GeneratorCommon.get_ivshmem(rsc),
+        }
+
     @classmethod
     def gen_config_bin(cls, rsc: Resource) -> bytes:
-        logger.debug("开始生成根单元格二进制配置")
         try:
+            inputs = cls.get_bin_inputs(rsc)
+        except Exception as e:
+            logger.error(f"生成根单元格配置时出错: {str(e)}")
+            return None
+        return ArtifactCache.fetch("root.cell", inputs, lambda: cls._gen_config_bin(rsc))
 
-            kwargs = cls.gen_kwargs(rsc)
+    @classmethod
+    def get_bin_regions(cls, rsc: Resource, kwargs: dict) -> List[JailhouseMemory]:
+        """
+        根单元格二进制配置中的内存区域: ivshmem、板卡内存、设备和CPU的非DRAM区域
+        """
+        cpu = rsc.platform().cpu()
+        regions: List[JailhouseMemory] = list()
+        ivsm: ResourceComm = rsc.jailhouse().ivshmem()
+        ivsm_state_size = ivsm.ivshmem_state_size()
+        ivsm_rw_size = ivsm.ivshmem_rw_size()
+        ivsm_out_size = ivsm.ivshmem_out_size()
+        ivsm_state = ivsm.ivshmem_phys()
+        ivsm_rw = ivsm_state + ivsm_state_size
+        ivsm_out = ivsm_state + ivsm_state_size + ivsm_rw_size
+        peer_count = rsc.jailhouse().guestcells().cell_count()+1
+
+        regions.append(JailhouseMemory(ivsm_state, ivsm_state, ivsm_state_size, JailhouseMemory.MEM_READ))
+        regions.append(JailhouseMemory(ivsm_rw, ivsm_rw, ivsm_rw_size, JailhouseMemory.MEM_READ|JailhouseMemory.MEM_WRITE))
+        regions.append(JailhouseMemory(ivsm_out, ivsm_out, ivsm_out_size, JailhouseMemory.MEM_READ|JailhouseMemory.MEM_WRITE))
+        for i in range(1,peer_count):
+            addr = ivsm_out + i*ivsm_out_size
+            regions.append(JailhouseMemory(addr, addr, ivsm_out_size, JailhouseMemory.MEM_READ))
+
+        for mem in kwargs['board_mems']:
+            flag = JailhouseMemory.MEM_READ | JailhouseMemory.MEM_WRITE | JailhouseMemory.MEM_EXECUTE
+            regions.append(JailhouseMemory(mem['addr'], mem['addr'], mem['size'], flag))
+
+        for dev in kwargs['devices']:
+            flag = JailhouseMemory.MEM_READ | JailhouseMemory.MEM_WRITE | JailhouseMemory.MEM_IO
+            regions.append(JailhouseMemory(dev['addr'], dev['addr'], dev['size'], flag))
 
-            config_filename = f"root_cell_{kwargs['name']}_config.json"
-            with open(config_filename, 'w', encoding='utf-8') as f:
-                json.dump(kwargs, f, ensure_ascii=False, indent=4)
-            logger.info(f"根单元格配置数据已保存到: {config_filename}")
+        for mem in cpu.regions():
+            if mem.type() is mem.Type.DRAM:
+                continue
+            flag = JailhouseMemory.MEM_READ | JailhouseMemory.MEM_WRITE | JailhouseMemory.MEM_IO
+            regions.append(JailhouseMemory(mem.addr(), mem.addr(), mem.size(), flag))
+        return regions
+
+    @classmethod
+    @GeneratorTrace.traced("pack")
+    def _gen_config_bin(cls, rsc: Resource) -> bytes:
+        logger.debug("开始生成根单元格二进制配置")
+        try:
+            kwargs = cls.gen_kwargs(rsc)
+            GeneratorTrace.dump(f"root_cell_{kwargs['name']}_config", kwargs)
 
             cpu = rsc.platform().cpu()
             rootcell = rsc.jailhouse().rootcell()
             Rev = Revision14
+            layout = CellLayout.get(Rev)
 
-
-
-            # len(devices)+len(board_mems)+len(regions)+ivshmem['count']+2}
-            regions: List[JailhouseMemory] = list()
-            ivsm: ResourceComm = rsc.jailhouse().ivshmem()
-            ivsm_state_size = ivsm.ivshmem_state_size()
-            ivsm_rw_size = ivsm.ivshmem_rw_size()
-            ivsm_out_size = ivsm.ivshmem_out_size()
-            ivsm_state = ivsm.ivshmem_phys()
-            ivsm_rw = ivsm_state + ivsm_state_size
-            ivsm_out = ivsm_state + ivsm_state_size + ivsm_rw_size
+            regions = cls.get_bin_regions(rsc, kwargs)
             peer_count = rsc.jailhouse().guestcells().cell_count()+1
-
-            regions.append(JailhouseMemory(ivsm_state, ivsm_state, ivsm_state_size, JailhouseMemory.MEM_READ))
-            regions.append(JailhouseMemory(ivsm_rw, ivsm_rw, ivsm_rw_size, JailhouseMemory.MEM_READ|JailhouseMemory.MEM_WRITE))
-            regions.append(JailhouseMemory(ivsm_out, ivsm_out, ivsm_out_size, JailhouseMemory.MEM_READ|JailhouseMemory.MEM_WRITE))
-            for i in range(1,peer_count):
-                addr = ivsm_out + i*ivsm_out_size
-                regions.append(JailhouseMemory(addr, addr, ivsm_out_size, JailhouseMemory.MEM_READ))
-
-            for mem in cls.get_board_mem(rsc):
-                flag = JailhouseMemory.MEM_READ | JailhouseMemory.MEM_WRITE | JailhouseMemory.MEM_EXECUTE
-                print(mem)
-                regions.append(JailhouseMemory(mem['addr'], mem['addr'], mem['size'], flag))
-
-            for dev in cls.get_devices(rsc):
-                flag = JailhouseMemory.MEM_READ | JailhouseMemory.MEM_WRITE | JailhouseMemory.MEM_IO
-                regions.append(JailhouseMemory(dev['addr'], dev['addr'], dev['size'], flag))
-
-            for mem in cpu.regions():
-                if mem.type() is mem.Type.DRAM:
-                    continue
-                flag = JailhouseMemory.MEM_READ | JailhouseMemory.MEM_WRITE | JailhouseMemory.MEM_IO
-                regions.append(JailhouseMemory(mem.addr(), mem.addr(), mem.size(), flag))
-
-            class RootCell(ctypes.Structure):
-                _pack_ = 1
-                _fields_ = [
-                    ("header", Rev.system),
-                    ('cpus', ctypes.c_uint64*1),
-                    ('mem_regions', Rev.memory*len(regions)),
-                    ('irqchips', Rev.irqchip),
-                    ('pci_devices', Rev.pci_device)
-                ]
-
-            config = RootCell()
-
-            header = config.header
-            header.signature = Rev.sys_signature
-            header.revision = Rev.revision
-            header.flags = cellconfig.JAILHOUSE_SYS_VIRTUAL_DEBUG_CONSOLE
-            header.hypervisor_memory.phys_start = rootcell.hypervisor().addr()
-            header.hypervisor_memory.size = rootcell.hypervisor().size()
-            header.debug_console.address = kwargs['debug_console']['addr']
-            header.debug_console.size = 0x1000
-            header.debug_console.type = kwargs['debug_console']['type'].value
-            header.debug_console.flags = cellconfig.JAILHOUSE_CON_ACCESS_MMIO | cellconfig.JAILHOUSE_CON_REGDIST_4
-
-            pltinfo = config.header.platform_info
-            pci_ecam = rsc.platform().cpu().find_region("pci_ecam")
+            mmconfig = rootcell.pci_mmconfig()
+
+            # 布局: system, cpus, mem_regions, irqchips, pci_devices
+            size = layout.system.size + layout.cpu_set.size + len(regions)*layout.memory.size + \
+                layout.irqchip.size + layout.pci_device.size
+            buffer = bytearray(size)
+
+            header = {
+                "signature": Rev.sys_signature,
+                "revision": Rev.revision,
+                "flags": cellconfig.JAILHOUSE_SYS_VIRTUAL_DEBUG_CONSOLE,
+                "hypervisor_memory.phys_start": rootcell.hypervisor().addr(),
+                "hypervisor_memory.size": rootcell.hypervisor().size(),
+                "debug_console.address": kwargs['debug_console']['addr'],
+                "debug_console.size": 0x1000,
+                "debug_console.type": kwargs['debug_console']['type'].value,
+                "debug_console.flags": cellconfig.JAILHOUSE_CON_ACCESS_MMIO | cellconfig.JAILHOUSE_CON_REGDIST_4,
+                "platform_info.pci_mmconfig_base": mmconfig.base_addr,
+                "platform_info.pci_mmconfig_end_bus": (mmconfig.bus_count-1) & 0xFF,
+                "platform_info.pci_is_virtual": 1,
+                "platform_info.pci_domain": mmconfig.domain,
+                "platform_info.plt.arm.maintenance_irq": 25,
+                "platform_info.plt.arm.gic_version": cpu.gic_version(),
+                "platform_info.plt.arm.gicd_base": cpu.gicd_base(),
+                "platform_info.plt.arm.gicr_base": cpu.gicr_base(),
+                "platform_info.plt.arm.gicc_base": cpu.gicc_base(),
+                "platform_info.plt.arm.gich_base": cpu.gich_base(),
+                "platform_info.plt.arm.gicv_base": cpu.gicv_base(),
+                "root_cell.name": kwargs['name'].encode(),
+                "root_cell.cpu_set_size": layout.cpu_set.size,
+                "root_cell.num_memory_regions": len(regions),
+                "root_cell.num_irqchips": 1,
+                "root_cell.num_pci_devices": 1,
+                "root_cell.vpci_irq_base": kwargs['vpci_irq_base'],
+            }
+            pci_ecam = cpu.find_region("pci_ecam")
             if pci_ecam is not None:
-                pltinfo.pci_machine_mmconfig_base = pci_ecam.addr()
-
-            pltinfo.pci_mmconfig_base = rootcell.pci_mmconfig().base_addr
-            pltinfo.pci_mmconfig_end_bus = rootcell.pci_mmconfig().bus_count-1
-            pltinfo.pci_is_virtual = 1
-            pltinfo.pci_domain = rootcell.pci_mmconfig().domain
-            pltinfo.plt.arm.gic_version = cpu.gic_version()
-            pltinfo.plt.arm.gicd_base = cpu.gicd_base()
-            pltinfo.plt.arm.gicr_base = cpu.gicr_base()
-            pltinfo.plt.arm.gicc_base = cpu.gicc_base()
-            pltinfo.plt.arm.gich_base = cpu.gich_base()
-            pltinfo.plt.arm.gicv_base = cpu.gicv_base()
-            pltinfo.plt.arm.maintenance_irq = 25
-
-            header.root_cell.name = kwargs['name'].encode()
-            header.root_cell.cpu_set_size = ctypes.sizeof(config.cpus)
-            header.root_cell.num_memory_regions = ctypes.sizeof(config.mem_regions)//ctypes.sizeof(config.mem_regions[0])
-            header.root_cell.num_irqchips = 1
-            header.root_cell.num_pci_devices = 1
-            header.root_cell.vpci_irq_base = kwargs['vpci_irq_base']
-
-            config.cpus[0] = kwargs['cpu']['values'][0]
-            mem_regions = config.mem_regions
-            for idx, mem in enumerate(regions):
-                mem_regions[idx].phys_start = mem.phys
-                mem_regions[idx].virt_start = mem.virt
-                mem_regions[idx].size       = mem.size
-                mem_regions[idx].flags      = mem.flag
-
-            irqchip = config.irqchips
-            irqchip.address = cpu.gicd_base()
-            irqchip.pin_base = 32
-            irqchip.pin_bitmap[0] = 0xffffffff
-            irqchip.pin_bitmap[1] = 0xffffffff
-            irqchip.pin_bitmap[2] = 0xffffffff
-            irqchip.pin_bitmap[3] = 0xffffffff
-
-            pci_dev = config.pci_devices
-            pci_dev.type = cellconfig.JAILHOUSE_PCI_TYPE_IVSHMEM
-            pci_dev.domain = 1
-            pci_dev.bdf = 0
-            pci_dev.bar_mask = cellconfig.JAILHOUSE_IVSHMEM_BAR_MASK_INTX
-            pci_dev.shmem_regions_start = 0
-            pci_dev.shmem_dev_id = kwargs['ivshmem']['id']
-            pci_dev.shmem_peers = peer_count
-            pci_dev.shmem_protocol = cellconfig.JAILHOUSE_SHMEM_PROTO_UNDEFINED
-
-            return ctypes.string_at(ctypes.addressof(config), ctypes.sizeof(config))
+                header["platform_info.pci_machine_mmconfig_base"] = pci_ecam.addr()
+            layout.system.pack_into(buffer, 0, header)
+            offset = layout.system.size
+
+            layout.cpu_set.pack_into(buffer, offset, kwargs['cpu']['values'][0])
+            offset += layout.cpu_set.size
+
+            pack_memory = layout.memory.struct.pack_into
+            for mem in regions:
+                pack_memory(buffer, offset, mem.phys, mem.virt, mem.size, mem.flag)
+                offset += layout.memory.size
+
+            layout.irqchip.pack_into(buffer, offset, {
+                "address": cpu.gicd_base(),
+                "pin_base": 32,
+                "pin_bitmap": (0xffffffff, 0xffffffff, 0xffffffff, 0xffffffff),
+            })
+            offset += layout.irqchip.size
+
+            layout.pci_device.pack_into(buffer, offset, {
+                "type": cellconfig.JAILHOUSE_PCI_TYPE_IVSHMEM,
+                "domain": 1,
+                "bdf": 0,
+                "bar_mask": tuple(cellconfig.JAILHOUSE_IVSHMEM_BAR_MASK_INTX),
+                "shmem_regions_start": 0,
+                "shmem_dev_id": kwargs['ivshmem']['id'],
+                "shmem_peers": peer_count,
+                "shmem_protocol": cellconfig.JAILHOUSE_SHMEM_PROTO_UNDEFINED,
+            })
+            return bytes(buffer)
         except Exception as e:
             logger.error(f"生成根单元格配置时出错: {str(e)}")
             return None
@@ -639,7 +1095,7 @@ class GuestCellGenerator(object):
         """
         cpu: ResourceCPU = guestcell.find(ResourceCPU)
         rootcell: ResourceRootCell = guestcell.find(ResourceRootCell)
-        irq_bitmaps = cls.get_gic_bitmaps(guestcell)
+        irq_bitmaps = GeneratorCommon.cached(guestcell, "gic_bitmaps", cls.get_gic_bitmaps)
 
         return {
             "virt_console": guestcell.virt_console(),
@@ -754,39 +1210,44 @@ class GuestCellGenerator(object):
         if len(console) == 0:
             return None
 
-        for dev in guestcell.find(ResourceCPU).devices():
-            if dev.name() == console:
-                type_value = cellconfig.jailhouse_con_type_form_str(dev.type())
-                if type_value is None:
-                    cls.logger.error("invalid consle device type.")
-                    return False
-                return {
-                    "addr": dev.addr(),
-                    "size": dev.size(),
-                    "type": type_value
-                }
-        return False
+        dev = guestcell.find(ResourceCPU).find_device(console)
+        if dev is None:
+            return False
+        type_value = cellconfig.jailhouse_con_type_form_str(dev.type())
+        if type_value is None:
+            cls.logger.error("invalid consle device type.")
+            return False
+        return {
+            "addr": dev.addr(),
+            "size": dev.size(),
+            "type": type_value
+        }
 
     @classmethod
     def gen_kwargs(cls, guestcell: ResourceGuestCell) -> Optional[dict]:
+        return GeneratorCommon.cached(guestcell, "guest_cell_kwargs", cls._gen_kwargs)
+
+    @classmethod
+    @GeneratorTrace.traced("kwargs")
+    def _gen_kwargs(cls, guestcell: ResourceGuestCell) -> Optional[dict]:
         rsc: Resource = guestcell.ancestor(Resource)
 
         if rsc is None:
             return None
         kwargs = {
             "name": guestcell.name(),
-            "cpu": cls.get_cpu(guestcell),
+            "cpu": GeneratorCommon.cached(guestcell, "cpu", cls.get_cpu),
             "system": cls.get_system(guestcell),
             "gic": GeneratorCommon.get_gic_info(rsc),
             "ivshmem": GeneratorCommon.get_ivshmem(rsc, guestcell),
             "system_mem": cls.get_system_mem(guestcell),
             "memmaps": cls.get_memmaps(guestcell),
-            "devices": cls.get_devices(guestcell),
+            "devices": GeneratorCommon.cached(guestcell, "devices", cls.get_devices),
             "comm_region": guestcell.comm_region(),
-            "pci_devices": cls.get_pci_device(guestcell),
+            "pci_devices": GeneratorCommon.cached(guestcell, "pci_devices", cls.get_pci_device),
         }
         optional_kwargs = {
-            "console": cls.get_console(guestcell),
+            "console": GeneratorCommon.cached(guestcell, "console", cls.get_console),
         }
 
         for k in kwargs:
@@ -814,8 +1275,8 @@ class GuestCellGenerator(object):
             return None
 
         try:
-            mako_txt = open(get_template_path("guest_cell.mako"), "rt", encoding='utf-8').read()
-            txt = Template(mako_txt).render(**kwargs)
+            with GeneratorTrace.stage("render"):
+                txt = GeneratorCommon.get_template("guest_cell.mako").render(**kwargs)
         except:
             print(exceptions.text_error_template().render())
             return None
@@ -824,29 +1285,16 @@ class GuestCellGenerator(object):
 
     @classmethod
     def gen_config_bin(cls, guestcell: ResourceGuestCell) -> bytes:
+        kwargs = cls.gen_kwargs(guestcell)
+        if kwargs is None:
+            return None
+        return ArtifactCache.fetch("guest.cell", kwargs, lambda: cls._gen_config_bin(guestcell))
 
-        kwargs = cls.gen_kwargs(guestcell)  # 假设已有gen_kwargs方法
-        
-        # 👇 新增：保存配置数据结构到当前目录
-        config_filename = f"guest_cell_{guestcell.name()}_config.json"
-        with open(config_filename, 'w', encoding='utf-8') as f:
-            json.dump(kwargs, f, ensure_ascii=False, indent=4)
-        cls.logger.info(f"客户单元格配置数据已保存到: {config_filename}")
+    @classmethod
+    def get_bin_regions(cls, guestcell: ResourceGuestCell) -> List[JailhouseMemory]:
         """
-        生成客户单元格的二进制配置数据。
-        
-        生成可以直接加载到Jailhouse的二进制配置数据。
-        
-        Args:
-            guestcell: 客户单元格资源对象
-            
-        Returns:
-            二进制配置数据
+        客户单元格二进制配置中的内存区域: ivshmem、系统内存、内存映射、设备和通信区域
         """
-        Rev = Revision14
-        cpu: ResourceCPU = guestcell.find(ResourceCPU)
-        rootcell: ResourceRootCell = guestcell.find(ResourceRootCell)
-
         regions = list()
 
         ivsm: ResourceComm = guestcell.find(ResourceComm)
@@ -881,104 +1329,132 @@ class GuestCellGenerator(object):
             flags = JailhouseMemory.MEM_READ | JailhouseMemory.MEM_WRITE
             regions.append(JailhouseMemory(mm.phys(), mm.virt(), mm.size(), flags))
 
-        for dev in cls.get_devices(guestcell):
+        for dev in GeneratorCommon.cached(guestcell, "devices", cls.get_devices):
             flag = JailhouseMemory.MEM_READ | JailhouseMemory.MEM_WRITE | JailhouseMemory.MEM_IO|JailhouseMemory.MEM_ROOTSHARED
             regions.append(JailhouseMemory(dev['addr'], dev['addr'], dev['size'], flag))
 
         regions.append(JailhouseMemory(0, guestcell.comm_region(), 0x1000, JailhouseMemory.MEM_READ|JailhouseMemory.MEM_WRITE|JailhouseMemory.MEM_COMM_REGION))
+        return regions
 
-        pci_devices = cls.get_pci_device(guestcell)
-
-        class GuestcellStruct(ctypes.Structure):
-            _pack_ = 1
-            _fields_ = [
-                ("cell", Rev.cell_desc),
-                ('cpus', ctypes.c_uint64*1),
-                ('mem_regions', Rev.memory*len(regions)),
-                ('irqchips', Rev.irqchip),
-                ('pci_devices', Rev.pci_device*(1+len(pci_devices['devices']))),
-                ('pci_caps', Rev.pci_capability*len(pci_devices['caps'])),
-            ]
-
-        config = GuestcellStruct()
-
-        cell = config.cell
-        cell.signature = Rev.cell_signature
-        cell.revision = Rev.revision
-        cell.name = guestcell.name().encode()
-        cell.flags = cellconfig.JAILHOUSE_CELL_PASSIVE_COMMREG
+    @classmethod
+    def get_cell_flags(cls, guestcell: ResourceGuestCell) -> int:
+        flags = cellconfig.JAILHOUSE_CELL_PASSIVE_COMMREG
         if guestcell.virt_console():
-            cell.flags = cell.flags + cellconfig.JAILHOUSE_CELL_VIRTUAL_CONSOLE_PERMITTED
+            flags = flags + cellconfig.JAILHOUSE_CELL_VIRTUAL_CONSOLE_PERMITTED
         if guestcell.arch() is ARMArch.AArch32:
-            cell.flags = cell.flags + cellconfig.JAILHOUSE_CELL_AARCH32
+            flags = flags + cellconfig.JAILHOUSE_CELL_AARCH32
         if guestcell.virt_cpuid():
-            cell.flags = cell.flags + cellconfig.JAILHOUSE_CELL_VIRT_CPUID
-        cell.cpu_reset_address = guestcell.reset_addr()
-        cell.cpu_set_size = ctypes.sizeof(config.cpus)
-        cell.num_memory_regions = ctypes.sizeof(config.mem_regions)//ctypes.sizeof(config.mem_regions[0])
-        cell.num_irqchips = 1
-        cell.num_pci_devices = ctypes.sizeof(config.pci_devices)//ctypes.sizeof(config.pci_devices[0])
-        cell.num_pci_caps = len(pci_devices['caps'])
-        cell.vpci_irq_base =  rootcell.vpci_irq_base() + guestcell.my_index() + 1
-
-        console = cls.get_console(guestcell)
+            flags = flags + cellconfig.JAILHOUSE_CELL_VIRT_CPUID
+        return flags
+
+    @classmethod
+    @GeneratorTrace.traced("pack")
+    def _gen_config_bin(cls, guestcell: ResourceGuestCell) -> bytes:
+        """
+        生成客户单元格的二进制配置数据。
+        
+        生成可以直接加载到Jailhouse的二进制配置数据。
+        各结构体按CellLayout中预先推导的struct布局写入同一个bytearray。
+        
+        Args:
+            guestcell: 客户单元格资源对象
+            
+        Returns:
+            二进制配置数据
+        """
+        GeneratorTrace.dump(f"guest_cell_{guestcell.name()}_config", cls.gen_kwargs(guestcell))
+        Rev = Revision14
+        layout = CellLayout.get(Rev)
+        cpu: ResourceCPU = guestcell.find(ResourceCPU)
+        rootcell: ResourceRootCell = guestcell.find(ResourceRootCell)
+        guestcells: ResourceGuestCellList = guestcell.ancestor(ResourceGuestCellList)
+        peer_count = guestcells.cell_count()+1
+
+        console = GeneratorCommon.cached(guestcell, "console", cls.get_console)
         if console is False:
             return None
+
+        regions = cls.get_bin_regions(guestcell)
+        pci_devices = GeneratorCommon.cached(guestcell, "pci_devices", cls.get_pci_device)
+        num_pci_devices = 1+len(pci_devices['devices'])
+
+        # 布局: cell_desc, cpus, mem_regions, irqchips, pci_devices, pci_caps
+        size = layout.cell_desc.size + layout.cpu_set.size + len(regions)*layout.memory.size + layout.irqchip.size + \
+            num_pci_devices*layout.pci_device.size + len(pci_devices['caps'])*layout.pci_capability.size
+        buffer = bytearray(size)
+
+        cell = {
+            "signature": Rev.cell_signature,
+            "revision": Rev.revision,
+            "name": guestcell.name().encode(),
+            "flags": cls.get_cell_flags(guestcell),
+            "cpu_reset_address": guestcell.reset_addr(),
+            "cpu_set_size": layout.cpu_set.size,
+            "num_memory_regions": len(regions),
+            "num_irqchips": 1,
+            "num_pci_devices": num_pci_devices,
+            "num_pci_caps": len(pci_devices['caps']),
+            "vpci_irq_base": rootcell.vpci_irq_base() + guestcell.my_index() + 1,
+        }
         if console is not None:
-            cell.console.address = console['addr']
-            cell.console.size = 0x1000
-            cell.console.type = console['type'].value
-            cell.console.flags = cellconfig.JAILHOUSE_CON_ACCESS_MMIO | cellconfig.JAILHOUSE_CON_REGDIST_4
-
-        config.cpus[0] = cls.get_cpu(guestcell)['values'][0]
-
-        mem_regions = config.mem_regions
-        for idx, mem in enumerate(regions):
-            mem_regions[idx].phys_start = mem.phys
-            mem_regions[idx].virt_start = mem.virt
-            mem_regions[idx].size       = mem.size
-            mem_regions[idx].flags      = mem.flag
-
-        irqchip = config.irqchips
-        irqchip.address = cpu.gicd_base()
-        irqchip.pin_base = 32
-        for idx, bitmap in enumerate(cls.get_gic_bitmaps(guestcell)):
-            irqchip.pin_bitmap[idx] = bitmap['bitmap']
-
-        pci_ivshmem = config.pci_devices[0]
-        pci_ivshmem.type = cellconfig.JAILHOUSE_PCI_TYPE_IVSHMEM
-        pci_ivshmem.domain = 1
-        pci_ivshmem.bdf = 0
-        pci_ivshmem.bar_mask = cellconfig.JAILHOUSE_IVSHMEM_BAR_MASK_INTX
-        pci_ivshmem.shmem_regions_start = 0
-        pci_ivshmem.shmem_dev_id = guestcell.my_index()+1
-        pci_ivshmem.shmem_peers = peer_count
-        pci_ivshmem.shmem_protocol = cellconfig.JAILHOUSE_SHMEM_PROTO_UNDEFINED
+            cell["console.address"] = console['addr']
+            cell["console.size"] = 0x1000
+            cell["console.type"] = console['type'].value
+            cell["console.flags"] = cellconfig.JAILHOUSE_CON_ACCESS_MMIO | cellconfig.JAILHOUSE_CON_REGDIST_4
+        layout.cell_desc.pack_into(buffer, 0, cell)
+        offset = layout.cell_desc.size
+
+        layout.cpu_set.pack_into(buffer, offset, GeneratorCommon.cached(guestcell, "cpu", cls.get_cpu)['values'][0])
+        offset += layout.cpu_set.size
+
+        pack_memory = layout.memory.struct.pack_into
+        for mem in regions:
+            pack_memory(buffer, offset, mem.phys, mem.virt, mem.size, mem.flag)
+            offset += layout.memory.size
+
+        pin_bitmap = [0, 0, 0, 0]
+        for idx, bitmap in enumerate(GeneratorCommon.cached(guestcell, "gic_bitmaps", cls.get_gic_bitmaps)):
+            pin_bitmap[idx] = bitmap['bitmap']
+        layout.irqchip.pack_into(buffer, offset, {
+            "address": cpu.gicd_base(),
+            "pin_base": 32,
+            "pin_bitmap": pin_bitmap,
+        })
+        offset += layout.irqchip.size
+
+        layout.pci_device.pack_into(buffer, offset, {
+            "type": cellconfig.JAILHOUSE_PCI_TYPE_IVSHMEM,
+            "domain": 1,
+            "bdf": 0,
+            "bar_mask": tuple(cellconfig.JAILHOUSE_IVSHMEM_BAR_MASK_INTX),
+            "shmem_regions_start": 0,
+            "shmem_dev_id": guestcell.my_index()+1,
+            "shmem_peers": peer_count,
+            "shmem_protocol": cellconfig.JAILHOUSE_SHMEM_PROTO_UNDEFINED,
+        })
+        offset += layout.pci_device.size
 
         for idx, dev in enumerate(pci_devices['devices']):
-            pci_dev = config.pci_devices[idx+1]
-            pci_dev.type = cellconfig.JAILHOUSE_PCI_TYPE_DEVICE
-            pci_dev.domain = dev['domain']
-            pci_dev.bdf = dev['bdf']
-            pci_dev.virt_bdf = (idx+1) << 3
+            values = {
+                "type": cellconfig.JAILHOUSE_PCI_TYPE_DEVICE,
+                "domain": dev['domain'],
+                "bdf": dev['bdf'],
+                "virt_bdf": (idx+1) << 3,
+                "bar_mask": dev['bar_mask'][:6],
+            }
             if dev['num_caps'] > 0:
-                pci_dev.caps_start = dev['caps_start']
-                pci_dev.num_caps = dev['num_caps']
-            for i in range(6):
-                pci_dev.bar_mask[i] = dev['bar_mask'][i]
-
-        pci_caps = config.pci_caps
-        for idx, cap in enumerate(pci_devices['caps']):
-            pci_cap = config.pci_caps[idx]
-            if cap['extended']:
-                pci_cap.id = cap['id'] | cellconfig.JAILHOUSE_PCI_EXT_CAP
-            else:
-                pci_cap.id = cap['id']
-            pci_cap.start = cap['start']
-            pci_cap.len = cap['len']
-            pci_cap.flags = cap['flags']
+                values["caps_start"] = dev['caps_start']
+                values["num_caps"] = dev['num_caps']
+            layout.pci_device.pack_into(buffer, offset, values)
+            offset += layout.pci_device.size
+
+        pack_cap = layout.pci_capability.struct.pack_into
+        for cap in pci_devices['caps']:
+            cap_id = cap['id'] | cellconfig.JAILHOUSE_PCI_EXT_CAP if cap['extended'] else cap['id']
+            pack_cap(buffer, offset, cap_id, cap['start'], cap['len'], cap['flags'])
+            offset += layout.pci_capability.size
 
-        return ctypes.string_at(ctypes.addressof(config), ctypes.sizeof(config))
+        return bytes(buffer)
 
     @classmethod
     def gen_guestlinux_dts(cls, guestcell: ResourceGuestCell) -> Optional[str]:
@@ -989,8 +1465,8 @@ class GuestCellGenerator(object):
             return None
         from mako import exceptions
         try:
-            mako_txt = open(get_template_path(fname), "rt", encoding='utf-8').read()
-            txt = Template(mako_txt).render(**kwargs)
+            with GeneratorTrace.stage("render"):
+                txt = GeneratorCommon.get_template(fname).render(**kwargs)
         except:
             print(exceptions.text_error_template().render())
             return None
@@ -999,15 +1475,24 @@ class GuestCellGenerator(object):
 
     @classmethod
     def dts_to_dtb(cls, dts):
-        x = fdt.parse_dts(dts)
-        return x.to_dtb(version=17)
+        with GeneratorTrace.stage("dts_parse"):
+            x = fdt.parse_dts(dts)
+        with GeneratorTrace.stage("dtb_emit"):
+            return x.to_dtb(version=17)
 
     @classmethod
     def gen_guestlinux_dtb(cls, guestcell: ResourceGuestCell) -> Optional[bytes]:
-        dts = cls.gen_guestlinux_dts(guestcell)
-        if dts is None:
+        kwargs = cls.gen_kwargs(guestcell)
+        if kwargs is None:
             return None
-        return cls.dts_to_dtb(dts)
+        fname = f'guestos-{guestcell.find(ResourceCPU).name()}.dts.mako'
+
+        def gen():
+            dts = cls.gen_guestlinux_dts(guestcell)
+            if dts is None:
+                return None
+            return cls.dts_to_dtb(dts)
+        return ArtifactCache.fetch("guest.dtb", kwargs, gen, fname)
 
     @classmethod
     def gen_resource_table_src(cls, guestcell: ResourceGuestCell) -> Optional[str]:
@@ -1016,8 +1501,8 @@ class GuestCellGenerator(object):
             return None
         from mako import exceptions
         try:
-            mako_txt = open(get_template_path("resource_table.dts.mako"), "rt", encoding='utf-8').read()
-            txt = Template(mako_txt).render(**kwargs)
+            with GeneratorTrace.stage("render"):
+                txt = GeneratorCommon.get_template("resource_table.dts.mako").render(**kwargs)
         except:
             print(exceptions.text_error_template().render())
             return None
@@ -1026,10 +1511,183 @@ class GuestCellGenerator(object):
 
     @classmethod
     def gen_resource_table_bin(cls, guestcell: ResourceGuestCell) -> Optional[bytes]:
-        src = cls.gen_resource_table_src(guestcell)
-        if src is None:
+        kwargs = cls.gen_kwargs(guestcell)
+        if kwargs is None:
+            return None
+
+        def gen():
+            src = cls.gen_resource_table_src(guestcell)
+            if src is None:
+                return None
+            return cls.dts_to_dtb(src)
+        return ArtifactCache.fetch("guest.rsctable", kwargs, gen, "resource_table.dts.mako")
+
+
+class ArtifactBuilder(object):
+    """
+    批量生成部署所需的全部配置文件。
+    
+    root cell和每个guest cell作为独立的任务分发到进程池中并行生成，
+    完成后在输出目录中写入manifest.json，记录每个文件的大小、SHA-256和耗时。
+    
+    生成的文件:
+    - root cell: <名称>.cell
+    - linux guest cell: <名称>.cell, <名称>.dtb
+    - 其他guest cell: <名称>.cell, <名称>.rsctable.bin
+    """
+    logger = logging.getLogger("ArtifactBuilder")
+
+    MANIFEST = "manifest.json"
+
+    # 子进程中已打开的资源，(文件名, 修改时间) -> Resource
+    _resources = dict()
+
+    @classmethod
+    def _open(cls, jhr: str) -> Optional[Resource]:
+        try:
+            key = (os.path.abspath(jhr), os.path.getmtime(jhr))
+        except OSError as e:
+            cls.logger.error(f"open {jhr} failed: {e}")
+            return None
+        rsc = cls._resources.get(key)
+        if rsc is None:
+            rsc = ResourceMgr.get_instance().open(jhr)
+            if rsc is None:
+                return None
+            cls._resources.clear()
+            cls._resources[key] = rsc
+        return rsc
+
+    @staticmethod
+    def _write(outdir: str, filename: str, data: bytes, used: float, cached: bool) -> dict:
+        with open(os.path.join(outdir, filename), "wb") as f:
+            f.write(data)
+        return {
+            "file": filename,
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "seconds": round(used, 6),
+            "cached": cached,
+        }
+
+    @classmethod
+    def _build(cls, jhr: str, index: int, outdir: str, cache: bool = True, profile: bool = False) -> dict:
+        """
+        生成一个cell的所有文件，index为-1时生成root cell。
+        
+        Returns:
+            任务结果字典，包含cell名称、生成的文件列表、耗时和错误信息
+        """
+        start = time.perf_counter()
+        result = {"cell": "", "artifacts": list(), "error": None}
+        # 在当前进程中执行时(jobs为1)结束后恢复，不影响调用者的设置
+        saved = (ArtifactCache.enabled, GeneratorTrace.enabled)
+        ArtifactCache.enabled = cache
+        GeneratorTrace.enabled = profile
+        report = GeneratorTrace.report()
+        try:
+            rsc = cls._open(jhr)
+            if rsc is None:
+                result["error"] = f"open {jhr} failed"
+                return result
+
+            if index < 0:
+                rootcell = rsc.jailhouse().rootcell()
+                result["cell"] = rootcell.name()
+                steps = [(f"{rootcell.name()}.cell", lambda: RootCellGenerator.gen_config_bin(rsc))]
+            else:
+                cell = rsc.jailhouse().guestcells().cell_at(index)
+                result["cell"] = cell.name()
+                steps = [(f"{cell.name()}.cell", lambda: GuestCellGenerator.gen_config_bin(cell))]
+                if isinstance(cell.runinfo().os_runinfo(), LinuxRunInfo):
+                    steps.append((f"{cell.name()}.dtb", lambda: GuestCellGenerator.gen_guestlinux_dtb(cell)))
+                else:
+                    steps.append((f"{cell.name()}.rsctable.bin", lambda: GuestCellGenerator.gen_resource_table_bin(cell)))
+
+            for filename, gen in steps:
+                step_start = time.perf_counter()
+                hits = ArtifactCache.hits
+                data = gen()
+                if data is None:
+                    result["error"] = f"generate {filename} failed"
+                    break
+                result["artifacts"].append(cls._write(outdir, filename, data, time.perf_counter()-step_start,
+                                                      ArtifactCache.hits != hits))
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            ArtifactCache.enabled, GeneratorTrace.enabled = saved
+        if profile:
+            result["profile"] = GeneratorTrace.since(report)
+        result["seconds"] = round(time.perf_counter()-start, 6)
+        return result
+
+    @classmethod
+    def build_all(cls, jhr: str, outdir: str, jobs: Optional[int] = None, cache: bool = True) -> Optional[dict]:
+        """
+        生成jhr中root cell和所有guest cell的配置文件并写入outdir。
+        
+        Args:
+            jhr: 资源文件路径
+            outdir: 输出目录，不存在时创建
+            jobs: 进程数，默认为CPU数量，为1时在当前进程中生成
+            cache: 是否使用ArtifactCache，输入未变化的文件直接从缓存复制
+            
+        Returns:
+            manifest字典，打开资源文件或写入manifest失败时返回None
+        """
+        start = time.perf_counter()
+        # 在生成前计算，manifest记录的是实际用于生成的输入
+        try:
+            with open(jhr, "rb") as f:
+                source_hash = hashlib.sha256(f.read()).hexdigest()
+        except OSError as e:
+            cls.logger.error(f"open {jhr} failed: {e}")
+            return None
+        rsc = cls._open(jhr)
+        if rsc is None:
+            cls.logger.error(f"open {jhr} failed.")
+            return None
+        try:
+            os.makedirs(outdir, exist_ok=True)
+        except OSError as e:
+            cls.logger.error(f"create {outdir} failed: {e}")
             return None
-        return cls.dts_to_dtb(src)
+
+        indexes = [-1] + list(range(rsc.jailhouse().guestcells().cell_count()))
+        profile = GeneratorTrace.enabled
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        jobs = max(1, min(jobs, len(indexes)))
+
+        if jobs == 1:
+            results = [cls._build(jhr, index, outdir, cache, profile) for index in indexes]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+                futures = [pool.submit(ArtifactBuilder._build, jhr, index, outdir, cache, profile) for index in indexes]
+                results = [future.result() for future in futures]
+            # 子进程中的统计合并到当前进程
+            for result in results:
+                GeneratorTrace.merge(result.get("profile", dict()))
+
+        artifacts = [a for result in results for a in result["artifacts"]]
+        hits = sum(1 for a in artifacts if a["cached"])
+        misses = len(artifacts) - hits if cache else 0
+        manifest = {
+            "source": os.path.abspath(jhr),
+            "source_sha256": source_hash,
+            "jobs": jobs,
+            "seconds": round(time.perf_counter()-start, 6),
+            "cache": {"enabled": cache, "hits": hits, "misses": misses},
+            "cells": results,
+        }
+        for result in results:
+            if result["error"] is not None:
+                cls.logger.error(f"cell {result['cell']}: {result['error']}")
+        if not JsonCodec.dump(manifest, os.path.join(outdir, cls.MANIFEST)):
+            cls.logger.error("write manifest failed.")
+            return None
+        return manifest
 
 
 def test():
@@ -1057,9 +1715,18 @@ def test():
     #print(xx)
 
 @click.group()
-def cli():
+@click.option("--profile", is_flag=True, default=False, help="输出各生成阶段的耗时和内存块统计")
+@click.option("--dump-dir", default=None, help="将生成参数等调试数据写入该目录")
+@click.pass_context
+def cli(ctx, profile, dump_dir):
     """Jailhouse配置生成工具命令行接口。"""
-    pass
+    GeneratorTrace.enabled = profile
+    GeneratorTrace.dump_sink = dump_dir
+    if profile:
+        def _report():
+            if len(GeneratorTrace.report()) > 0:
+                click.echo(GeneratorTrace.format_report(), err=True)
+        ctx.call_on_close(_report)
 
 
 @cli.command("resource-table")
@@ -1292,5 +1959,117 @@ def generate_guestcell(jhr, name, output: str):
         return True
 
 
+@cli.command("cache-prune")
+@click.option("--max-size", type=int, default=None, help="缓存大小上限(字节)，为0时清空缓存")
+def cache_prune(max_size):
+    """
+    清理生成缓存，从最久未使用的文件开始删除，直到总大小不超过上限。
+    """
+    removed = ArtifactCache.prune(max_size)
+    print(f"removed {removed} files from {ArtifactCache.directory()}")
+
+
+@cli.command("build-all")
+@click.argument("jhr")
+@click.argument("outdir")
+@click.option("--jobs", "-j", type=int, default=None, help="进程数，默认为CPU数量")
+@click.option("--no-cache", is_flag=True, default=False, help="不使用生成缓存")
+def build_all(jhr, outdir, jobs, no_cache):
+    """
+    并行生成root cell和所有guest cell的配置文件，并写入manifest.json。
+    
+    Args:
+        jhr: Jailhouse资源文件路径
+        outdir: 输出目录
+    """
+    manifest = ArtifactBuilder.build_all(jhr, outdir, jobs, not no_cache)
+    if manifest is None:
+        exit(1)
+
+    failed = 0
+    for result in manifest["cells"]:
+        if result["error"] is not None:
+            failed += 1
+            print(f"{result['cell']:<20} {result['seconds']*1000:8.1f}ms  failed: {result['error']}")
+            continue
+        files = ", ".join(f"{a['file']}({a['size']}{', cached' if a['cached'] else ''})" for a in result["artifacts"])
+        print(f"{result['cell']:<20} {result['seconds']*1000:8.1f}ms  {files}")
+    cache = manifest["cache"]
+    print(f"cache hits {cache['hits']}, misses {cache['misses']}")
+    print(f"total {manifest['seconds']*1000:.1f}ms, jobs {manifest['jobs']}, manifest {os.path.join(outdir, ArtifactBuilder.MANIFEST)}")
+    if failed > 0:
+        exit(1)
+
+
+def _format_value(value) -> str:
+    if isinstance(value, int):
+        return f"0x{value:x}"
+    return str(value)
+
+
+@cli.command("cell-dump")
+@click.argument("filename")
+def cell_dump(filename):
+    """
+    显示.cell二进制配置的所有字段。
+    
+    Args:
+        filename: .cell文件路径
+    """
+    reader = CellConfigReader.open(filename)
+    if reader is None:
+        exit(1)
+    kind = "system" if reader.is_system() else "cell"
+    print(f"{filename}: {kind} {reader.name()}, revision {reader.revision().revision}, {len(reader.data())} bytes")
+    for path, value in reader.fields().items():
+        print(f"    {path:<48} {_format_value(value)}")
+
+
+@cli.command("cell-diff")
+@click.argument("old")
+@click.argument("new")
+def cell_diff(old, new):
+    """
+    比较两个.cell二进制配置，或两个目录中同名的.cell文件，输出变化的区域、位图和PCI条目。
+    
+    有差异时返回1，可用于判断是否需要重新上传配置。
+    
+    Args:
+        old: 原配置文件或目录
+        new: 新配置文件或目录
+    """
+    if os.path.isdir(old) and os.path.isdir(new):
+        names = sorted(set(f for d in (old, new) for f in os.listdir(d) if f.endswith(".cell")))
+        pairs = [(os.path.join(old, name), os.path.join(new, name)) for name in names]
+    else:
+        pairs = [(old, new)]
+
+    changed = 0
+    for old_file, new_file in pairs:
+        if not os.path.exists(old_file) or not os.path.exists(new_file):
+            changed += 1
+            print(f"{os.path.basename(new_file)}: only in {old if os.path.exists(old_file) else new}")
+            continue
+        old_cfg = CellConfigReader.open(old_file)
+        new_cfg = CellConfigReader.open(new_file)
+        if old_cfg is None or new_cfg is None:
+            changed += 1
+            print(f"{os.path.basename(new_file)}: read failed")
+            continue
+        changes = old_cfg.diff(new_cfg)
+        if len(changes) == 0:
+            continue
+        changed += 1
+        entries = CellConfigReader.changed_entries(changes)
+        print(f"{os.path.basename(new_file)}: {len(changes)} fields changed in {', '.join(entries)}")
+        for path, old_value, new_value in changes:
+            old_str = "-" if old_value is None else _format_value(old_value)
+            new_str = "-" if new_value is None else _format_value(new_value)
+            print(f"    {path:<48} {old_str} -> {new_str}")
+    print(f"{len(pairs)} configs, {changed} changed")
+    if changed > 0:
+        exit(1)
+
+
 if __name__ == "__main__":
     cli()
\ No newline at end of file
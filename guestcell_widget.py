@@ -75,12 +75,12 @@ class GuestCellsWidget(QtWidgets.QWidget):
         self._ui.frame_guestcell_content.hide()
 
     def _on_resource_value_changed(self, sender, **kwargs):
-        if isinstance(sender, ResourceGuestCell):
-            cell: ResourceGuestCell = sender
-            part = kwargs.get('part')
-            if part == 'name':
+        for rsc, part in ResourceSignals.changes(sender, kwargs):
+            if isinstance(rsc, ResourceGuestCell) and part == 'name':
+                cell: ResourceGuestCell = rsc
                 self._ui.label_guestcell_name.setText(cell.name())
                 self._update_guestcells()
+                return
 
     def _update_guestcells(self):
         if self._guestcells is None:
@@ -1,7 +1,7 @@
 from inspect import isclass, isfunction
 import json
 import os
-from typing import Callable, Optional, List, Set, Any, Union
+from typing import Callable, Optional, List, Set, Any, Union, Tuple, Iterable, Iterator
 import logging
 import toml
 import blinker
@@ -12,9 +12,25 @@ from collections import OrderedDict
 import traceback
 import uuid
 import itertools
-import copy
+import bisect
+import heapq
 import enum
 import base64
+import tempfile
+import stat
+import struct
+import hashlib
+import concurrent.futures
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 # 资源结构
 # Resource
@@ -41,6 +57,9 @@ class ResourceRootCell(ResourceBase): pass  # type: ignore
 class ResourceGuestCellList(ResourceBase): pass  # type: ignore
 class ResourceGuestCell(ResourceBase): pass  # type: ignore
 class ResourceComm(ResourceBase): pass  # type: ignore
+class JhrContainer: pass  # type: ignore
+class AddressAllocator: pass  # type: ignore
+class RegionSet: pass  # type: ignore
 
 class ARMArch(enum.Enum):
     AArch32 = "AArch32"
@@ -60,7 +79,26 @@ class ResourceSignals:
     value_changed = blinker.Signal("value_changed")
     # 当Resource第一次发生修改时发送
     # 由发送变化的Resource对象发送
+    # 批量修改结束时由batch所在的对象合并发送一次，nodes=[修改的元素]
     modified = blinker.Signal('modified')
+    # 保存后清除修改标记时发送
+    # 由保存的Resource发送，nodes=[清除标记的元素]
+    saved = blinker.Signal('saved')
+
+    @staticmethod
+    def nodes(sender, kwargs: dict) -> list:
+        """
+        返回modified信号涉及的元素
+        """
+        return kwargs.get('nodes', [sender])
+
+    @staticmethod
+    def changes(sender, kwargs: dict) -> list:
+        """
+        返回value_changed信号涉及的(元素, 改变的内容)
+        批量修改结束时合并发送，changes=[(元素, part)]
+        """
+        return kwargs.get('changes', [(sender, kwargs.get('part'))])
 
 
 class DictHelper(object):
@@ -95,6 +133,7 @@ class DictHelper(object):
                 return False
             setattr(obj, name, value)
             return True
+        _setattr.attr = name
         return _setattr
 
     @classmethod
@@ -107,12 +146,52 @@ class DictHelper(object):
                 cls.logger.error(f"attr {name} in object {obj} is function")
                 return Err(f"attr {name} in object {obj} is function")
             return Ok(getattr(obj, name))
+        _getattr.attr = name
         return _getattr
 
     @classmethod
     def common_getset(cls, name: str):
         return DictHelper.common_get(name), DictHelper.common_set(name)
 
+    @classmethod
+    def size_to_value(cls, size):
+        """
+        大小转为字典中的值，按GB/MB/KB取整时转为字符串
+        """
+        if size == 0:
+            return size
+        if size%cls.GB == 0:
+            return f"{size//cls.GB}GB"
+        if size%cls.MB == 0:
+            return f"{size//cls.MB}MB"
+        if size%cls.KB == 0:
+            return f"{size//cls.KB}KB"
+        return size
+
+    @classmethod
+    def size_from_value(cls, value) -> Optional[int]:
+        """
+        从字典中的值解析大小，失败返回None
+        """
+        if isinstance(value, str):
+            try:
+                if value.endswith('GB'):
+                    value = int(value[0:-2])*cls.GB
+                elif value.endswith('MB'):
+                    value = int(value[0:-2])*cls.MB
+                elif value.endswith('KB'):
+                    value = int(value[0:-2])*cls.KB
+                else:
+                    cls.logger.error("invalid size value")
+                    return None
+            except:
+                cls.logger.error("invalid size value")
+                return None
+        if not isinstance(value, int):
+            cls.logger.error("type error")
+            return None
+        return value
+
     @classmethod
     def size_get(cls, name: str):
         def _getattr(obj: object) -> Result[Any, str]:
@@ -122,16 +201,9 @@ class DictHelper(object):
             if isfunction(getattr(obj, name)):
                 cls.logger.error(f"attr {name} in object {obj} is function")
                 return Err(f"attr {name} in object {obj} is function")
-            size = getattr(obj, name)
-            if size == 0:
-                return Ok(size)
-            if size%cls.GB == 0:
-                return Ok(f"{size//cls.GB}GB")
-            if size%cls.MB == 0:
-                return Ok(f"{size//cls.MB}MB")
-            if size%cls.KB == 0:
-                return Ok(f"{size//cls.KB}KB")
-            return Ok(size)
+            return Ok(cls.size_to_value(getattr(obj, name)))
+        _getattr.attr = name
+        _getattr.size = True
         return _getattr
 
     @classmethod
@@ -143,118 +215,243 @@ class DictHelper(object):
             if isfunction(getattr(obj, name)):
                 cls.logger.error(f"attr {name} in object {obj} is function")
                 return False
-            if isinstance(value, str):
-                try:
-                    if value.endswith('GB'):
-                        value = int(value[0:-2])*cls.GB
-                    elif value.endswith('MB'):
-                        value = int(value[0:-2])*cls.MB
-                    elif value.endswith('KB'):
-                        value = int(value[0:-2])*cls.KB
-                    else:
-                        cls.logger.error("invalid size value")
-                        return False
-                except:
-                    cls.logger.error("invalid size value")
-                    return False
-            if not isinstance(value, int):
-                cls.logger.error("type error")
+            value = cls.size_from_value(value)
+            if value is None:
                 return False
             setattr(obj, name, value)
             return True
+        _setattr.attr = name
+        _setattr.size = True
         return _setattr
 
     @classmethod
     def size_getset(cls, name: str):
         return DictHelper.size_get(name), DictHelper.size_set(name)
 
-    @classmethod
-    def from_dict(cls, items: List[Item], obj: object, value: dict) -> bool:
+    class Step(object):
         """
-        从字典加载数据
+        编译后的单个字段
         """
-        for item in items:
+        def __init__(self, item) -> None:
+            self.item = item
             keys = item.keys
             if isinstance(keys, str):
                 keys = keys.split('.')
+            self.keys = tuple(keys)
+            self.parents = self.keys[0:-1]
+            self.last = self.keys[-1]
+            self.types = item.types
+            self.require = item.require
+            # 使用common/size的getset时直接访问属性，不再经过闭包
+            self.get_attr = getattr(item.get, 'attr', None)
+            self.set_attr = getattr(item.set, 'attr', None)
+            self.get_size = getattr(item.get, 'size', False)
+            self.set_size = getattr(item.set, 'size', False)
+            # 枚举查找表，名称不区分大小写
+            self.enum_lookup = None
+            if isclass(item.types) and issubclass(item.types, enum.Enum):
+                self.enum_lookup = {name.upper(): e for name, e in item.types.__members__.items()}
 
-            if not isinstance(keys, (list, tuple)):
-                cls.logger.error("items error {keys}")
-                return False
+    class Plan(object):
+        """
+        items编译后的结果，每个items列表只编译一次
+        """
+        def __init__(self, items) -> None:
+            self.items = items
+            self.steps = [DictHelper.Step(item) for item in items]
+            # 已检查过属性的对象类型
+            self.checked_types = set()
+
+        def check_type(self, obj) -> bool:
+            """
+            检查对象包含所有直接访问的属性，每种类型只检查一次
+            """
+            _type = type(obj)
+            if _type in self.checked_types:
+                return True
+            for step in self.steps:
+                for name in (step.get_attr, step.set_attr):
+                    if name is None:
+                        continue
+                    if not hasattr(obj, name):
+                        DictHelper.logger.error(f"attr {name} not found in {obj}")
+                        return False
+                    if isfunction(getattr(obj, name)):
+                        DictHelper.logger.error(f"attr {name} in object {obj} is function")
+                        return False
+            self.checked_types.add(_type)
+            return True
+
+    _plans = dict()
+
+    @classmethod
+    def compile(cls, items: List[Item]) -> Optional[Plan]:
+        plan = cls._plans.get(id(items))
+        if plan is not None and plan.items is items:
+            return plan
+        for item in items:
+            if not isinstance(item.keys, (str, list, tuple)):
+                cls.logger.error(f"items error {item.keys}")
+                return None
+        plan = cls.Plan(items)
+        cls._plans[id(items)] = plan
+        return plan
+
+    @classmethod
+    def from_dict(cls, items: List[Item], obj: object, value: dict) -> bool:
+        """
+        从字典加载数据
+        """
+        plan = cls.compile(items)
+        if plan is None or not plan.check_type(obj):
+            return False
 
+        for step in plan.steps:
             v = value
-            for key in keys:
+            for key in step.keys:
                 if not isinstance(v, dict):
                     cls.logger.error(f"[{key}] not a dict")
                     traceback.print_stack()
                     return False
                 v = v.get(key)
 
-            if v is None and not item.require:
-                cls.logger.debug(f"{keys} not found, ignore")
+            if v is None and not step.require:
+                cls.logger.debug(f"{step.keys} not found, ignore")
                 continue
 
-            if isclass(item.types) and issubclass(item.types, enum.Enum):
+            if step.enum_lookup is not None:
                 # 字符串转枚举值
-                enum_type = item.types
-                enum_value = None
-                for name in enum_type.__members__:
-                    if v.upper() == name.upper():
-                        enum_value = enum_type.__members__[name]
-                        break
+                enum_value = step.enum_lookup.get(v.upper()) if isinstance(v, str) else None
                 if enum_value is None:
-                    cls.logger.error(f'unknown enum value {v} for type {enum_type}')
+                    cls.logger.error(f'unknown enum value {v} for type {step.types}')
                     return False
                 v = enum_value
 
-            if not isinstance(v, item.types):
-                cls.logger.error(f'[{item.keys}]({v}) type error expect {item.types} but {type(v)}: {value}')
+            if not isinstance(v, step.types):
+                cls.logger.error(f'[{step.item.keys}]({v}) type error expect {step.types} but {type(v)}: {value}')
                 return False
 
-            ret = item.set(obj, v)
-            if not ret:
-                return ret
+            if step.set_attr is None:
+                ret = step.item.set(obj, v)
+                if not ret:
+                    return ret
+                continue
+
+            if step.set_size:
+                v = cls.size_from_value(v)
+                if v is None:
+                    return False
+            setattr(obj, step.set_attr, v)
 
         return True
 
     @classmethod
     def to_dict(cls, items, obj) -> Optional[dict]:
+        plan = cls.compile(items)
+        if plan is None or not plan.check_type(obj):
+            return None
+
         value = OrderedDict()
-        for item in items:
-            v: Result = item.get(obj)
-            if v.is_err():
-                return None
-            v = v.value
-            if not isinstance(v, item.types):
-                cls.logger.error(f"[{item.keys}] type error, expect {item.types} but {type(v)}")
+        for step in plan.steps:
+            if step.get_attr is None:
+                v: Result = step.item.get(obj)
+                if v.is_err():
+                    return None
+                v = v.value
+            else:
+                v = getattr(obj, step.get_attr)
+                if step.get_size:
+                    v = cls.size_to_value(v)
+
+            if not isinstance(v, step.types):
+                cls.logger.error(f"[{step.item.keys}] type error, expect {step.types} but {type(v)}")
                 return None
 
             if isinstance(v, enum.Enum):
                 # 枚举转为字符串
                 v = v.name
 
-            keys = item.keys
-            if isinstance(keys, str):
-                keys = keys.split('.')
-
-            if not isinstance(keys, (list, tuple)):
-                cls.logger.error("items error")
-                return None
-
             sub_dict = value
-            for key in keys[0:-1]:
-                if key not in sub_dict:
-                    sub_dict[key] = OrderedDict()
-                sub_dict = sub_dict[key]
-            sub_dict[keys[-1]] = v
+            for key in step.parents:
+                child = sub_dict.get(key)
+                if child is None:
+                    child = OrderedDict()
+                    sub_dict[key] = child
+                sub_dict = child
+            sub_dict[step.last] = v
 
         return value
 
+    @classmethod
+    def copy(cls, items, dst, src) -> bool:
+        """
+        按items在两个对象之间复制字段，不经过字典
+        """
+        plan = cls.compile(items)
+        if plan is None or not plan.check_type(src) or not plan.check_type(dst):
+            return False
+
+        for step in plan.steps:
+            if step.get_attr is not None and step.set_attr is not None:
+                setattr(dst, step.set_attr, getattr(src, step.get_attr))
+                continue
+            v: Result = step.item.get(src)
+            if v.is_err():
+                return False
+            if not step.item.set(dst, v.value):
+                return False
+        return True
+
+
+class RegionSweep(object):
+    """
+    区间冲突检测
+
+    对区间按起始地址排序后扫描，使用以结束地址为键的最小堆维护活动区间，
+    复杂度为O(n log n + k)，k为重叠的区间对数量。
+    区间重叠的判定与MemRegion.is_overlap一致，大小为0的区间不与任何区间重叠。
+    """
+
+    @staticmethod
+    def spans(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """
+        spans为(addr, size)列表，返回所有重叠区间的索引对(i, j)，i<j，按索引排序
+        """
+        order = sorted(filter(lambda i: spans[i][1] > 0, range(len(spans))), key=lambda i: spans[i][0])
+        pairs = list()
+        active = list()
+        for idx in order:
+            addr, size = spans[idx]
+            while active and active[0][0] <= addr:
+                heapq.heappop(active)
+            for _, other in active:
+                pairs.append((other, idx) if other < idx else (idx, other))
+            heapq.heappush(active, (addr+size, idx))
+        pairs.sort()
+        return pairs
+
+    @classmethod
+    def regions(cls, regions: list) -> List[Tuple[int, int]]:
+        """
+        regions中的元素需要提供addr()和size()
+        """
+        return cls.spans([(r.addr(), r.size()) for r in regions])
+
+    @classmethod
+    def labeled(cls, items: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+        """
+        items为(label, region)列表，返回重叠区间的标签对
+        """
+        pairs = cls.regions([item[1] for item in items])
+        return [(items[i][0], items[j][0]) for i, j in pairs]
+
 
 class MemRegion(object):
     """
     通用的mem region
     """
+    __slots__ = ('_addr', '_size')
+
     items = [
         DictHelper.Item("addr", int, *DictHelper.common_getset("_addr")),
         DictHelper.Item("size", (str, int), *DictHelper.size_getset("_size")),
@@ -298,52 +495,264 @@ class MemRegion(object):
         """
         检查region列表是否重叠
         """
-        for pair in itertools.combinations(regions, 2):
-            if pair[0].is_overlap(pair[1]):
-                return False
-        return True
+        return len(MemRegion.overlap_pairs(regions)) == 0
+
+    @staticmethod
+    def overlap_pairs(regions: list) -> List[Tuple[int, int]]:
+        """
+        返回region列表中所有重叠的索引对
+        """
+        return RegionSweep.regions(regions)
 
     @staticmethod
     def list_merge(regions: list) -> list:
-        regions = sorted(regions, key=lambda x: x.addr())
-        temp = None
-        new_regions = list()
-        for mem in regions:
-            if temp is None:
-                temp = mem
-                continue
-            if mem.addr() >= temp.addr() and mem.addr() < (temp.addr()+temp.size()):
-                size = max((temp.size(), mem.addr()+mem.size()-temp.addr))
-                temp = MemRegion(temp.addr(), size)
-            else:
-                new_regions.append(temp)
-                temp = None
-        if temp is not None:
-            new_regions.append(temp)
-        return new_regions
+        """
+        合并重叠或相邻的region，返回按起始地址排序的新列表
+        """
+        return RegionSet.regions_of(regions).regions()
 
     def __repr__(self) -> str:
         return f"{self._size:x}@{self._addr:x}"
 
 class MemRegionList(object):
+    """
+    内存区间列表
+
+    内部维护按起始地址排序的索引(起始地址、结束地址以及结束地址的前缀最大值)，
+    重叠、包含查询使用二分查找，复杂度为O(log n)。索引在添加区间后的第一次查询时重建。
+    """
     def __init__(self) -> None:
         self._regions: List[MemRegion] = list()
+        # 排序索引, None表示需要重建
+        self._sorted: Optional[List[MemRegion]] = None
+        self._starts: List[int] = list()
+        self._ends: List[int] = list()
+        self._max_ends: List[int] = list()
 
     def add(self, addr, size):
         self._regions.append(MemRegion(addr, size))
+        self._sorted = None
+
+    def regions(self) -> List[MemRegion]:
+        return self._regions
+
+    def _build_index(self):
+        # 大小为0的区间不会与任何区间重叠，也不能包含非空区间，不加入索引
+        regions = sorted(filter(lambda x: x.size() > 0, self._regions), key=lambda x: x.addr())
+        self._starts = [r.addr() for r in regions]
+        self._ends = [r.end() for r in regions]
+        self._max_ends = list(itertools.accumulate(self._ends, max))
+        self._sorted = regions
+
+    def _index(self) -> List[MemRegion]:
+        if self._sorted is None:
+            self._build_index()
+        return self._sorted
 
     def is_overlap(self, addr, size) -> bool:
-        for region in self._regions:
-            if region.is_overlap(MemRegion(addr, size)):
-                return True
-        return False
+        self._index()
+        if size <= 0:
+            return False
+        # 起始地址小于addr+size的区间中，最大的结束地址大于addr即重叠
+        idx = bisect.bisect_left(self._starts, addr+size)
+        if idx == 0:
+            return False
+        return self._max_ends[idx-1] > addr
 
     def contains( self, m: MemRegion ) -> bool:
-        # 检查是否包含内存区间
-        for region in self._regions:
-            if region.addr() <= m.addr() and m.addr()+m.size() <= region.addr()+region.size():
-                return True
-        return False
+        # 检查是否包含内存区间(需要被某一个区间完整包含)
+        self._index()
+        if m.size() == 0:
+            # 与原有语义保持一致，空区间只需起始地址位于某个区间内
+            for region in self._regions:
+                if region.addr() <= m.addr() <= region.end():
+                    return True
+            return False
+        idx = bisect.bisect_right(self._starts, m.addr())
+        if idx == 0:
+            return False
+        return self._max_ends[idx-1] >= m.end()
+
+    def intersect(self, addr, size) -> List[MemRegion]:
+        """
+        返回与[addr, addr+size)相交的所有区间，按起始地址排序
+        """
+        regions = self._index()
+        if size <= 0:
+            return list()
+        result = list()
+        idx = bisect.bisect_left(self._starts, addr+size)-1
+        # 从后向前遍历，前缀最大结束地址不大于addr时，之前的区间都不会相交
+        while idx >= 0 and self._max_ends[idx] > addr:
+            if self._ends[idx] > addr:
+                result.append(regions[idx])
+            idx -= 1
+        result.reverse()
+        return result
+
+    def __len__(self):
+        return len(self._regions)
+
+    def __iter__(self):
+        return iter(self._regions)
+
+
+class RegionSet(object):
+    """
+    地址区间集合
+
+    保存为按起始地址排序、互不重叠也不相邻的半开区间[start, end)，
+    并、交、差通过一次归并扫描完成，复杂度为O(n+m)，覆盖查询使用二分查找。
+    大小为0的区间不加入集合。
+    """
+    __slots__ = ('_starts', '_ends')
+
+    def __init__(self, spans: Iterable[Tuple[int, int]] = ()) -> None:
+        """
+        spans为(addr, size)列表，重叠或相邻的区间会被合并
+        """
+        self._starts: List[int] = list()
+        self._ends: List[int] = list()
+        for addr, end in sorted((addr, addr+size) for addr, size in spans if size > 0):
+            if self._ends and addr <= self._ends[-1]:
+                if end > self._ends[-1]:
+                    self._ends[-1] = end
+                continue
+            self._starts.append(addr)
+            self._ends.append(end)
+
+    @classmethod
+    def regions_of(cls, regions: list) -> RegionSet:
+        """
+        regions中的元素需要提供addr()和size()
+        """
+        return cls((r.addr(), r.size()) for r in regions)
+
+    @classmethod
+    def _from_bounds(cls, starts: List[int], ends: List[int]) -> RegionSet:
+        value = cls()
+        value._starts = starts
+        value._ends = ends
+        return value
+
+    def spans(self) -> List[Tuple[int, int]]:
+        """
+        返回(addr, size)列表
+        """
+        return [(start, end-start) for start, end in zip(self._starts, self._ends)]
+
+    def regions(self) -> List[MemRegion]:
+        return [MemRegion(start, end-start) for start, end in zip(self._starts, self._ends)]
+
+    def total(self) -> int:
+        """
+        集合覆盖的字节数
+        """
+        return sum(self._ends)-sum(self._starts)
+
+    def _bounds(self) -> Iterator[int]:
+        for start, end in zip(self._starts, self._ends):
+            yield start
+            yield end
+
+    def _sweep(self, other: RegionSet, keep: Callable[[bool, bool], bool]) -> RegionSet:
+        # 按边界点归并扫描，keep(在self中, 在other中)决定该段是否保留
+        # 区间互不相邻，每个集合的边界依次排列已严格递增，两路归并即可
+        bounds = list()
+        for bound in heapq.merge(self._bounds(), other._bounds()):
+            if len(bounds) == 0 or bounds[-1] != bound:
+                bounds.append(bound)
+        starts, ends = list(), list()
+        i = j = 0
+        for lo, hi in zip(bounds, bounds[1:]):
+            while i < len(self._ends) and self._ends[i] <= lo:
+                i += 1
+            while j < len(other._ends) and other._ends[j] <= lo:
+                j += 1
+            in_self = i < len(self._starts) and self._starts[i] <= lo
+            in_other = j < len(other._starts) and other._starts[j] <= lo
+            if not keep(in_self, in_other):
+                continue
+            if ends and ends[-1] == lo:
+                ends[-1] = hi
+            else:
+                starts.append(lo)
+                ends.append(hi)
+        return self._from_bounds(starts, ends)
+
+    def union(self, other: RegionSet) -> RegionSet:
+        return self._sweep(other, lambda a, b: a or b)
+
+    def intersection(self, other: RegionSet) -> RegionSet:
+        return self._sweep(other, lambda a, b: a and b)
+
+    def difference(self, other: RegionSet) -> RegionSet:
+        return self._sweep(other, lambda a, b: a and not b)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def covers(self, addr: int, size: int) -> bool:
+        """
+        [addr, addr+size)是否完全包含在集合中，可以跨越多个原始区间
+        """
+        idx = bisect.bisect_right(self._starts, addr)-1
+        if idx < 0:
+            return False
+        if size <= 0:
+            return addr < self._ends[idx]
+        return self._ends[idx] >= addr+size
+
+    def overlaps(self, addr: int, size: int) -> bool:
+        """
+        [addr, addr+size)是否与集合相交
+        """
+        if size <= 0:
+            return False
+        idx = bisect.bisect_left(self._starts, addr+size)-1
+        return idx >= 0 and self._ends[idx] > addr
+
+    def coverage(self, addr: int, size: int) -> int:
+        """
+        [addr, addr+size)中被集合覆盖的字节数
+        """
+        if size <= 0:
+            return 0
+        end = addr+size
+        idx = max(bisect.bisect_right(self._starts, addr)-1, 0)
+        covered = 0
+        while idx < len(self._starts) and self._starts[idx] < end:
+            covered += max(0, min(end, self._ends[idx])-max(addr, self._starts[idx]))
+            idx += 1
+        return covered
+
+    def gaps(self, addr: Optional[int] = None, size: Optional[int] = None) -> RegionSet:
+        """
+        [addr, addr+size)中未被覆盖的部分，未指定时为集合首尾之间的空洞
+        """
+        if addr is None or size is None:
+            if len(self._starts) == 0:
+                return RegionSet()
+            return self._from_bounds(self._ends[:-1], self._starts[1:])
+        return RegionSet([(addr, size)]).difference(self)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return iter(zip(self._starts, self._ends))
+
+    def __bool__(self):
+        return len(self._starts) > 0
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RegionSet):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends
+
+    def __repr__(self) -> str:
+        return f"RegionSet({', '.join(f'{e-s:x}@{s:x}' for s, e in zip(self._starts, self._ends))})"
 
 
 class MemMap(object):
@@ -369,6 +778,8 @@ class MemMap(object):
                     return e
             return None
 
+    __slots__ = ('_phys', '_virt', '_size', '_type', '_comment')
+
     items = [
         DictHelper.Item("phys", int, *DictHelper.common_getset("_phys")),
         DictHelper.Item("virt", int, *DictHelper.common_getset("_virt")),
@@ -422,18 +833,223 @@ class MemMap(object):
         """
         检查region列表是否重叠
         """
-        for pair in itertools.combinations(maps, 2):
-            if pair[0].is_overlap(pair[1]):
-                return False
-        return True
+        return len(MemMap.overlap_pairs(maps)) == 0
+
+    @staticmethod
+    def overlap_pairs(maps: list) -> List[Tuple[int, int]]:
+        """
+        返回mem map列表中物理地址或虚拟地址重叠的索引对
+        """
+        phys = RegionSweep.spans([(m.phys(), m.size()) for m in maps])
+        virt = RegionSweep.spans([(m.virt(), m.size()) for m in maps])
+        return sorted(set(phys).union(virt))
 
     def __repr__(self) -> str:
         return f"{self._size:x}@{self._phys}:{self._virt}"
 
 
+class AddressAllocator(object):
+    """
+    地址空间分配器
+
+    空闲区间同时按起始地址和(大小, 起始地址)排序保存，分配时从不小于size的
+    空闲区间开始按大小递增查找第一个对齐后能容纳的区间(最佳适配)。
+    查找为O(log n + k)，k为大小在[size, size+align-1)之间的空闲区间数；
+    区间保存在有序列表中，插入和删除需要移动元素，复杂度为O(n)。
+    保留和释放区间时与相邻的空闲区间合并或拆分。
+    """
+    def __init__(self) -> None:
+        # 按起始地址排序的空闲区间
+        self._starts: List[int] = list()
+        self._ends: List[int] = list()
+        # 按(大小, 起始地址)排序的空闲区间
+        self._by_size: List[Tuple[int, int]] = list()
+
+    def _insert(self, addr: int, end: int):
+        idx = bisect.bisect_left(self._starts, addr)
+        self._starts.insert(idx, addr)
+        self._ends.insert(idx, end)
+        bisect.insort(self._by_size, (end-addr, addr))
+
+    def _pop(self, idx: int) -> Tuple[int, int]:
+        addr = self._starts.pop(idx)
+        end = self._ends.pop(idx)
+        del self._by_size[bisect.bisect_left(self._by_size, (end-addr, addr))]
+        return addr, end
+
+    def free(self, addr: int, size: int):
+        """
+        将[addr, addr+size)加入空闲区间，与重叠或相邻的空闲区间合并
+        """
+        if size <= 0:
+            return
+        end = addr+size
+        idx = bisect.bisect_left(self._starts, addr)
+        if idx > 0 and self._ends[idx-1] >= addr:
+            idx -= 1
+        while idx < len(self._starts) and self._starts[idx] <= end:
+            start, stop = self._pop(idx)
+            addr = min(addr, start)
+            end = max(end, stop)
+        self._insert(addr, end)
+
+    def reserve(self, addr: int, size: int):
+        """
+        从空闲区间中去掉[addr, addr+size)，不在空闲区间中的部分忽略
+        """
+        if size <= 0:
+            return
+        end = addr+size
+        idx = bisect.bisect_right(self._starts, addr)
+        if idx > 0 and self._ends[idx-1] > addr:
+            idx -= 1
+        while idx < len(self._starts) and self._starts[idx] < end:
+            start, stop = self._pop(idx)
+            if start < addr:
+                self._insert(start, addr)
+                idx += 1
+            if stop > end:
+                self._insert(end, stop)
+                idx += 1
+
+    def is_free(self, addr: int, size: int) -> bool:
+        """
+        [addr, addr+size)是否完整位于某个空闲区间中
+        """
+        idx = bisect.bisect_right(self._starts, addr)-1
+        return idx >= 0 and self._ends[idx] >= addr+size
+
+    def allocate(self, size: int, align: int = 4096) -> Optional[int]:
+        """
+        分配size字节，起始地址按align对齐，成功返回起始地址并保留该区间，失败返回None
+        """
+        if size <= 0 or align <= 0:
+            return None
+        # 大小不小于size+align-1的空闲区间一定能容纳，因此最多检查到第一个这样的区间
+        idx = bisect.bisect_left(self._by_size, (size, ))
+        while idx < len(self._by_size):
+            free_size, start = self._by_size[idx]
+            addr = (start+align-1)//align*align
+            if addr+size <= start+free_size:
+                self.reserve(addr, size)
+                return addr
+            idx += 1
+        return None
+
+    def regions(self) -> List[MemRegion]:
+        """
+        返回按起始地址排序的空闲区间
+        """
+        return [MemRegion(addr, end-addr) for addr, end in zip(self._starts, self._ends)]
+
+    def largest(self) -> int:
+        """
+        最大空闲区间的大小
+        """
+        if len(self._by_size) == 0:
+            return 0
+        return self._by_size[-1][0]
+
+    def total(self) -> int:
+        return sum(map(lambda x: x[0], self._by_size))
+
+    def __len__(self):
+        return len(self._starts)
+
+    @classmethod
+    def physical(cls, rsc: Resource) -> AddressAllocator:
+        """
+        板级内存中除去hypervisor、rootcell系统内存、ivshmem和guest cell系统内存后的物理地址空间
+        """
+        allocator = cls()
+        for region in rsc.platform().board().ram_regions():
+            allocator.free(region.addr(), region.size())
+
+        rootcell = rsc.jailhouse().rootcell()
+        hypervisor = rootcell.hypervisor()
+        allocator.reserve(hypervisor.addr(), hypervisor.size())
+        for mem in rootcell.system_mem():
+            allocator.reserve(mem.addr(), mem.size())
+
+        guestcells = rsc.jailhouse().guestcells()
+        ivshmem = rsc.jailhouse().ivshmem()
+        # 每个peer一个输出区间，包括root cell
+        ivshmem_size = ivshmem.ivshmem_state_size() + ivshmem.ivshmem_rw_size() + ivshmem.ivshmem_out_size()*(guestcells.cell_count()+1)
+        allocator.reserve(ivshmem.ivshmem_phys(), ivshmem_size)
+        for cell in guestcells:
+            for mem in cell.system_mem():
+                allocator.reserve(mem.phys(), mem.size())
+        return allocator
+
+    @classmethod
+    def guest_virtual(cls, cell: ResourceGuestCell) -> AddressAllocator:
+        """
+        guest cell的虚拟地址空间中除去ivshmem、communication region、pci mmconfig、
+        系统内存和地址空间映射后的部分
+        """
+        allocator = cls()
+        bits = 32 if cell.arch() is ARMArch.AArch32 else 48
+        allocator.free(0, 1 << bits)
+
+        rootcell: ResourceRootCell = cell.find(ResourceRootCell)
+        ivshmem: ResourceComm = cell.find(ResourceJailhouse).ivshmem()
+        guestcells: ResourceGuestCellList = cell.find(ResourceGuestCellList)
+        # 每个peer一个输出区间，包括root cell
+        ivshmem_size = ivshmem.ivshmem_state_size() + ivshmem.ivshmem_rw_size() + ivshmem.ivshmem_out_size()*(guestcells.cell_count()+1)
+        allocator.reserve(cell.ivshmem_virt_addr(), ivshmem_size)
+        # 与Checklist中的大小一致
+        allocator.reserve(cell.comm_region(), 64*1024)
+        allocator.reserve(rootcell.pci_mmconfig().base_addr, 0x08000000)
+        for mem in cell.system_mem():
+            allocator.reserve(mem.virt(), mem.size())
+        for mem in cell.memmaps():
+            allocator.reserve(mem.virt(), mem.size())
+        return allocator
+
+
 class ResourceBase(metaclass=abc.ABCMeta):
     logger = logging.getLogger("ResourceBase")
 
+    # 延迟加载时才会创建的子节点类型，按类型查找时先加载
+    lazy_children: Tuple[type, ...] = ()
+
+    # 全局递增的修改版本号
+    _revisions = itertools.count(1)
+
+    class Batch(object):
+        """
+        批量修改，期间不发送modified和value_changed信号，结束时合并发送一次
+        """
+        # 当前未结束的batch数量，为0时发送信号不需要查找batch
+        active = 0
+
+        def __init__(self, owner: ResourceBase) -> None:
+            self.owner = owner
+            self.depth = 0
+            self.modified = dict()
+            self.changes = list()
+
+        def __enter__(self):
+            if self.depth == 0:
+                ResourceBase.Batch.active += 1
+                self.owner._batch = self
+            self.depth += 1
+            return self.owner
+
+        def __exit__(self, exc_type, exc_value, tb):
+            self.depth -= 1
+            if self.depth > 0:
+                return False
+            ResourceBase.Batch.active -= 1
+            self.owner._batch = None
+
+            # 发生异常时已完成的修改仍然有效，同样需要通知
+            if len(self.modified) > 0:
+                ResourceSignals.modified.send(self.owner, nodes=list(self.modified.values()))
+            if len(self.changes) > 0:
+                ResourceSignals.value_changed.send(self.owner, changes=self.changes)
+            return False
+
     def __init__(self, parent) -> None:
         super().__init__()
         self._parent = None
@@ -442,17 +1058,76 @@ class ResourceBase(metaclass=abc.ABCMeta):
         self._children = list()
         self._properities = dict()
         self._is_modified = False
+        # 自身或子孙节点被修改过的直接子节点，修改时向根节点传播
+        self._dirty_children = set()
+        # 在父节点中的位置，由父节点维护，None表示父节点不是ResourceBase
+        self._index: Optional[int] = None
+        # 祖先节点缓存，类型->weakref，父节点在创建后不会改变
+        self._ancestors = dict()
+        # 类型索引，只在根节点(Resource)中使用，None表示需要重建
+        self._nodes: Optional[List[ResourceBase]] = None
+        self._type_index = dict()
+        # 修改版本号，只在根节点(Resource)中使用
+        self._revision = 0
+        # 未结束的批量修改
+        self._batch: Optional[ResourceBase.Batch] = None
+        # 延迟加载，第一次访问时调用，返回是否成功
+        self._loader: Optional[Callable[[], bool]] = None
+        # 延迟加载失败，节点内容不完整，不能保存
+        self._load_failed = False
 
     def is_modified(self, with_children=False):
         if self._is_modified:
             return True
-        if not with_children:
-            return self._is_modified
+        return with_children and len(self._dirty_children) > 0
 
-        for child in self._children:
-            if child.is_modified(True):
-                return True
-        return False
+    def _mark_modified(self):
+        self._is_modified = True
+        # 父节点中已经记录时，更上层的节点也已记录
+        node = self
+        while node._parent is not None:
+            p = node._parent()
+            if not isinstance(p, ResourceBase) or node in p._dirty_children:
+                break
+            p._dirty_children.add(node)
+            node = p
+
+    def _update_dirty(self):
+        """
+        自身及子孙节点都未修改时，从祖先节点的记录中移除
+        """
+        node = self
+        while not node._is_modified and len(node._dirty_children) == 0:
+            p = node._parent() if node._parent is not None else None
+            if not isinstance(p, ResourceBase) or node not in p._dirty_children:
+                break
+            p._dirty_children.discard(node)
+            node = p
+
+    def modified_nodes(self) -> List[ResourceBase]:
+        """
+        返回上次保存后被修改过的节点，只遍历有修改的子树
+        """
+        nodes = list()
+        stack = [self]
+        while stack:
+            o = stack.pop()
+            if o._is_modified:
+                nodes.append(o)
+            stack.extend(o._dirty_children)
+        return nodes
+
+    def clear_modified(self):
+        """
+        清除自身及子孙节点的修改标记，保存后调用
+        """
+        stack = [self]
+        while stack:
+            o = stack.pop()
+            o._is_modified = False
+            stack.extend(o._dirty_children)
+            o._dirty_children.clear()
+        self._update_dirty()
 
     def parent(self) -> Optional[ResourceBase]:
         if self._parent is None:
@@ -461,40 +1136,172 @@ class ResourceBase(metaclass=abc.ABCMeta):
         return self._parent()
 
     def index(self, child: ResourceBase) -> int:
+        idx = getattr(child, '_index', None)
+        if idx is not None and idx < len(self._children) and self._children[idx] is child:
+            return idx
         return self._children.index(child)
 
     def my_index(self) -> int:
+        if self._index is not None:
+            return self._index
         return self.parent().index(self)
 
+    def _add_child(self, child: ResourceBase):
+        child._index = len(self._children)
+        self._children.append(child)
+        self._children_changed()
+
+    def _remove_child(self, child: ResourceBase):
+        self._remove_children([child])
+
+    def _remove_children(self, children: List[ResourceBase]):
+        """
+        批量删除子节点，之后统一重新编号
+        """
+        removed = set(map(id, children))
+        if not removed.issubset(map(id, self._children)):
+            raise ValueError(f"{children} not in children")
+        for child in children:
+            child._index = None
+            self._dirty_children.discard(child)
+        self._children = [c for c in self._children if id(c) not in removed]
+        for idx, child in enumerate(self._children):
+            child._index = idx
+        self._children_changed()
+        self._update_dirty()
+
+    def _children_changed(self):
+        """
+        子节点发生变化，使根节点的类型索引失效
+        """
+        ref = self._ancestors.get(Resource)
+        root = ref() if ref is not None else None
+        if root is None:
+            node = self
+            while isinstance(node, ResourceBase):
+                if isinstance(node, Resource):
+                    root = node
+                    break
+                node = node._parent() if node._parent is not None else None
+            if root is None:
+                return
+            self._ancestors[Resource] = weakref.ref(root)
+        root._nodes = None
+        root._type_index.clear()
+        root._revision = next(ResourceBase._revisions)
+
+    def revision(self) -> int:
+        """
+        所在资源树的修改版本号，树中任何节点被修改或增删子节点后递增
+        """
+        root = self.ancestor(Resource)
+        if root is None:
+            return 0
+        return root._revision
+
+    def _bump_revision(self):
+        root = self.ancestor(Resource)
+        if root is not None:
+            root._revision = next(ResourceBase._revisions)
+
     def ancestor(self, _type) -> Optional[ResourceBase]:
         if isinstance(self, _type):
             return self
 
-        p: ResourceBase =  self.parent()
-        while p is not None:
+        ref = self._ancestors.get(_type)
+        if ref is not None:
+            p = ref()
+            if p is not None:
+                return p
+
+        p: ResourceBase = self.parent()
+        while isinstance(p, ResourceBase):
             if isinstance(p, _type):
+                self._ancestors[_type] = weakref.ref(p)
                 return p
             p = p.parent()
         return None
 
+    def _find_all(self, _type) -> List[ResourceBase]:
+        """
+        根节点中按类型查找，结果按深度优先顺序排列并缓存
+        """
+        nodes = self._type_index.get(_type)
+        if nodes is not None:
+            return nodes
+
+        # 可能包含该类型子节点的延迟加载节点需要先加载，加载后子节点变化会使_nodes失效
+        for o in self._all_nodes():
+            if o._loader is not None and any(issubclass(t, _type) for t in o.lazy_children):
+                o._hydrate()
+        nodes = [o for o in self._all_nodes() if isinstance(o, _type)]
+        self._type_index[_type] = nodes
+        return nodes
+
+    def _all_nodes(self) -> List[ResourceBase]:
+        if self._nodes is None:
+            nodes = list()
+            stack = [self]
+            while stack:
+                o = stack.pop()
+                nodes.append(o)
+                stack.extend(reversed(o._children))
+            self._nodes = nodes
+        return self._nodes
+
     def find(self, _type) -> Optional[ResourceBase]:
         root = self.ancestor(Resource)
         if root is None:
             return None
 
-        def _find(o: ResourceBase, _type):
-            if isinstance(o, _type):
-                return o
-            for c in o._children:
-                x = _find(c, _type)
-                if x is not None:
-                    return x
-        return _find(root, _type)
+        nodes = root._find_all(_type)
+        if len(nodes) == 0:
+            return None
+        return nodes[0]
+
+    def find_all(self, _type) -> List[ResourceBase]:
+        """
+        查找资源树中所有指定类型的节点，按深度优先顺序排列
+        """
+        root = self.ancestor(Resource)
+        if root is None:
+            return list()
+        return list(root._find_all(_type))
+
+    def set_loader(self, loader: Callable[[], bool]):
+        self._loader = loader
+
+    def is_loaded(self) -> bool:
+        return self._loader is None
+
+    def load_failed(self) -> bool:
+        return self._load_failed
+
+    def _hydrate(self) -> bool:
+        """
+        执行延迟加载，只执行一次，失败后一直返回False
+        """
+        if self._loader is None:
+            return not self._load_failed
+        loader = self._loader
+        self._loader = None
+        try:
+            ok = loader()
+        except Exception as e:
+            self.logger.error(f"{self.label()} lazy load raised {type(e).__name__}: {e}")
+            ok = False
+        if not ok:
+            self.logger.error(f"{self.label()} lazy load failed.")
+            self._load_failed = True
+            return False
+        return True
 
     def __len__(self):
+        self._hydrate()
         return len(self._children)
 
     def __getitem__(self, item):
+        self._hydrate()
         if item<0 or item>=len(self._children):
             return None
         return self._children[item]
@@ -506,19 +1313,56 @@ class ResourceBase(metaclass=abc.ABCMeta):
         return self._properities.get(key)
 
     def set_modified(self):
-        self._is_modified = True
+        self._mark_modified()
+        self._send_modified()
+
+    def batch(self) -> Batch:
+        """
+        批量修改自身及子孙节点:
+            with rsc.batch():
+                ...
+        已在祖先节点的batch中时，合并到祖先节点的batch
+        """
+        batch = self._find_batch()
+        if batch is None:
+            batch = ResourceBase.Batch(self)
+        return batch
+
+    def _find_batch(self) -> Optional[Batch]:
+        if ResourceBase.Batch.active == 0:
+            return None
+        node = self
+        while isinstance(node, ResourceBase):
+            if node._batch is not None:
+                return node._batch
+            node = node._parent() if node._parent is not None else None
+        return None
+
+    def _send_modified(self):
+        self._bump_revision()
+        batch = self._find_batch()
+        if batch is not None:
+            batch.modified[id(self)] = self
+            return
         ResourceSignals.modified.send(self)
 
+    def _send_value_changed(self, part):
+        batch = self._find_batch()
+        if batch is not None:
+            batch.changes.append((self, part))
+            return
+        ResourceSignals.value_changed.send(self, part=part)
+
     @classmethod
     def modified(cls, fun):
         def wrapper(*args):
             if len(args) == 0 or not isinstance(args[0], ResourceBase):
                 return fun(*args)
             rsc = args[0]
-            rsc._is_modified = True
+            rsc._mark_modified()
             # cls.logger.debug(f"modified {fun}: {args}")
             ret = fun(*args)
-            ResourceSignals.modified.send(rsc)
+            rsc._send_modified()
             return ret
         return wrapper
 
@@ -538,6 +1382,8 @@ class ResourceBase(metaclass=abc.ABCMeta):
 class CPUDevice(object):
     logger = logging.getLogger("CPUDevice")
 
+    __slots__ = ('_name', '_addr', '_size', '_irq', '_type')
+
     items = [
         DictHelper.Item("addr", int, *DictHelper.common_getset("_addr")),
         DictHelper.Item("size", int, *DictHelper.common_getset("_size")),
@@ -614,6 +1460,8 @@ class CPURegion(object):
         PCI_IO = "pci_io"
         PCI_MEM = "pci_mem"
 
+    __slots__ = ('_name', '_type', '_addr', '_size')
+
     items = [
         DictHelper.Item("type", Type, *DictHelper.common_getset("_type"), False),
         DictHelper.Item("addr", int, *DictHelper.common_getset("_addr")),
@@ -679,6 +1527,9 @@ class ResourceCPU(ResourceBase):
 
         self._devices: List[CPUDevice] = list()
         self._regions: List[CPURegion] = list()
+        # 名称->设备/区域索引，在from_dict中重建
+        self._device_index: dict = dict()
+        self._region_index: dict = dict()
 
     def name(self) -> str:
         return self._name
@@ -711,20 +1562,38 @@ class ResourceCPU(ResourceBase):
         return self._devices
 
     def find_device(self, name: str) -> Optional[CPUDevice]:
-        for dev in self._devices:
-            if dev.name() == name:
-                return dev
-        return None
+        return self._device_index.get(name)
 
     def find_region(self, name: str) -> Optional[MemRegion]:
+        region = self._region_index.get(name)
+        if region is None:
+            return None
+        return MemRegion(region.addr(), region.size())
+
+    def _build_index(self):
+        self._device_index.clear()
+        self._region_index.clear()
+        # 名称重复时保留第一个，与顺序查找的结果一致
+        for dev in self._devices:
+            self._device_index.setdefault(dev.name(), dev)
         for region in self._regions:
-            if name == region.name():
-                return MemRegion(region.addr(), region.size())
-        return None
+            self._region_index.setdefault(region.name(), region)
 
     def label(self) -> str:
         return "CPU"
 
+    def copy_from(self, other: ResourceCPU) -> bool:
+        """
+        从已检查过的ResourceCPU复制，不重新解析字典
+        CPUDevice和CPURegion只在from_dict中创建，不会被修改，可以共享
+        """
+        if not DictHelper.copy(self.items, self, other):
+            return False
+        self._devices = list(other._devices)
+        self._regions = list(other._regions)
+        self._build_index()
+        return True
+
     def from_dict(self, cpu: dict) -> bool:
         if not DictHelper.from_dict(self.items, self, cpu):
             self.logger.error("cpu from dict failed.")
@@ -732,6 +1601,7 @@ class ResourceCPU(ResourceBase):
 
         self._devices.clear()
         self._regions.clear()
+        self._build_index()
 
         devices = cpu.get("devices")
         if not isinstance(devices, dict):
@@ -754,6 +1624,8 @@ class ResourceCPU(ResourceBase):
                 self.logger.error("region from dict failed.")
                 return False
             self._regions.append(region)
+
+        self._build_index()
         return True
 
     def to_dict(self) -> Optional[dict]:
@@ -827,6 +1699,17 @@ class ResourceBoard(ResourceBase):
     def label(self) -> str:
         return "Board"
 
+    def copy_from(self, other: ResourceBoard) -> bool:
+        """
+        从已检查过的ResourceBoard复制，不重新解析字典
+        """
+        if not DictHelper.copy(self.items, self, other):
+            return False
+        self.devices = list(other.devices)
+        self._cpus = set(other._cpus) if other._cpus is not None else None
+        self._ram_regions = [MemRegion(r.addr(), r.size()) for r in other._ram_regions]
+        return True
+
     @ResourceBase.modified
     def set_ram_regions(self, regions: List[MemRegion]):
         self._ram_regions = regions
@@ -893,8 +1776,8 @@ class ResourcePlatform(ResourceBase):
 
         self._cpu = ResourceCPU(self)
         self._board = ResourceBoard(self)
-        self._children.append(self._cpu)
-        self._children.append(self._board)
+        self._add_child(self._cpu)
+        self._add_child(self._board)
 
     def cpu(self):
         return self._cpu
@@ -1180,7 +2063,60 @@ class ResourceRootCell(ResourceBase):
         return rootcell
 
 
-class ImageInfo(object):
+class Snapshot(object):
+    """
+    只读快照，修改时通过replace生成新的快照，未修改的部分与原快照共享
+    """
+    _frozen = False
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(f"{type(self).__name__} snapshot is read-only")
+        super().__setattr__(name, value)
+
+    def is_frozen(self) -> bool:
+        return self._frozen
+
+    def _freeze_members(self):
+        """
+        将可变的成员转换为只读，由子类实现
+        """
+        pass
+
+    def freeze(self):
+        """
+        将自身转换为只读快照
+        """
+        if not self._frozen:
+            self._freeze_members()
+            self.__dict__['_frozen'] = True
+        return self
+
+    def snapshot(self):
+        """
+        返回只读快照，自身已是快照时直接返回
+        """
+        if self._frozen:
+            return self
+        return self.replace()
+
+    def replace(self, **kwargs):
+        """
+        返回修改了部分属性的只读快照，属性名可省略开头的'_'
+        """
+        new = object.__new__(type(self))
+        new.__dict__.update(self.__dict__)
+        new.__dict__['_frozen'] = False
+        for key, value in kwargs.items():
+            if key not in new.__dict__ and f"_{key}" in new.__dict__:
+                key = f"_{key}"
+            if key not in new.__dict__:
+                raise AttributeError(f"{type(self).__name__} has no attribute {key}")
+            new.__dict__[key] = value
+        return new.freeze()
+
+
+class ImageInfo(Snapshot):
     items = [
         DictHelper.Item("enable",   bool, *DictHelper.common_getset("enable")),
         DictHelper.Item("name",     str, *DictHelper.common_getset("name")),
@@ -1202,7 +2138,7 @@ class ImageInfo(object):
     def __str__(self) -> str:
         return f"{self.name} {self.addr:x}"
 
-class OSRunInfoBase(object):
+class OSRunInfoBase(Snapshot):
     """
     子类的名称必须为 <OS>+RunInfo
     """
@@ -1248,7 +2184,7 @@ class CommonOSRunInfo(OSRunInfoBase):
 
     def __init__(self) -> None:
         super().__init__()
-        self._images: List[ImageInfo] = list()
+        self._images: Tuple[ImageInfo, ...] = tuple()
         # 在GuestCell中也包含reset_addr， 这里的值偏向与动态， GuestCell里的
         # reset_addr偏向与全局
         self._reset_addr = 0
@@ -1259,29 +2195,25 @@ class CommonOSRunInfo(OSRunInfoBase):
     def reset_addr(self) -> int:
         return self._reset_addr
 
-    def add_image(self, image: ImageInfo):
-        self._images.append(image)
-
-    def clear_image(self):
-        self._images.clear()
-
-    def set_reset_addr(self, addr: int) -> bool:
-        if not isinstance(addr, int):
-            return False
-        self._reset_addr = addr
-
-    def images(self) -> List[ImageInfo]:
+    def images(self) -> Tuple[ImageInfo, ...]:
         return self._images
 
+    def _freeze_members(self):
+        # 已是快照中的元组时直接共享，修改镜像和reset_addr通过replace(images=..., reset_addr=...)
+        if not isinstance(self._images, tuple) or not all(i.is_frozen() for i in self._images):
+            self._images = tuple(image.snapshot() for image in self._images)
+
     def from_dict(self, value: dict) -> bool:
         DictHelper.from_dict(self.items, self, value)
         images = value.get("images")
         if not isinstance(images, list):
             return True
+        infos = list()
         for image in images:
             image_info = ImageInfo()
             if image_info.from_dict(image):
-                self._images.append(image_info)
+                infos.append(image_info)
+        self._images = tuple(infos)
         return True
 
     def to_dict(self) -> Optional[dict]:
@@ -1327,9 +2259,13 @@ class LinuxRunInfo(OSRunInfoBase):
 
     def to_dict(self) -> Optional[dict]:
         value = DictHelper.to_dict(self.items, self)
-        value['ramdisk_overlay'] = self.ramdisk_overlay
+        value['ramdisk_overlay'] = list(self.ramdisk_overlay)
         return value
 
+    def _freeze_members(self):
+        if not isinstance(self.ramdisk_overlay, tuple):
+            self.ramdisk_overlay = tuple(self.ramdisk_overlay)
+
 
 class ACoreRunInfo(OSRunInfoBase):
     def __init__(self) -> None:
@@ -1356,24 +2292,35 @@ class ACoreRunInfo(OSRunInfoBase):
         value['app'] = self.app.to_dict()
         return value
 
+    def _freeze_members(self):
+        self.msl = self.msl.snapshot()
+        self.os = self.os.snapshot()
+        self.app = self.app.snapshot()
+
 
 class ResourceRunInfo(ResourceBase):
+    default_os_runinfo = CommonOSRunInfo().freeze()
+
     def __init__(self, parent) -> None:
         super().__init__(parent)
 
-        self._os_runinfo: OSRunInfoBase = CommonOSRunInfo()
+        # 只读快照可以共享
+        self._os_runinfo: OSRunInfoBase = self.default_os_runinfo
 
     def label(self) -> str:
         return "runinfo"
 
     def os_runinfo(self) -> Optional[OSRunInfoBase]:
+        self._hydrate()
         return self._os_runinfo
 
     @ResourceBase.modified
     def set_os_runinfo(self, runinfo: OSRunInfoBase) -> bool:
         if not isinstance(runinfo, OSRunInfoBase):
             return False
-        self._os_runinfo = copy.deepcopy(runinfo)
+        self._hydrate()
+        # 保存只读快照，传入的已是快照时不需要复制
+        self._os_runinfo = runinfo.snapshot()
         return True
 
     def from_dict(self, value: dict) -> bool:
@@ -1390,9 +2337,11 @@ class ResourceRunInfo(ResourceBase):
 
         self._os_runinfo = OSRunInfoBase.get_subclass(os_type)()
         self._os_runinfo.from_dict(os_runinfo)
+        self._os_runinfo.freeze()
         return True
 
     def to_dict(self) -> Optional[dict]:
+        self._hydrate()
         value = OrderedDict()
         if self._os_runinfo is not None:
             value['os_type'] = self._os_runinfo.name()
@@ -1412,9 +2361,10 @@ class ResourceGuestCell(ResourceBase):
         DictHelper.Item("console",      str,     *DictHelper.common_getset("_console"), False),
         DictHelper.Item("reset_addr",   int,     *DictHelper.common_getset("_reset_addr"), False),
     ]
-    def __init__(self, parent):
+    def __init__(self, parent, unique_id: Optional[str] = None):
         super().__init__(parent)
-        self._unique_id = str(uuid.uuid1())
+        # 从字典加载时unique_id由字典给出，不需要生成
+        self._unique_id = unique_id if unique_id is not None else str(uuid.uuid1())
         self._name = ""
         self._arch = ARMArch.AArch64
         self._virt_console = True
@@ -1432,7 +2382,7 @@ class ResourceGuestCell(ResourceBase):
         self._pci_devices: List[str] = list()
 
         self._runinfo = ResourceRunInfo(self)
-        self._children.append(self._runinfo)
+        self._add_child(self._runinfo)
 
     @classmethod
     def check_name(cls, name: str) -> bool:
@@ -1469,9 +2419,11 @@ class ResourceGuestCell(ResourceBase):
         return self._comm_region
 
     def system_mem(self) -> List[MemMap]:
+        self._hydrate()
         return self._system_mem
 
     def memmaps(self) -> List[MemMap]:
+        self._hydrate()
         return self._memmaps
 
     def cpus(self) -> Set[int]:
@@ -1493,11 +2445,13 @@ class ResourceGuestCell(ResourceBase):
         return self._reset_addr
 
     def system_mem_resource_table(self) -> Optional[MemMap]:
+        self._hydrate()
         for mem in self._system_mem:
             if mem.type() is MemMap.Type.RESOURCE_TABLE:
                 return mem
 
     def system_mem_normal(self) -> List[MemMap]:
+        self._hydrate()
         mems = list()
         for mem in self._system_mem:
             if mem.type() is not MemMap.Type.RESOURCE_TABLE:
@@ -1507,7 +2461,7 @@ class ResourceGuestCell(ResourceBase):
     @ResourceBase.modified
     def set_name(self, name):
         self._name = name
-        ResourceSignals.value_changed.send(self, part='name')
+        self._send_value_changed('name')
 
     @ResourceBase.modified
     def set_system_mem(self, regions: List[MemMap]) -> bool:
@@ -1515,6 +2469,7 @@ class ResourceGuestCell(ResourceBase):
             return False
         if not all(map(lambda x: isinstance(x, MemMap), regions)):
             return False
+        self._hydrate()
         self._system_mem = regions
         return True
 
@@ -1524,6 +2479,7 @@ class ResourceGuestCell(ResourceBase):
             return False
         if not all(map(lambda x: isinstance(x, MemMap), mmaps)):
             return False
+        self._hydrate()
         self._memmaps = mmaps
         return True
 
@@ -1565,12 +2521,8 @@ class ResourceGuestCell(ResourceBase):
             self.logger.error("ResourceCPU not found.")
             return False
 
-        device_names = list()
-        for dev in cpu.devices():
-            device_names.append(dev.name())
-
         for dev in devices:
-            if dev not in device_names:
+            if cpu.find_device(dev) is None:
                 self.logger.error(f"device {dev} not fount.")
                 return False
         self._devices = devices
@@ -1591,11 +2543,40 @@ class ResourceGuestCell(ResourceBase):
     def label(self) -> str:
         return f"Guest Cell: {self._name}"
 
-    def from_dict(self, value: dict) -> bool:
+    def from_dict(self, value: dict, lazy=False) -> bool:
+        """
+        lazy为True时只加载名称、CPU等基本信息，内存映射和runinfo在第一次访问时加载
+        """
+        self._loader = None
+        self._runinfo.set_loader(None)
         if not DictHelper.from_dict(self.items, self, value):
             self.logger.error("from dict failed.")
             return False
 
+        cpus = value.get("cpus")
+        if isinstance(cpus, list):
+            if all(map(lambda x: isinstance(x,int), cpus)):
+                self._cpus = set(cpus)
+            else:
+                self.logger.error("invalid cpus value.")
+        else:
+            self.logger.error("cpus not found.")
+
+        devices = value.get("devices")
+        if isinstance(devices, list):
+            self._devices = devices
+
+        pci_devices = value.get("pci_devices")
+        if isinstance(devices, list):
+            self._pci_devices = pci_devices
+
+        if lazy:
+            self.set_loader(lambda: self._from_dict_detail(value))
+            self._runinfo.set_loader(self._hydrate)
+            return True
+        return self._from_dict_detail(value)
+
+    def _from_dict_detail(self, value: dict) -> bool:
         self._system_mem.clear()
         sys_mem = value.get("system_memory")
         if isinstance(sys_mem, (list, tuple)):
@@ -1614,28 +2595,11 @@ class ResourceGuestCell(ResourceBase):
             for mem in memmaps:
                 mmap = MemMap(0, 0, 0)
                 if not mmap.from_dict(mem):
-                    self.logger.error(f"invalid memmap {mem}")
-                    continue
-                self._memmaps.append(mmap)
-        else:
-            self.logger.warn("memmaps not found.")
-
-        cpus = value.get("cpus")
-        if isinstance(cpus, list):
-            if all(map(lambda x: isinstance(x,int), cpus)):
-                self._cpus = set(cpus)
-            else:
-                self.logger.error("invalid cpus value.")
-        else:
-            self.logger.error("cpus not found.")
-
-        devices = value.get("devices")
-        if isinstance(devices, list):
-            self._devices = devices
-
-        pci_devices = value.get("pci_devices")
-        if isinstance(devices, list):
-            self._pci_devices = pci_devices
+                    self.logger.error(f"invalid memmap {mem}")
+                    continue
+                self._memmaps.append(mmap)
+        else:
+            self.logger.warn("memmaps not found.")
 
         runinfo = value.get("runinfo")
         if runinfo:
@@ -1645,6 +2609,9 @@ class ResourceGuestCell(ResourceBase):
         return True
 
     def to_dict(self) -> Optional[dict]:
+        if not self._hydrate():
+            self.logger.error("lazy load failed, refuse to dict.")
+            return None
         guestcell = DictHelper.to_dict(self.items, self)
         if guestcell is None:
             self.logger.error("to dict failed.")
@@ -1685,7 +2652,7 @@ class ResourceGuestCellList(ResourceBase):
     def create_cell(self, name: str) -> Optional[ResourceGuestCell]:
         cell = ResourceGuestCell(self)
         self._cells.append(cell)
-        self._children.append(cell)
+        self._add_child(cell)
         cell.set_name(name)
 
         ResourceSignals.add.send(self, rsc=cell)
@@ -1702,7 +2669,7 @@ class ResourceGuestCellList(ResourceBase):
             return False
 
         self._cells.remove(cell)
-        self._children.remove(cell)
+        self._remove_child(cell)
         ResourceSignals.remove.send(self, rsc=cell)
         return True
 
@@ -1724,12 +2691,13 @@ class ResourceGuestCellList(ResourceBase):
         self._cells.clear()
         if isinstance(guest_cells, list):
             for cell_dict in guest_cells:
-                cell = ResourceGuestCell(self)
-                if not cell.from_dict(cell_dict):
+                unique_id = cell_dict.get("unique_id") if isinstance(cell_dict, dict) else None
+                cell = ResourceGuestCell(self, unique_id if isinstance(unique_id, str) else None)
+                if not cell.from_dict(cell_dict, lazy=True):
                     self.logger.error("guest cell form dict failed.")
                     continue
                 self._cells.append(cell)
-                self._children.append(cell)
+                self._add_child(cell)
         else:
             self.logger.warn("guest_cells not exist or not a list")
 
@@ -1755,6 +2723,8 @@ class ResourcePCIDevice(ResourceBase):
     logger = logging.getLogger("ResourcePCIDevice")
 
     class PCICap(object):
+        __slots__ = ('_id', '_start', '_len', '_flags', '_extended')
+
         items = [
             DictHelper.Item("cap",    int,  *DictHelper.common_getset("_id")),
             DictHelper.Item("start", int,  *DictHelper.common_getset("_start")),
@@ -1788,6 +2758,8 @@ class ResourcePCIDevice(ResourceBase):
             return DictHelper.to_dict(self.items, self)
 
     class PCIBar(object):
+        __slots__ = ('_start', '_size', '_mask', '_type')
+
         items = [
             DictHelper.Item("start", int,  *DictHelper.common_getset("_start")),
             DictHelper.Item("size",  int,  *DictHelper.common_getset("_size")),
@@ -1916,6 +2888,7 @@ class ResourcePCIDevice(ResourceBase):
 
 class ResourcePCIDeviceList(ResourceBase):
     logger = logging.getLogger("ResourcePCIDeviceList")
+    lazy_children = (ResourcePCIDevice, )
     def __init__(self, parent):
         super().__init__(parent)
         self._devices: List[ResourcePCIDevice] = list()
@@ -1924,43 +2897,49 @@ class ResourcePCIDeviceList(ResourceBase):
     def add_device(self, value: dict) -> Optional[ResourcePCIDevice]:
         """从字典添加一个设备
         """
+        self._hydrate()
         dev = ResourcePCIDevice(self)
         if not dev.from_dict(value):
             self.logger.error("invalid dict value")
             return None
 
         self._devices.append(dev)
-        self._children.append(dev)
+        self._add_child(dev)
         ResourceSignals.add.send(self, rsc=dev)
         return dev
 
     @ResourceBase.modified
     def remove_device(self, path) -> bool:
+        self._hydrate()
         for dev in self._devices:
             if dev.path() == path:
                 self._devices.remove(dev)
+                self._remove_child(dev)
                 return True
         return False
 
     @ResourceBase.modified
     def remove_all_device(self) -> None:
-        for dev in self._devices:
-            self._children.remove(dev)
+        self._hydrate()
+        self._remove_children(self._devices)
         # TODO 对device做一次复制，使不被释放
         devices = list(self._devices)
         self._devices.clear()
         ResourceSignals.remove.send(self, devices=devices, count=len(devices))
 
     def find_device(self, path) -> Optional[ResourcePCIDevice]:
+        self._hydrate()
         for dev in self._devices:
             if dev.path() == path:
                 return dev
         return None
 
     def device_count(self):
+        self._hydrate()
         return len(self._devices)
 
     def device_at(self, index: int) -> Optional[ResourcePCIDevice]:
+        self._hydrate()
         if index >= 0 and index < len(self._devices):
             return self._devices[index]
         return None
@@ -1969,6 +2948,7 @@ class ResourcePCIDeviceList(ResourceBase):
         return "PCI设备"
 
     def from_dict(self, value: dict) -> bool:
+        self._loader = None
         if not isinstance(value, dict):
             return False
         devices = value.get("devices")
@@ -1978,11 +2958,14 @@ class ResourcePCIDeviceList(ResourceBase):
                 if not dev.from_dict(dev_dict):
                     self.logger.error("PCI device from dict faied.")
                 self._devices.append(dev)
-                self._children.append(dev)
+                self._add_child(dev)
 
         return True
 
     def to_dict(self) -> Optional[dict]:
+        if not self._hydrate():
+            self.logger.error("lazy load failed, refuse to dict.")
+            return None
         value = OrderedDict()
         devices = list()
         for dev in self._devices:
@@ -2004,10 +2987,10 @@ class ResourceJailhouse(ResourceBase):
         self._pci_devices = ResourcePCIDeviceList(self)
         self._guest_cells = ResourceGuestCellList(self)
 
-        self._children.append(self._root_cell)
-        self._children.append(self._comm)
-        self._children.append(self._pci_devices)
-        self._children.append(self._guest_cells)
+        self._add_child(self._root_cell)
+        self._add_child(self._comm)
+        self._add_child(self._pci_devices)
+        self._add_child(self._guest_cells)
 
     def rootcell(self) -> ResourceRootCell:
         return self._root_cell
@@ -2057,6 +3040,8 @@ class ResourceJailhouse(ResourceBase):
             if not self._pci_devices.from_dict(pci_devices):
                 self.logger.error("pci_device from dict faied")
                 return False
+        elif isinstance(pci_devices, JhrContainer.Lazy):
+            self._pci_devices.set_loader(lambda: self._pci_devices.from_dict(pci_devices()))
 
         return True
 
@@ -2096,8 +3081,8 @@ class Resource(ResourceBase):
 
         self._name = name
         self._filename = None
-        self._children.append(self._platform)
-        self._children.append(self._jailhosue)
+        self._add_child(self._platform)
+        self._add_child(self._jailhosue)
 
     def name(self) -> str:
         return self._name
@@ -2169,7 +3154,24 @@ class Resource(ResourceBase):
 
         return True
 
+    def load_failures(self) -> List[ResourceBase]:
+        """
+        返回延迟加载失败的节点，不触发尚未执行的延迟加载
+        """
+        nodes = list()
+        stack = [self]
+        while stack:
+            o = stack.pop()
+            if o._load_failed:
+                nodes.append(o)
+            stack.extend(o._children)
+        return nodes
+
     def to_dict(self) -> Optional[dict]:
+        failures = self.load_failures()
+        if len(failures) > 0:
+            self.logger.error(f"{', '.join(o.label() for o in failures)} failed to load, refuse to dict.")
+            return None
         rsc = OrderedDict()
         platform = self._platform.to_dict()
         if platform is None:
@@ -2198,10 +3200,22 @@ class PlatformMgr(object):
             self.path = ''
             self.value = None
             self.guestos_dts = None
+            self._prototype = None
 
         def from_dict(self, value) -> bool:
             return DictHelper.from_dict(self.items, self, value)
 
+        def prototype(self) -> Optional[ResourceCPU]:
+            """
+            由value加载的ResourceCPU，只加载一次，只用于复制，不能修改
+            """
+            if self._prototype is None:
+                cpu = ResourceCPU(None)
+                if not cpu.from_dict(self.value):
+                    return None
+                self._prototype = cpu
+            return self._prototype
+
     class Board(object):
         items = [
             DictHelper.Item("file", str, *DictHelper.common_getset("file")),
@@ -2216,12 +3230,28 @@ class PlatformMgr(object):
             self.path = ''
             self.value = None
             self.cpu = None
+            self._prototype = None
 
         def from_dict(self, value) -> bool:
             return DictHelper.from_dict(self.items, self, value)
 
+        def prototype(self) -> Optional[ResourceBoard]:
+            """
+            由value加载的ResourceBoard，只加载一次，只用于复制，不能修改
+            """
+            if self._prototype is None:
+                board = ResourceBoard(None)
+                if not board.from_dict(self.value):
+                    return None
+                self._prototype = board
+            return self._prototype
+
     instance = None
 
+    # 解析结果缓存目录，为空时不使用缓存
+    cache_dir = os.environ.get("JH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".resource_tool_cache"))
+    CACHE_VERSION = 2
+
     @classmethod
     def get_instance(cls):
         if cls.instance is None:
@@ -2233,10 +3263,30 @@ class PlatformMgr(object):
         self._path = ""
         self._cpus: List[self.CPU] = list()
         self._boards: List[self.Board] = list()
+        # id和名称->CPU/Board
+        self._cpu_index = dict()
+        self._board_index = dict()
+        # 路径->缓存项，缓存项为dict(mtime, size, sha256, value)
+        self._cache = dict()
+        self._cache_used = dict()
+        self._cache_dirty = False
+        self._cache_stats = [0, 0]
 
     def reset(self):
         self._cpus.clear()
         self._boards.clear()
+        self._build_index()
+
+    def _build_index(self):
+        # 名称或id重复时保留列表中的第一个，与顺序查找的结果一致
+        self._cpu_index = dict()
+        for cpu in self._cpus:
+            self._cpu_index.setdefault(cpu.name, cpu)
+            self._cpu_index.setdefault(cpu.id, cpu)
+        self._board_index = dict()
+        for board in self._boards:
+            self._board_index.setdefault(board.name, board)
+            self._board_index.setdefault(board.id, board)
 
     @classmethod
     def load_toml(cls, filename: str):
@@ -2247,16 +3297,152 @@ class PlatformMgr(object):
             cls.logger.error(f"load toml {filename} failed {e}")
             return None
 
+    def _cache_file(self, plt_path: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        key = hashlib.sha256(os.path.abspath(plt_path).encode('utf8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"platform-{key}.json")
+
+    def _cache_load(self, plt_path: str):
+        self._cache = dict()
+        self._cache_used = dict()
+        self._cache_dirty = False
+        self._cache_stats = [0, 0]
+        filename = self._cache_file(plt_path)
+        if filename is None or not os.path.exists(filename):
+            return
+        try:
+            cache = JsonCodec.load(filename)
+        except Exception as e:
+            self.logger.warning(f"load platform cache {filename} failed: {e}")
+            return
+        if not isinstance(cache, dict) or cache.get('version') != self.CACHE_VERSION:
+            return
+        entries = cache.get('entries')
+        if not isinstance(entries, dict):
+            return
+        keys = {'mtime', 'size', 'sha256', 'value'}
+        self._cache = {path: entry for path, entry in entries.items()
+                       if isinstance(entry, dict) and keys <= entry.keys()}
+
+    def _cache_save(self, plt_path: str):
+        """
+        只保存本次用到的文件，已删除的文件不再保留
+        """
+        filename = self._cache_file(plt_path)
+        if filename is None:
+            return
+        if not self._cache_dirty and len(self._cache_used) == len(self._cache):
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError as e:
+            self.logger.warning(f"create cache dir {self.cache_dir} failed: {e}")
+            return
+        if not JsonCodec.dump({'version': self.CACHE_VERSION, 'entries': self._cache_used}, filename):
+            self.logger.warning(f"save platform cache {filename} failed")
+
+    def _cached(self, path: str, parse: Callable[[str], Any]) -> Any:
+        """
+        返回文件解析并检查后的结果，mtime和大小未变化时直接使用缓存，
+        变化时比较内容的hash，内容也变化时才调用parse，parse返回None表示失败，不缓存
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        entry = self._cache.get(path)
+        if entry is not None and entry['mtime'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            self._cache_used[path] = entry
+            self._cache_stats[0] += 1
+            return entry['value']
+
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry is not None and entry['sha256'] == digest:
+            self._cache_stats[0] += 1
+            value = entry['value']
+        else:
+            self._cache_stats[1] += 1
+            value = parse(data.decode('utf8'))
+            if value is None:
+                return None
+        self._cache_used[path] = {'mtime': st.st_mtime_ns, 'size': st.st_size, 'sha256': digest, 'value': value}
+        self._cache_dirty = True
+        return value
+
+    def cache_stats(self) -> Tuple[int, int]:
+        """
+        上次load的缓存命中和未命中的文件数
+        """
+        return tuple(self._cache_stats)
+
+    @classmethod
+    def _plain(cls, value):
+        """
+        toml的内联表是局部定义的dict子类，转换为普通的dict后缓存为JSON
+        """
+        if isinstance(value, dict):
+            return {k: cls._plain(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [cls._plain(v) for v in value]
+        return value
+
+    @classmethod
+    def _parse_toml(cls, text: str) -> dict:
+        return cls._plain(toml.loads(text))
+
+    @classmethod
+    def _parse_cpu(cls, text: str) -> Optional[tuple]:
+        try:
+            value = cls._parse_toml(text)
+        except Exception as e:
+            cls.logger.error(f"load toml failed {e}")
+            return None
+        if not isinstance(value, dict):
+            cls.logger.error(f"cpu toml not a dict")
+            return None
+
+        # 检查能否使用ResourceCPU加载
+        rsc_cpu = ResourceCPU(None)
+        if not rsc_cpu.from_dict(value):
+            cls.logger.error("cpu from dict failed.")
+            return None
+        return value, rsc_cpu.name()
+
+    @classmethod
+    def _parse_board(cls, text: str) -> Optional[tuple]:
+        try:
+            value = cls._parse_toml(text)
+        except Exception as e:
+            cls.logger.error(f"load toml failed {e}")
+            return None
+        if not isinstance(value, dict):
+            cls.logger.error("board toml is not dict")
+            return None
+
+        # 检查是否能使用ResourceBoard加载
+        rsc_board = ResourceBoard(None)
+        if not rsc_board.from_dict(value):
+            cls.logger.error("board form dict failed.")
+            return None
+        return value, rsc_board.name()
+
     def load(self, plt_path: str) -> bool:
         """
         加载平台资源文件
         :param index_toml: index.toml
         :return:
         """
+        self._cache_load(plt_path)
+        ok = self._load(plt_path)
+        self._cache_save(plt_path)
+        return ok
+
+    def _load(self, plt_path: str) -> bool:
         index_toml = os.path.join(plt_path, "index.toml")
 
         try:
-            index = toml.load(index_toml)
+            index = self._cached(index_toml, self._parse_toml)
         except Exception as e:
             self.logger.error(f"parse platform index file failed, {index_toml}")
             self.logger.error(str(e))
@@ -2289,10 +3475,10 @@ class PlatformMgr(object):
                 self.logger.error(f"cpu toml {cpu.path} not exist.")
                 continue
 
-            cpu.value = self.load_toml(cpu.path)
-            if not isinstance(cpu.value, dict):
-                self.logger.error(f"cpu toml not a dict")
+            parsed = self._cached(cpu.path, self._parse_cpu)
+            if parsed is None:
                 continue
+            cpu.value, cpu.name = parsed
 
             if guestos_dts is not None:
                 dts_path = os.path.join(plt_path, guestos_dts)
@@ -2300,12 +3486,6 @@ class PlatformMgr(object):
                     with open(dts_path, "rt") as f:
                         cpu.guestos_dts = base64.b64encode(f.read())
 
-            # 检查能否使用ResourceCPU加载
-            rsc_cpu = ResourceCPU(None)
-            if not rsc_cpu.from_dict(cpu.value):
-                self.logger.error("cpu from dict failed.")
-                continue
-            cpu.name = rsc_cpu.name()
             cpus.append(cpu)
 
         index_boards = index.get("boards")
@@ -2321,16 +3501,14 @@ class PlatformMgr(object):
                 continue
 
             board.path = os.path.join(plt_path, board.file)
-            board.value = self.load_toml(board.path)
-            if not isinstance(board.value, dict):
-                self.logger.error("board toml is not dict")
+            try:
+                parsed = self._cached(board.path, self._parse_board)
+            except OSError as e:
+                self.logger.error(f"load toml {board.path} failed {e}")
                 continue
-
-            # 检查是否能使用ResourceBoard加载
-            rsc_board = ResourceBoard(None)
-            if not rsc_board.from_dict(board.value):
-                self.logger.error("board form dict failed.")
+            if parsed is None:
                 continue
+            board.value, board_name = parsed
 
             for cpu in cpus:
                 if cpu.id == board.cpu_id:
@@ -2340,32 +3518,353 @@ class PlatformMgr(object):
                 self.logger.error(f'{board.path} cpu not found.')
                 continue
 
-            board.name = rsc_board.name()
+            board.name = board_name
             board.id = board_id
             boards.append(board)
 
         self._path = plt_path
         self._cpus = cpus
         self._boards = boards
+        self._build_index()
         return True
 
     def find_board(self, name: str) -> Optional[Board]:
-        for board in self._boards:
-            if board.name == name or board.id == name:
-                return board
-        return None
+        return self._board_index.get(name)
 
     def find_cpu(self, name: str) -> Optional[CPU]:
-        for cpu in self._cpus:
-            if cpu.name == name or cpu.id == name:
-                return cpu
-        return None
+        return self._cpu_index.get(name)
 
     def board_names(self) -> List[str]:
         return list(map(lambda x: x.name, self._boards))
 
     def cpu_names(self) -> List[str]:
-        return list(map(lambda x: x.name, self._cpu))
+        return list(map(lambda x: x.name, self._cpus))
+
+
+class JsonCodec(object):
+    """
+    资源文件的JSON读写
+    backend为auto时，有orjson则用于加载，保存仍使用json以保持4空格缩进的格式；
+    为orjson时保存也使用orjson(2空格缩进)；为json时只使用标准库。
+    可通过环境变量JH_JSON_BACKEND或set_backend选择
+    """
+    logger = logging.getLogger("JsonCodec")
+
+    BACKENDS = ('auto', 'json', 'orjson')
+    backend = os.environ.get("JH_JSON_BACKEND", "auto")
+
+    @classmethod
+    def set_backend(cls, name: str) -> bool:
+        if name not in cls.BACKENDS:
+            cls.logger.error(f"invalid json backend {name}")
+            return False
+        if name == 'orjson' and orjson is None:
+            cls.logger.error("orjson not installed")
+            return False
+        cls.backend = name
+        return True
+
+    @classmethod
+    def available_backends(cls) -> List[str]:
+        if orjson is None:
+            return ['json']
+        return ['json', 'orjson']
+
+    @classmethod
+    def loads(cls, data: bytes):
+        if orjson is not None and cls.backend != 'json':
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # orjson更严格(如不支持NaN)，交给标准库处理
+                pass
+        return json.loads(data.decode('utf8'))
+
+    @classmethod
+    def load(cls, filename: str):
+        with open(filename, "rb") as f:
+            data = f.read()
+        return cls.loads(data)
+
+    @classmethod
+    def _write(cls, value, fd: int):
+        if orjson is not None and cls.backend == 'orjson':
+            try:
+                data = orjson.dumps(value, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                return
+            except TypeError as e:
+                cls.logger.warning(f"orjson dumps failed, fallback to json: {e}")
+
+        # 逐段编码直接写入文件，不在内存中生成完整的字符串
+        with os.fdopen(fd, "wt", encoding='utf-8') as f:
+            json.dump(value, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def dump(cls, value, filename: str) -> bool:
+        return cls.atomic_write(filename, lambda fd: cls._write(value, fd))
+
+    @classmethod
+    def atomic_write(cls, filename: str, write: Callable[[int], None]) -> bool:
+        """
+        write向临时文件的fd写入并fsync，之后重命名为filename，保证目标文件不会只写入一部分
+        """
+        filename = os.path.abspath(filename)
+        dirname = os.path.dirname(filename)
+        try:
+            fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(filename)}.", suffix=".tmp", dir=dirname)
+        except OSError as e:
+            cls.logger.error(f"create temp file in {dirname} failed: {e}")
+            return False
+
+        try:
+            # mkstemp创建的文件权限为0600，沿用原文件或默认的权限
+            if os.path.exists(filename):
+                mode = stat.S_IMODE(os.stat(filename).st_mode)
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                mode = 0o666 & ~umask
+            write(fd)
+            os.chmod(tmp, mode)
+            os.replace(tmp, filename)
+        except Exception as e:
+            cls.logger.error(f"write {filename} failed: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return False
+
+        if hasattr(os, 'O_DIRECTORY'):
+            try:
+                dir_fd = os.open(dirname, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+            except OSError:
+                pass
+        return True
+
+
+class JhrContainer(object):
+    """
+    二进制资源文件(.jhrb)，需要安装msgpack
+    格式: 文件头 | 索引 | 各段数据
+        文件头: magic(4) version(u16) reserved(u16) 索引长度(u32)
+        索引:   msgpack编码的 [[路径, 偏移, 长度], ...]，偏移相对于数据区起始
+        段数据: msgpack编码，路径为空的段是去掉其它段后的剩余部分，被拆出的位置保留为nil
+    打开时只解码剩余部分、platform和guestcells，其它段在第一次访问时解码
+    """
+    logger = logging.getLogger("JhrContainer")
+
+    MAGIC = b"JHRB"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHI")
+    SECTIONS = (
+        ("platform", ),
+        ("jailhouse", "comm"),
+        ("jailhouse", "rootcell"),
+        ("jailhouse", "pci_devices"),
+        ("jailhouse", "guestcells"),
+    )
+    # 打开时解码的段
+    EAGER = (
+        (),
+        ("platform", ),
+        ("jailhouse", "comm"),
+        ("jailhouse", "rootcell"),
+        ("jailhouse", "guestcells"),
+    )
+
+    class Lazy(object):
+        """
+        尚未解码的段，调用时解码
+        """
+        def __init__(self, container: JhrContainer, path: Tuple[str, ...]) -> None:
+            self.container = container
+            self.path = path
+
+        def __call__(self):
+            return self.container.section(self.path)
+
+    def __init__(self, data: bytes) -> None:
+        self._data = memoryview(data)
+        self._index = dict()
+        self._cache = dict()
+
+    @classmethod
+    def available(cls) -> bool:
+        return msgpack is not None
+
+    @classmethod
+    def is_container(cls, filename: str) -> bool:
+        try:
+            with open(filename, "rb") as f:
+                return f.read(len(cls.MAGIC)) == cls.MAGIC
+        except OSError:
+            return False
+
+    @staticmethod
+    def _get(value, path):
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    @classmethod
+    def encode(cls, value: dict) -> Optional[bytes]:
+        if msgpack is None:
+            cls.logger.error("msgpack not installed")
+            return None
+        if not isinstance(value, dict):
+            cls.logger.error("not a dict")
+            return None
+
+        # 拆出的位置在剩余部分中保留为nil，以保持键的顺序
+        rest = dict(value)
+        sections = list()
+        for path in cls.SECTIONS:
+            section = cls._get(rest, path)
+            if not isinstance(section, (dict, list)):
+                continue
+            sections.append((path, section))
+            parent = rest
+            for key in path[:-1]:
+                parent[key] = dict(parent[key])
+                parent = parent[key]
+            parent[path[-1]] = None
+        sections.insert(0, ((), rest))
+
+        index = list()
+        blobs = list()
+        offset = 0
+        for path, section in sections:
+            blob = msgpack.packb(section, use_bin_type=True)
+            index.append([list(path), offset, len(blob)])
+            blobs.append(blob)
+            offset += len(blob)
+        index_blob = msgpack.packb(index, use_bin_type=True)
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, 0, len(index_blob))
+        return b"".join([header, index_blob] + blobs)
+
+    @classmethod
+    def decode(cls, data: bytes) -> Optional[JhrContainer]:
+        if msgpack is None:
+            cls.logger.error("msgpack not installed")
+            return None
+        if len(data) < cls.HEADER.size:
+            cls.logger.error("invalid container: too short")
+            return None
+        magic, version, _, index_size = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            cls.logger.error(f"invalid container: magic {magic} version {version}")
+            return None
+
+        container = JhrContainer(data)
+        start = cls.HEADER.size + index_size
+        try:
+            index = msgpack.unpackb(container._data[cls.HEADER.size:start], use_list=True)
+        except Exception as e:
+            cls.logger.error(f"invalid container index: {e}")
+            return None
+        for path, offset, size in index:
+            if start + offset + size > len(data):
+                cls.logger.error(f"invalid container: section {path} out of range")
+                return None
+            container._index[tuple(path)] = (start + offset, size)
+        if () not in container._index:
+            cls.logger.error("invalid container: no root section")
+            return None
+        return container
+
+    @classmethod
+    def open(cls, filename: str) -> Optional[JhrContainer]:
+        try:
+            with open(filename, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            cls.logger.error(f"open {filename} failed: {e}")
+            return None
+        return cls.decode(data)
+
+    @classmethod
+    def dump(cls, value: dict, filename: str) -> bool:
+        data = cls.encode(value)
+        if data is None:
+            return False
+
+        def _write(fd):
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        return JsonCodec.atomic_write(filename, _write)
+
+    def paths(self) -> List[Tuple[str, ...]]:
+        return list(self._index.keys())
+
+    def is_decoded(self, path: Tuple[str, ...]) -> bool:
+        return tuple(path) in self._cache
+
+    def section(self, path: Tuple[str, ...]):
+        """
+        返回解码后的段，结果会被缓存
+        """
+        path = tuple(path)
+        if path in self._cache:
+            return self._cache[path]
+        pos = self._index.get(path)
+        if pos is None:
+            return None
+        offset, size = pos
+        try:
+            value = msgpack.unpackb(self._data[offset:offset+size], use_list=True, strict_map_key=False)
+        except Exception as e:
+            self.logger.error(f"decode section {path} failed: {type(e).__name__}: {e}")
+            return None
+        self._cache[path] = value
+        return value
+
+    def _assemble(self, lazy: bool) -> Optional[dict]:
+        root = self.section(())
+        if not isinstance(root, dict):
+            self.logger.error("invalid root section")
+            return None
+        value = dict(root)
+        for path in self._index:
+            if len(path) == 0:
+                continue
+            if lazy and path not in self.EAGER:
+                section = JhrContainer.Lazy(self, path)
+            else:
+                section = self.section(path)
+                if section is None:
+                    return None
+            parent = value
+            for key in path[:-1]:
+                parent[key] = dict(parent[key])
+                parent = parent[key]
+            parent[path[-1]] = section
+        return value
+
+    def to_dict(self) -> Optional[dict]:
+        """
+        解码所有段，得到与JSON格式相同的字典，有段解码失败时返回None
+        """
+        return self._assemble(False)
+
+    def lazy_dict(self) -> Optional[dict]:
+        """
+        未在EAGER中的段以JhrContainer.Lazy代替，由资源对象在第一次访问时解码，
+        解码失败时资源节点记录加载失败，拒绝保存
+        """
+        return self._assemble(True)
 
 
 class ResourceMgr(object):
@@ -2396,13 +3895,23 @@ class ResourceMgr(object):
             self.logger.error(f"board {name} not found")
             return None
 
-        rsc = Resource(name, self)
-        if not rsc.platform().cpu().from_dict(board.cpu.value):
+        # 复制平台中已加载的原型，不重新解析
+        cpu = board.cpu.prototype()
+        if cpu is None:
             self.logger.error("cpu from dict failed.")
             return None
-        if not rsc.platform().board().from_dict(board.value):
+        board = board.prototype()
+        if board is None:
             self.logger.error("board from dict failed.")
             return None
+
+        rsc = Resource(name, self)
+        if not rsc.platform().cpu().copy_from(cpu):
+            self.logger.error("cpu copy failed.")
+            return None
+        if not rsc.platform().board().copy_from(board):
+            self.logger.error("board copy failed.")
+            return None
         self._resources.append(rsc)
         ResourceSignals.add.send(self, rsc=rsc)
         return rsc
@@ -2418,10 +3927,23 @@ class ResourceMgr(object):
         return rsc
 
     def open(self, filename) -> Optional[Resource]:
+        if JhrContainer.is_container(filename):
+            container = JhrContainer.open(filename)
+            if container is None:
+                self.logger.error(f"open {filename} failed.")
+                return None
+            value = container.lazy_dict()
+            if value is None:
+                self.logger.error(f"open {filename} failed.")
+                return None
+            rsc = self.load(value)
+            if rsc is not None:
+                rsc.set_filename(filename)
+            return rsc
+
         value = None
         try:
-            with open(filename, "rt", encoding='utf8') as f:
-                value = json.load(f)
+            value = JsonCodec.load(filename)
         except Exception as e:
             self.logger.error(f"open {filename} failed: {e}")
             return None
@@ -2433,19 +3955,26 @@ class ResourceMgr(object):
 
     @classmethod
     def save(cls, rsc: Resource, filename: str) -> bool:
+        if len(rsc.load_failures()) > 0:
+            cls.logger.error("resource is incomplete because some sections failed to load, refuse to save.")
+            return False
         value = rsc.to_dict()
         if value is None:
             cls.logger.error("resource to dict failed")
             return False
 
-        json_str = json.dumps(value, indent=4, ensure_ascii=False)
-
-        try:
-            with open(filename, "wt", encoding='utf-8') as f:
-                f.write(json_str)
-        except:
+        if filename.endswith(".jhrb"):
+            ok = JhrContainer.dump(value, filename)
+        else:
+            ok = JsonCodec.dump(value, filename)
+        if not ok:
             cls.logger.error("save file failed.")
+            return False
 
+        nodes = rsc.modified_nodes()
+        rsc.clear_modified()
+        if len(nodes) > 0:
+            ResourceSignals.saved.send(rsc, nodes=nodes)
         return True
 
     def remove(self, rsc: Resource):
@@ -2477,6 +4006,215 @@ class ResourceMgr(object):
         return self._resources[item]
 
 
+class Workspace(object):
+    """
+    工作区，以目录为单位管理多个资源文件
+    打开目录时用进程池并行建立每个文件的索引，完整的资源在第一次访问时才加载
+    """
+    logger = logging.getLogger("Workspace")
+
+    extensions = (".jhr", ".jhrb")
+
+    class Entry(object):
+        """
+        资源文件的索引
+        """
+        __slots__ = ('filename', 'mtime', 'size', 'name', 'board', 'cells',
+                     'cpus', 'board_cpus', 'check', 'failed', 'error')
+
+        def __init__(self, filename: str) -> None:
+            self.filename = filename
+            self.mtime = 0
+            self.size = 0
+            self.name = ""
+            self.board = ""
+            self.cells = 0
+            # guest cell使用的CPU
+            self.cpus: Set[int] = set()
+            self.board_cpus: Set[int] = set()
+            # 检查结果，None表示未检查
+            self.check: Optional[bool] = None
+            # 未通过的检查项
+            self.failed: List[str] = list()
+            # 加载失败的原因
+            self.error: Optional[str] = None
+
+        def ok(self) -> bool:
+            return self.error is None
+
+        def update(self, info: dict):
+            for key, value in info.items():
+                if key in ('cpus', 'board_cpus'):
+                    value = set(value)
+                setattr(self, key, value)
+
+        def to_dict(self) -> dict:
+            value = OrderedDict()
+            for key in self.__slots__:
+                value[key] = getattr(self, key)
+            value['cpus'] = sorted(self.cpus)
+            value['board_cpus'] = sorted(self.board_cpus)
+            return value
+
+    def __init__(self, path: str) -> None:
+        self._path = os.path.abspath(path)
+        self._entries = OrderedDict()
+        self._resources: dict = dict()
+
+    def path(self) -> str:
+        return self._path
+
+    def entries(self) -> List[Entry]:
+        return list(self._entries.values())
+
+    def entry(self, filename: str) -> Optional[Entry]:
+        return self._entries.get(os.path.abspath(filename))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def files(self) -> List[str]:
+        """
+        目录下的资源文件，按文件名排序
+        """
+        files = list()
+        try:
+            with os.scandir(self._path) as it:
+                for item in it:
+                    if item.is_file() and item.name.endswith(self.extensions):
+                        files.append(item.path)
+        except OSError as e:
+            self.logger.error(f"scan {self._path} failed: {e}")
+            return list()
+        return sorted(files)
+
+    @staticmethod
+    def _index_file(filename: str, check: bool) -> dict:
+        """
+        在子进程中加载filename，返回索引信息
+        """
+        info = dict(filename=filename, error=None)
+        try:
+            st = os.stat(filename)
+            info['mtime'] = st.st_mtime
+            info['size'] = st.st_size
+
+            if JhrContainer.is_container(filename):
+                container = JhrContainer.open(filename)
+                if container is None:
+                    info['error'] = "open container failed"
+                    return info
+                value = container.lazy_dict()
+                if value is None:
+                    info['error'] = "decode container failed"
+                    return info
+            else:
+                value = JsonCodec.load(filename)
+
+            # 不经过ResourceMgr，避免发送add信号
+            rsc = Resource("new", None)
+            if not rsc.from_dict(value):
+                info['error'] = "resource from dict failed"
+                return info
+            rsc.set_filename(filename)
+
+            guestcells = rsc.jailhouse().guestcells()
+            cpus = set()
+            for cell in guestcells:
+                cpus.update(cell.cpus())
+            board_cpus = rsc.platform().board().cpus()
+            info['name'] = rsc.name()
+            info['board'] = rsc.platform().board().name()
+            info['cells'] = guestcells.cell_count()
+            info['cpus'] = sorted(cpus)
+            info['board_cpus'] = sorted(board_cpus) if board_cpus is not None else list()
+
+            if check:
+                # checklist依赖本模块，不能在模块开头导入
+                from checklist import Checklist
+                results = Checklist.check(rsc)
+                info['failed'] = [result.name for result in results if not result]
+                info['check'] = len(info['failed']) == 0
+        except Exception as e:
+            info['error'] = str(e)
+        return info
+
+    def refresh(self, jobs: Optional[int] = None, check=True,
+                progress: Optional[Callable[[int, int], None]] = None) -> bool:
+        """
+        重新扫描目录，只为新增和修改过的文件建立索引
+        jobs为进程数，默认为CPU数量，progress(完成数, 总数)在每个文件完成后调用
+        """
+        if not os.path.isdir(self._path):
+            self.logger.error(f"{self._path} is not a directory")
+            return False
+
+        entries = OrderedDict()
+        pending = list()
+        for filename in self.files():
+            entry = self._entries.get(filename)
+            try:
+                st = os.stat(filename)
+            except OSError:
+                continue
+            if entry is None or entry.mtime != st.st_mtime or entry.size != st.st_size \
+                    or (check and entry.check is None and entry.ok()):
+                entry = Workspace.Entry(filename)
+                pending.append(filename)
+                # 文件已修改，已加载的资源失效
+                self._resources.pop(filename, None)
+            entries[filename] = entry
+        for filename in self._entries:
+            if filename not in entries:
+                self._resources.pop(filename, None)
+        self._entries = entries
+
+        total = len(pending)
+        if total == 0:
+            return True
+
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        jobs = min(jobs, total)
+        if jobs <= 1:
+            # 单个文件时不值得启动进程池
+            for done, filename in enumerate(pending, 1):
+                entries[filename].update(self._index_file(filename, check))
+                if progress is not None:
+                    progress(done, total)
+            return True
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(Workspace._index_file, filename, check) for filename in pending]
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                info = future.result()
+                entries[info['filename']].update(info)
+                if progress is not None:
+                    progress(done, total)
+        return True
+
+    def load(self, filename: str) -> Optional[Resource]:
+        """
+        完整加载filename，已加载且仍在ResourceMgr中时直接返回
+        """
+        filename = os.path.abspath(filename)
+        if filename not in self._entries:
+            self.logger.error(f"{filename} not in workspace {self._path}")
+            return None
+
+        mgr = ResourceMgr.get_instance()
+        rsc = self._resources.get(filename)
+        if rsc is not None and mgr.index(rsc) >= 0:
+            return rsc
+
+        rsc = mgr.open(filename)
+        if rsc is None:
+            self.logger.error(f"load {filename} failed.")
+            return None
+        self._resources[filename] = rsc
+        return rsc
+
+
 import click
 @click.group()
 def cli():
@@ -2506,6 +4244,67 @@ def test():
         return False
     return True
 
+@cli.command()
+@click.argument("src")
+@click.argument("dst")
+def convert(src, dst):
+    """
+    在.jhr和.jhrb之间转换，按dst的扩展名决定格式
+    """
+    if JhrContainer.is_container(src):
+        container = JhrContainer.open(src)
+        if container is None:
+            exit(1)
+        value = container.to_dict()
+        if value is None:
+            exit(1)
+    else:
+        try:
+            value = JsonCodec.load(src)
+        except Exception as e:
+            logging.error(f"open {src} failed: {e}")
+            exit(1)
+
+    if dst.endswith(".jhrb"):
+        ok = JhrContainer.dump(value, dst)
+    else:
+        ok = JsonCodec.dump(value, dst)
+    if not ok:
+        exit(1)
+
+@cli.command()
+@click.argument("path")
+@click.option("--jobs", "-j", type=int, default=None, help="进程数，默认为CPU数量")
+@click.option("--check/--no-check", default=True, help="是否执行配置检查")
+@click.option("--json", "as_json", is_flag=True, help="以JSON格式输出")
+def workspace(path, jobs, check, as_json):
+    """
+    并行加载目录下的所有资源文件，输出每个文件的索引
+    """
+    # 作为脚本运行时本模块为__main__，而checklist导入的是jh_resource，需使用同一个模块中的类
+    from jh_resource import Workspace
+    ws = Workspace(path)
+    if not ws.refresh(jobs, check):
+        exit(1)
+
+    if as_json:
+        print(json.dumps([entry.to_dict() for entry in ws.entries()], indent=4, ensure_ascii=False))
+        return
+
+    for entry in ws.entries():
+        filename = os.path.basename(entry.filename)
+        if not entry.ok():
+            print(f"{filename:<24} error: {entry.error}")
+            continue
+        if entry.check is None:
+            state = "-"
+        elif entry.check:
+            state = "pass"
+        else:
+            state = f"fail({len(entry.failed)})"
+        cpus = f"{len(entry.cpus)}/{len(entry.board_cpus)}"
+        print(f"{filename:<24} {entry.name:<16} {entry.board:<20} cells {entry.cells:<4} cpus {cpus:<6} {state}")
+
 @cli.group()
 @click.argument("jhr")
 @click.pass_context
@@ -2524,6 +4323,23 @@ def dump_list_cell(ctx):
     for i in range(guestcells.cell_count()):
         print(guestcells.cell_at(i).name())
 
+@dump.command("free-mem")
+@click.option("--cell", default=None, help="输出guest cell的空闲虚拟地址空间")
+@click.pass_context
+def dump_free_mem(ctx, cell):
+    resource: Resource = ctx.obj['resource']
+    if cell is None:
+        allocator = AddressAllocator.physical(resource)
+    else:
+        guestcell = resource.jailhouse().guestcells().find_cell(cell)
+        if guestcell is None:
+            print(f'cell {cell} not found.')
+            return
+        allocator = AddressAllocator.guest_virtual(guestcell)
+    for region in allocator.regions():
+        print(f"0x{region.addr():016x} - 0x{region.end():016x} {region.size():#x}")
+    print(f"total {allocator.total():#x}, largest {allocator.largest():#x}")
+
 @dump.command("cell-resource")
 @click.argument('name')
 @click.pass_context
@@ -1,5 +1,4 @@
 import os
-import copy
 from typing import Optional
 from PySide2 import QtWidgets, QtCore
 from jh_resource import OSRunInfoBase, LinuxRunInfo
@@ -51,7 +50,7 @@ class LinuxRunInfoWidget(OSRunInfoWidget):
         self._ui.listwidget_rootfs_overlay.clear()
         for item in runinfo.ramdisk_overlay:
             self._ui.listwidget_rootfs_overlay.addItem(item)
-        self._runinfo = copy.deepcopy(runinfo)
+        self._runinfo = runinfo.snapshot()
 
     def _on_rootfs_overlay_listwidget_menu(self, pos: QtCore.QPoint):
         if self._runinfo is None:
@@ -83,7 +82,7 @@ class LinuxRunInfoWidget(OSRunInfoWidget):
         overlay = list()
         for i in range(self._ui.listwidget_rootfs_overlay.count()):
             overlay.append(self._ui.listwidget_rootfs_overlay.item(i).text())
-        self._runinfo.ramdisk_overlay = overlay
+        self._runinfo = self._runinfo.replace(ramdisk_overlay=overlay)
         self.value_changed.emit()
 
     def _on_edit_finished(self):
@@ -91,15 +90,15 @@ class LinuxRunInfoWidget(OSRunInfoWidget):
         if self.sender() is self._ui.lineedit_kernel_path:
             kernel = self._ui.lineedit_kernel_path.text()
             changed = (kernel != self._runinfo.kernel)
-            self._runinfo.kernel = kernel
+            self._runinfo = self._runinfo.replace(kernel=kernel)
         if self.sender() is self._ui.lineedit_devicetree_path:
             devicetree = self._ui.lineedit_devicetree_path.text()
             changed = (devicetree != self._runinfo.devicetree)
-            self._runinfo.devicetree = devicetree
+            self._runinfo = self._runinfo.replace(devicetree=devicetree)
         if self.sender() is self._ui.lineedit_ramdisk_path:
             ramdisk = self._ui.lineedit_ramdisk_path.text()
             changed = (ramdisk != self._runinfo.ramdisk)
-            self._runinfo.ramdisk = ramdisk
+            self._runinfo = self._runinfo.replace(ramdisk=ramdisk)
 
         if changed:
             self.value_changed.emit()
@@ -125,13 +124,13 @@ class LinuxRunInfoWidget(OSRunInfoWidget):
 
         if self.sender() is self._ui.btn_select_kernel:
             self._ui.lineedit_kernel_path.setText(filename)
-            self._runinfo.kernel = filename
+            self._runinfo = self._runinfo.replace(kernel=filename)
         elif self.sender() is self._ui.btn_select_devicetree:
             self._ui.lineedit_devicetree_path.setText(filename)
-            self._runinfo.devicetree = filename
+            self._runinfo = self._runinfo.replace(devicetree=filename)
         elif self.sender() is self._ui.btn_select_ramdisk:
             self._ui.lineedit_ramdisk_path.setText(filename)
-            self._runinfo.ramdisk = filename
+            self._runinfo = self._runinfo.replace(ramdisk=filename)
 
         self.value_changed.emit()
 
@@ -166,7 +165,7 @@ class LinuxRunInfoWidget(OSRunInfoWidget):
         bootargs = self._ui.textedit_bootargs.toPlainText().strip()
         if bootargs == self._runinfo.bootargs:
             return
-        self._runinfo.bootargs = bootargs
+        self._runinfo = self._runinfo.replace(bootargs=bootargs)
         self.value_changed.emit()
 
     def run(self, cell: ResourceGuestCell) -> bool:
@@ -11,6 +11,7 @@ import logging
 import io
 import time
 import json
+import multiprocessing
 from typing import Optional
 
 from PySide2 import QtWidgets, QtCore, QtGui
@@ -47,6 +48,7 @@ from remote_widget import RemoteWidget
 from except_widget import ExceptDialog
 from tip_widget import TipWidget
 from check_widget import CheckWidget
+from workspace_widget import WorkspaceDialog
 
 from version import VERSION, BUILD_TIME
 
@@ -371,6 +373,7 @@ class HomePageWidget(QtWidgets.QWidget):
 
         self._ui.btn_new.clicked.connect(self._on_create)
         self._ui.btn_open.clicked.connect(self._on_open)
+        self._ui.btn_workspace.clicked.connect(self._on_workspace)
 
     def _on_create(self):
         """
@@ -398,6 +401,24 @@ class HomePageWidget(QtWidgets.QWidget):
         rsc.set_prop(PROP_FILENAME, filename)
         ResourceMgr.get_instance().set_current(rsc)
 
+    def _on_workspace(self):
+        """
+        处理打开目录事件。
+        
+        显示目录选择对话框，并行索引目录下的所有资源文件，打开选中的资源文件。
+        """
+        path = QtWidgets.QFileDialog.getExistingDirectory(self, "打开目录", "")
+        if len(path) == 0:
+            return
+
+        x = WorkspaceDialog(path)
+        x.exec_()
+        rsc = x.resource()
+        if rsc is None:
+            return
+        rsc.set_prop(PROP_FILENAME, rsc.filename())
+        ResourceMgr.get_instance().set_current(rsc)
+
 
 class MainPageWidget(QtWidgets.QWidget):
     """
@@ -772,6 +793,8 @@ def load_stylesheet(name: str) -> Optional[str]:
 
 
 if __name__ == '__main__':
+    # 打包后工作区的进程池需要
+    multiprocessing.freeze_support()
     logging.basicConfig(level=logging.INFO)
 
 
@@ -1,4 +1,3 @@
-import itertools
 import logging
 import enum
 from typing import Optional, List, Union
@@ -446,12 +445,11 @@ class MemEditWidget(QtWidgets.QWidget):
 
         # 检查是否重叠
         self._ui.label_msg.clear()
-        for index_pair in itertools.combinations(range(len(self._items)), 2):
-            i1 = index_pair[0]
-            i2 = index_pair[1]
-            m1 = self._items[i1].value()
-            m2 = self._items[i2].value()
-            if m1.is_overlap(m2):
+        values = [item.value() for item in self._items]
+        if len(values) > 1:
+            pairs = type(values[0]).overlap_pairs(values)
+            if len(pairs) > 0:
+                i1, i2 = pairs[0]
                 self._ui.label_msg.setText(f"索引{i1}和{i2}重叠")
                 return False
 
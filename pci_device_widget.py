@@ -274,20 +274,22 @@ class PCIDeviceListWidget(QtWidgets.QWidget):
             return
         pci_devices = result.result
 
-        self._pcidevs.remove_all_device()
-
-        for pci in pci_devices:
-            # 过滤桥设备
-            if not isinstance(pci, dict):
-                continue
-            dev_type: str = pci.get('type')
-            if dev_type == 'bridge':
-                continue
-
-            pci_dev = self._pcidevs.add_device(pci)
-            if pci_dev is None:
-                self.logger.error(f"add device failed {pci_dev}.")
-                continue
+        # 批量导入，结束时只发送一次修改信号
+        with self._pcidevs.batch():
+            self._pcidevs.remove_all_device()
+
+            for pci in pci_devices:
+                # 过滤桥设备
+                if not isinstance(pci, dict):
+                    continue
+                dev_type: str = pci.get('type')
+                if dev_type == 'bridge':
+                    continue
+
+                pci_dev = self._pcidevs.add_device(pci)
+                if pci_dev is None:
+                    self.logger.error(f"add device failed {pci_dev}.")
+                    continue
 
         self._update()
 
@@ -468,19 +470,21 @@ class PCIDevicesWidget(QtWidgets.QWidget):
             return
         pci_devices = result.result
 
-        self._pcidevs.remove_all_device()
-
-        for pci in pci_devices:
-            # 过滤桥设备
-            if not isinstance(pci, dict):
-                continue
-            dev_type: str = pci.get('type')
-            if dev_type == 'bridge':
-                continue
-
-            pci_dev = self._pcidevs.add_device(pci)
-            if pci_dev is None:
-                self.logger.error(f"add device failed {pci_dev}.")
-                continue
+        # 批量导入，结束时只发送一次修改信号
+        with self._pcidevs.batch():
+            self._pcidevs.remove_all_device()
+
+            for pci in pci_devices:
+                # 过滤桥设备
+                if not isinstance(pci, dict):
+                    continue
+                dev_type: str = pci.get('type')
+                if dev_type == 'bridge':
+                    continue
+
+                pci_dev = self._pcidevs.add_device(pci)
+                if pci_dev is None:
+                    self.logger.error(f"add device failed {pci_dev}.")
+                    continue
 
         self._update()
@@ -35,6 +35,7 @@ class ResourceTreeModel(QtCore.QAbstractItemModel):
         ResourceSignals.add.connect(self._on_rsc_add)
         ResourceSignals.remove.connect(self._on_rsc_remove)
         ResourceSignals.modified.connect(self._on_rsc_modified)
+        ResourceSignals.saved.connect(self._on_rsc_modified)
 
     def _on_resource_update(self, sender, **kwargs):
         """
@@ -142,17 +143,17 @@ class ResourceTreeModel(QtCore.QAbstractItemModel):
         """
         处理资源修改事件。
         
-        当资源被修改时，发出数据变化信号以更新显示。
+        当资源被修改或保存后清除修改标记时，发出数据变化信号以更新"*"标记。
         
         Args:
             sender: 信号发送者。
             **kwargs: 关键字参数。
         """
-        if not isinstance(sender, ResourceBase):
-            return
-        rsc: ResourceBase = sender
-        index = self._create_index(rsc.my_index(), rsc)
-        self.dataChanged.emit(index, index)
+        for rsc in ResourceSignals.nodes(sender, kwargs):
+            if not isinstance(rsc, ResourceBase):
+                continue
+            index = self._create_index(rsc.my_index(), rsc)
+            self.dataChanged.emit(index, index)
 
     def _on_resource_value_changed(self, sender, **kwargs):
         """
@@ -164,11 +165,12 @@ class ResourceTreeModel(QtCore.QAbstractItemModel):
             sender: 信号发送者。
             **kwargs: 关键字参数。
         """
-        if isinstance(sender, ResourceGuestCell):
-            # 处理名字变化
-            guestcell: ResourceGuestCell = sender
-            index = self._create_index(guestcell.my_index(), guestcell)
-            self.dataChanged.emit(index, index)
+        for rsc, _ in ResourceSignals.changes(sender, kwargs):
+            if isinstance(rsc, ResourceGuestCell):
+                # 处理名字变化
+                guestcell: ResourceGuestCell = rsc
+                index = self._create_index(guestcell.my_index(), guestcell)
+                self.dataChanged.emit(index, index)
 
     def columnCount(self, parent=QtCore.QModelIndex()):
         """
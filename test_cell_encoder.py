@@ -0,0 +1,275 @@
+"""
+二进制配置编码测试。
+
+用原来基于ctypes结构体的实现作为参考，逐字节校验generator中基于struct的编码结果，例如:
+    python -m pytest -q test_cell_encoder.py
+"""
+import os
+import ctypes
+from typing import Optional
+import pytest
+import cellconfig
+from cellconfig import Revision14
+from generator import GeneratorCommon, RootCellGenerator, GuestCellGenerator, ArtifactCache
+from jh_resource import Resource, ResourceMgr, ResourceCPU, ResourceRootCell, ResourceGuestCell, ResourceGuestCellList
+from jh_resource import ResourcePCIDeviceList, ARMArch
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = [
+    os.path.join("examples", "D2000_rtt.jhr"),
+    os.path.join("demos", "qemu.jhr"),
+]
+
+
+def root_cell_bin_ctypes(rsc: Resource) -> Optional[bytes]:
+    """
+    使用ctypes结构体生成根单元格二进制配置，与原来的实现相同
+    """
+    kwargs = RootCellGenerator.gen_kwargs(rsc)
+    cpu = rsc.platform().cpu()
+    rootcell = rsc.jailhouse().rootcell()
+    Rev = Revision14
+    regions = RootCellGenerator.get_bin_regions(rsc, kwargs)
+    peer_count = rsc.jailhouse().guestcells().cell_count()+1
+
+    class RootCell(ctypes.Structure):
+        _pack_ = 1
+        _fields_ = [
+            ("header", Rev.system),
+            ('cpus', ctypes.c_uint64*1),
+            ('mem_regions', Rev.memory*len(regions)),
+            ('irqchips', Rev.irqchip),
+            ('pci_devices', Rev.pci_device)
+        ]
+
+    config = RootCell()
+
+    header = config.header
+    header.signature = Rev.sys_signature
+    header.revision = Rev.revision
+    header.flags = cellconfig.JAILHOUSE_SYS_VIRTUAL_DEBUG_CONSOLE
+    header.hypervisor_memory.phys_start = rootcell.hypervisor().addr()
+    header.hypervisor_memory.size = rootcell.hypervisor().size()
+    header.debug_console.address = kwargs['debug_console']['addr']
+    header.debug_console.size = 0x1000
+    header.debug_console.type = kwargs['debug_console']['type'].value
+    header.debug_console.flags = cellconfig.JAILHOUSE_CON_ACCESS_MMIO | cellconfig.JAILHOUSE_CON_REGDIST_4
+
+    pltinfo = config.header.platform_info
+    pci_ecam = rsc.platform().cpu().find_region("pci_ecam")
+    if pci_ecam is not None:
+        pltinfo.pci_machine_mmconfig_base = pci_ecam.addr()
+
+    pltinfo.pci_mmconfig_base = rootcell.pci_mmconfig().base_addr
+    pltinfo.pci_mmconfig_end_bus = rootcell.pci_mmconfig().bus_count-1
+    pltinfo.pci_is_virtual = 1
+    pltinfo.pci_domain = rootcell.pci_mmconfig().domain
+    pltinfo.plt.arm.gic_version = cpu.gic_version()
+    pltinfo.plt.arm.gicd_base = cpu.gicd_base()
+    pltinfo.plt.arm.gicr_base = cpu.gicr_base()
+    pltinfo.plt.arm.gicc_base = cpu.gicc_base()
+    pltinfo.plt.arm.gich_base = cpu.gich_base()
+    pltinfo.plt.arm.gicv_base = cpu.gicv_base()
+    pltinfo.plt.arm.maintenance_irq = 25
+
+    header.root_cell.name = kwargs['name'].encode()
+    header.root_cell.cpu_set_size = ctypes.sizeof(config.cpus)
+    header.root_cell.num_memory_regions = ctypes.sizeof(config.mem_regions)//ctypes.sizeof(config.mem_regions[0])
+    header.root_cell.num_irqchips = 1
+    header.root_cell.num_pci_devices = 1
+    header.root_cell.vpci_irq_base = kwargs['vpci_irq_base']
+
+    config.cpus[0] = kwargs['cpu']['values'][0]
+    mem_regions = config.mem_regions
+    for idx, mem in enumerate(regions):
+        mem_regions[idx].phys_start = mem.phys
+        mem_regions[idx].virt_start = mem.virt
+        mem_regions[idx].size       = mem.size
+        mem_regions[idx].flags      = mem.flag
+
+    irqchip = config.irqchips
+    irqchip.address = cpu.gicd_base()
+    irqchip.pin_base = 32
+    irqchip.pin_bitmap[0] = 0xffffffff
+    irqchip.pin_bitmap[1] = 0xffffffff
+    irqchip.pin_bitmap[2] = 0xffffffff
+    irqchip.pin_bitmap[3] = 0xffffffff
+
+    pci_dev = config.pci_devices
+    pci_dev.type = cellconfig.JAILHOUSE_PCI_TYPE_IVSHMEM
+    pci_dev.domain = 1
+    pci_dev.bdf = 0
+    pci_dev.bar_mask = cellconfig.JAILHOUSE_IVSHMEM_BAR_MASK_INTX
+    pci_dev.shmem_regions_start = 0
+    pci_dev.shmem_dev_id = kwargs['ivshmem']['id']
+    pci_dev.shmem_peers = peer_count
+    pci_dev.shmem_protocol = cellconfig.JAILHOUSE_SHMEM_PROTO_UNDEFINED
+
+    return ctypes.string_at(ctypes.addressof(config), ctypes.sizeof(config))
+
+
+def guest_cell_bin_ctypes(guestcell: ResourceGuestCell) -> Optional[bytes]:
+    """
+    使用ctypes结构体生成客户单元格二进制配置，与原来的实现相同
+    """
+    Rev = Revision14
+    cpu: ResourceCPU = guestcell.find(ResourceCPU)
+    rootcell: ResourceRootCell = guestcell.find(ResourceRootCell)
+    guestcells: ResourceGuestCellList = guestcell.ancestor(ResourceGuestCellList)
+    peer_count = guestcells.cell_count()+1
+    regions = GuestCellGenerator.get_bin_regions(guestcell)
+    pci_devices = GeneratorCommon.cached(guestcell, "pci_devices", GuestCellGenerator.get_pci_device)
+
+    class GuestcellStruct(ctypes.Structure):
+        _pack_ = 1
+        _fields_ = [
+            ("cell", Rev.cell_desc),
+            ('cpus', ctypes.c_uint64*1),
+            ('mem_regions', Rev.memory*len(regions)),
+            ('irqchips', Rev.irqchip),
+            ('pci_devices', Rev.pci_device*(1+len(pci_devices['devices']))),
+            ('pci_caps', Rev.pci_capability*len(pci_devices['caps'])),
+        ]
+
+    config = GuestcellStruct()
+
+    cell = config.cell
+    cell.signature = Rev.cell_signature
+    cell.revision = Rev.revision
+    cell.name = guestcell.name().encode()
+    cell.flags = GuestCellGenerator.get_cell_flags(guestcell)
+    cell.cpu_reset_address = guestcell.reset_addr()
+    cell.cpu_set_size = ctypes.sizeof(config.cpus)
+    cell.num_memory_regions = ctypes.sizeof(config.mem_regions)//ctypes.sizeof(config.mem_regions[0])
+    cell.num_irqchips = 1
+    cell.num_pci_devices = ctypes.sizeof(config.pci_devices)//ctypes.sizeof(config.pci_devices[0])
+    cell.num_pci_caps = len(pci_devices['caps'])
+    cell.vpci_irq_base =  rootcell.vpci_irq_base() + guestcell.my_index() + 1
+
+    console = GeneratorCommon.cached(guestcell, "console", GuestCellGenerator.get_console)
+    if console is False:
+        return None
+    if console is not None:
+        cell.console.address = console['addr']
+        cell.console.size = 0x1000
+        cell.console.type = console['type'].value
+        cell.console.flags = cellconfig.JAILHOUSE_CON_ACCESS_MMIO | cellconfig.JAILHOUSE_CON_REGDIST_4
+
+    config.cpus[0] = GeneratorCommon.cached(guestcell, "cpu", GuestCellGenerator.get_cpu)['values'][0]
+
+    mem_regions = config.mem_regions
+    for idx, mem in enumerate(regions):
+        mem_regions[idx].phys_start = mem.phys
+        mem_regions[idx].virt_start = mem.virt
+        mem_regions[idx].size       = mem.size
+        mem_regions[idx].flags      = mem.flag
+
+    irqchip = config.irqchips
+    irqchip.address = cpu.gicd_base()
+    irqchip.pin_base = 32
+    for idx, bitmap in enumerate(GeneratorCommon.cached(guestcell, "gic_bitmaps", GuestCellGenerator.get_gic_bitmaps)):
+        irqchip.pin_bitmap[idx] = bitmap['bitmap']
+
+    pci_ivshmem = config.pci_devices[0]
+    pci_ivshmem.type = cellconfig.JAILHOUSE_PCI_TYPE_IVSHMEM
+    pci_ivshmem.domain = 1
+    pci_ivshmem.bdf = 0
+    pci_ivshmem.bar_mask = cellconfig.JAILHOUSE_IVSHMEM_BAR_MASK_INTX
+    pci_ivshmem.shmem_regions_start = 0
+    pci_ivshmem.shmem_dev_id = guestcell.my_index()+1
+    pci_ivshmem.shmem_peers = peer_count
+    pci_ivshmem.shmem_protocol = cellconfig.JAILHOUSE_SHMEM_PROTO_UNDEFINED
+
+    for idx, dev in enumerate(pci_devices['devices']):
+        pci_dev = config.pci_devices[idx+1]
+        pci_dev.type = cellconfig.JAILHOUSE_PCI_TYPE_DEVICE
+        pci_dev.domain = dev['domain']
+        pci_dev.bdf = dev['bdf']
+        pci_dev.virt_bdf = (idx+1) << 3
+        if dev['num_caps'] > 0:
+            pci_dev.caps_start = dev['caps_start']
+            pci_dev.num_caps = dev['num_caps']
+        for i in range(6):
+            pci_dev.bar_mask[i] = dev['bar_mask'][i]
+
+    pci_caps = config.pci_caps
+    for idx, cap in enumerate(pci_devices['caps']):
+        pci_cap = config.pci_caps[idx]
+        if cap['extended']:
+            pci_cap.id = cap['id'] | cellconfig.JAILHOUSE_PCI_EXT_CAP
+        else:
+            pci_cap.id = cap['id']
+        pci_cap.start = cap['start']
+        pci_cap.len = cap['len']
+        pci_cap.flags = cap['flags']
+
+    return ctypes.string_at(ctypes.addressof(config), ctypes.sizeof(config))
+
+
+@pytest.fixture(autouse=True)
+def no_artifact_cache(monkeypatch):
+    # 不使用磁盘缓存，每次都重新编码
+    monkeypatch.chdir(BASE_DIR)
+    monkeypatch.setattr(ArtifactCache, "enabled", False)
+
+
+def open_fixture(jhr: str) -> Resource:
+    rsc = ResourceMgr.get_instance().open(jhr)
+    if rsc is None:
+        pytest.skip(f"open {jhr} failed")
+    return rsc
+
+
+@pytest.mark.parametrize("jhr", FIXTURES)
+def test_root_cell(jhr):
+    rsc = open_fixture(jhr)
+    data = RootCellGenerator.gen_config_bin(rsc)
+    assert data is not None
+    assert data == root_cell_bin_ctypes(rsc)
+
+
+@pytest.mark.parametrize("jhr", FIXTURES)
+def test_guest_cells(jhr):
+    rsc = open_fixture(jhr)
+    guestcells = rsc.jailhouse().guestcells()
+    for i in range(guestcells.cell_count()):
+        cell = guestcells.cell_at(i)
+        data = GuestCellGenerator.gen_config_bin(cell)
+        assert data is not None, cell.name()
+        assert data == guest_cell_bin_ctypes(cell), cell.name()
+
+
+@pytest.mark.parametrize("jhr", FIXTURES)
+def test_guest_cell_variants(jhr):
+    # PCI设备和capability、AArch32、虚拟console和cpuid
+    rsc = open_fixture(jhr)
+    pci_devices = rsc.find(ResourcePCIDeviceList)
+    paths = [pci_devices.device_at(i).path() for i in range(pci_devices.device_count())]
+    guestcells = rsc.jailhouse().guestcells()
+    for i in range(guestcells.cell_count()):
+        cell = guestcells.cell_at(i)
+        cell.set_arch(ARMArch.AArch32)
+        cell.set_virt_console_enable(True)
+        cell.set_virt_cpuid_enable(True)
+        if paths:
+            cell.set_pci_devices(paths[:3])
+        data = GuestCellGenerator.gen_config_bin(cell)
+        assert data is not None, cell.name()
+        assert data == guest_cell_bin_ctypes(cell), cell.name()
+
+
+def test_name_too_long():
+    # 与ctypes一致，名称超过32字节时失败，不截断
+    rsc = open_fixture(FIXTURES[0])
+    cell = rsc.jailhouse().guestcells().cell_at(0)
+    cell.set_name("x"*40)
+    with pytest.raises(ValueError):
+        guest_cell_bin_ctypes(cell)
+    with pytest.raises(ValueError):
+        GuestCellGenerator.gen_config_bin(cell)
+
+    # 名称检查按字符数，UTF-8编码后超过32字节
+    assert rsc.jailhouse().rootcell().set_name("名"*20)
+    with pytest.raises(ValueError):
+        root_cell_bin_ctypes(rsc)
+    assert RootCellGenerator.gen_config_bin(rsc) is None
@@ -0,0 +1,121 @@
+"""
+jh_resource测试，例如:
+    python -m pytest -q test_jh_resource.py
+"""
+import os
+import json
+import pytest
+from jh_resource import Resource, ResourceMgr, AddressAllocator, CommonOSRunInfo, ImageInfo
+from jh_resource import PlatformMgr, ResourceBase, ResourceCPU, ResourceRootCell, ResourceGuestCell
+from jh_resource import ResourcePCIDevice, ResourcePCIDeviceList
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = [
+    os.path.join("examples", "D2000_rtt.jhr"),
+    os.path.join("demos", "qemu.jhr"),
+]
+
+
+@pytest.fixture(autouse=True)
+def _chdir(monkeypatch):
+    monkeypatch.chdir(BASE_DIR)
+
+
+def open_fixture(path: str) -> Resource:
+    rsc = ResourceMgr.get_instance().open(path)
+    assert rsc is not None, path
+    return rsc
+
+
+def ivshmem_size(rsc: Resource) -> int:
+    # 与生成器一致: state + rw + 每个peer(包括root cell)一个输出区间
+    ivshmem = rsc.jailhouse().ivshmem()
+    peer_count = rsc.jailhouse().guestcells().cell_count()+1
+    return ivshmem.ivshmem_state_size() + ivshmem.ivshmem_rw_size() + ivshmem.ivshmem_out_size()*peer_count
+
+
+@pytest.mark.parametrize("path", FIXTURES)
+def test_physical_reserves_used_memory(path):
+    rsc = open_fixture(path)
+    allocator = AddressAllocator.physical(rsc)
+    rootcell = rsc.jailhouse().rootcell()
+    ivshmem = rsc.jailhouse().ivshmem()
+
+    used = [(rootcell.hypervisor().addr(), rootcell.hypervisor().size()),
+            (ivshmem.ivshmem_phys(), ivshmem_size(rsc))]
+    used.extend((mem.addr(), mem.size()) for mem in rootcell.system_mem())
+    for cell in rsc.jailhouse().guestcells():
+        used.extend((mem.phys(), mem.size()) for mem in cell.system_mem())
+
+    for region in allocator.regions():
+        for addr, size in used:
+            assert region.addr() >= addr+size or region.addr()+region.size() <= addr, \
+                f"free {region.size():x}@{region.addr():x} overlaps {size:x}@{addr:x}"
+
+
+@pytest.mark.parametrize("path", FIXTURES)
+def test_guest_virtual_reserves_ivshmem(path):
+    rsc = open_fixture(path)
+    size = ivshmem_size(rsc)
+    for cell in rsc.jailhouse().guestcells():
+        allocator = AddressAllocator.guest_virtual(cell)
+        addr = cell.ivshmem_virt_addr()
+        assert not any(r.addr() < addr+size and r.addr()+r.size() > addr for r in allocator.regions())
+
+
+def test_physical_qemu_last_output_region():
+    rsc = open_fixture(os.path.join("demos", "qemu.jhr"))
+    allocator = AddressAllocator.physical(rsc)
+    # root cell的输出区间之后才是空闲内存
+    assert not allocator.is_free(0x81102000, 0x100000)
+    assert allocator.is_free(0x81202000, 0x1000)
+    assert allocator.allocate(0x100000) != 0x81102000
+
+
+def test_common_os_runinfo_replace():
+    runinfo = CommonOSRunInfo()
+    assert runinfo.from_dict({"reset_addr": 0x1000, "images": [
+        {"enable": True, "name": "os", "addr": 0x80000, "filename": "os.bin"}]})
+    runinfo = runinfo.freeze()
+    assert isinstance(runinfo.images(), tuple)
+
+    image = ImageInfo().replace(name="app", addr=0x90000, filename="app.bin")
+    new = runinfo.replace(images=list(runinfo.images())+[image], reset_addr=0x2000)
+    assert [i.name for i in new.images()] == ["os", "app"]
+    assert new.reset_addr() == 0x2000
+    assert isinstance(new.images(), tuple) and all(i.is_frozen() for i in new.images())
+    # 原快照不变
+    assert len(runinfo.images()) == 1 and runinfo.reset_addr() == 0x1000
+    with pytest.raises(AttributeError):
+        runinfo.reset_addr = 0
+
+
+def test_platform_cache_is_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(PlatformMgr, "cache_dir", str(tmp_path))
+    first = PlatformMgr()
+    assert first.load("platform")
+    files = os.listdir(tmp_path)
+    assert len(files) == 1 and files[0].endswith(".json")
+    with open(tmp_path / files[0], "rt", encoding="utf8") as f:
+        assert json.load(f)["version"] == PlatformMgr.CACHE_VERSION
+
+    second = PlatformMgr()
+    assert second.load("platform")
+    assert second.cache_stats()[1] == 0
+    assert [cpu.value for cpu in second._cpus] == [cpu.value for cpu in first._cpus]
+    assert [board.value for board in second._boards] == [board.value for board in first._boards]
+
+
+@pytest.mark.parametrize("path", FIXTURES)
+def test_find_jhrb_parity(path, tmp_path):
+    rsc = open_fixture(path)
+    jhrb = str(tmp_path / (os.path.basename(path)+"b"))
+    assert ResourceMgr.save(rsc, jhrb)
+    lazy = open_fixture(jhrb)
+
+    # 查找延迟加载段中的节点时不需要先访问所在的段
+    for _type in (ResourcePCIDevice, ResourcePCIDeviceList, ResourceGuestCell, ResourceRootCell, ResourceCPU, ResourceBase):
+        expected = [o.label() for o in rsc.find_all(_type)]
+        assert [o.label() for o in lazy.find_all(_type)] == expected, _type.__name__
+        found = lazy.find(_type)
+        assert (found.label() if found is not None else None) == (expected[0] if expected else None)
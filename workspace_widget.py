@@ -0,0 +1,122 @@
+import logging
+import os
+from typing import Optional
+from PySide2 import QtWidgets, QtCore
+from jh_resource import Workspace, Resource
+
+
+class WorkspaceDialog(QtWidgets.QDialog):
+    """
+    工作区对话框，列出目录下所有资源文件的索引，双击或点击打开时才完整加载
+    """
+    logger = logging.getLogger('WorkspaceDialog')
+
+    headers = ("文件", "名称", "板卡", "Cell数", "CPU", "检查")
+
+    def __init__(self, path: str, parent=None):
+        super().__init__(parent)
+        self.setWindowFlag(QtCore.Qt.WindowContextHelpButtonHint, False)
+        self.setWindowTitle(f"工作区 {path}")
+        self.resize(900, 500)
+
+        self._workspace = Workspace(path)
+        self._resource: Optional[Resource] = None
+
+        self._table = QtWidgets.QTableWidget(self)
+        self._table.setColumnCount(len(self.headers))
+        self._table.setHorizontalHeaderLabels(self.headers)
+        self._table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self._table.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self._table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self._table.verticalHeader().hide()
+        self._table.horizontalHeader().setStretchLastSection(True)
+
+        self._progress = QtWidgets.QProgressBar(self)
+        self._progress.hide()
+
+        self._btn_refresh = QtWidgets.QPushButton("刷新", self)
+        self._btn_open = QtWidgets.QPushButton("打开", self)
+        self._btn_close = QtWidgets.QPushButton("关闭", self)
+
+        btn_layout = QtWidgets.QHBoxLayout()
+        btn_layout.addWidget(self._progress)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self._btn_refresh)
+        btn_layout.addWidget(self._btn_open)
+        btn_layout.addWidget(self._btn_close)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self._table)
+        layout.addLayout(btn_layout)
+
+        self._btn_refresh.clicked.connect(self._on_refresh)
+        self._btn_open.clicked.connect(self._on_open)
+        self._btn_close.clicked.connect(self.close)
+        self._table.cellDoubleClicked.connect(self._on_open)
+
+    def showEvent(self, event) -> None:
+        super().showEvent(event)
+        if len(self._workspace) == 0:
+            QtCore.QTimer.singleShot(0, self._on_refresh)
+
+    def _on_progress(self, done: int, total: int):
+        self._progress.setMaximum(total)
+        self._progress.setValue(done)
+        QtWidgets.QApplication.processEvents()
+
+    def _on_refresh(self):
+        self._btn_refresh.setEnabled(False)
+        self._progress.show()
+        try:
+            if not self._workspace.refresh(progress=self._on_progress):
+                self.logger.error(f"open workspace {self._workspace.path()} failed.")
+        finally:
+            self._progress.hide()
+            self._btn_refresh.setEnabled(True)
+        self._update_table()
+
+    def _update_table(self):
+        entries = self._workspace.entries()
+        self._table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            if not entry.ok():
+                values = (os.path.basename(entry.filename), "", "", "", "", entry.error)
+            else:
+                if entry.check is None:
+                    state = "未检查"
+                elif entry.check:
+                    state = "成功"
+                else:
+                    state = f"失败 {len(entry.failed)} 项"
+                values = (os.path.basename(entry.filename), entry.name, entry.board, str(entry.cells),
+                          f"{len(entry.cpus)}/{len(entry.board_cpus)}", state)
+            for col, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem(value)
+                item.setData(QtCore.Qt.UserRole, entry.filename)
+                if col == len(values) - 1 and entry.failed:
+                    item.setToolTip('\n'.join(entry.failed))
+                self._table.setItem(row, col, item)
+        self._table.resizeColumnsToContents()
+
+    def _current_filename(self) -> Optional[str]:
+        item = self._table.item(self._table.currentRow(), 0)
+        if item is None:
+            return None
+        return item.data(QtCore.Qt.UserRole)
+
+    def resource(self) -> Optional[Resource]:
+        """
+        返回打开的资源，未打开时返回None
+        """
+        return self._resource
+
+    def _on_open(self):
+        filename = self._current_filename()
+        if filename is None:
+            return
+        rsc = self._workspace.load(filename)
+        if rsc is None:
+            self.logger.error(f"open {filename} failed")
+            return
+        self._resource = rsc
+        self.accept()